@@ -25,6 +25,7 @@ CATEGORIAS_PRODUCTO = [
 ROLES_EMPLEADOS = ["Repartidor","Cocinero","Despachador"]
 ROLES_USUARIOS = ["Cliente","Gerente","Admin"]
 ESTADOS_PEDIDO = ["procesando","cocinando","empacando","enviando","recibido"]
+ESTADOS_TERMINALES = {"entrega_delivery", "recibido", "fallido"}
 
 USUARIOS_TOTAL   = int(os.getenv("USUARIOS_TOTAL", "30"))
 EMPLEADOS_TOTAL  = int(os.getenv("EMPLEADOS_TOTAL", "40"))
@@ -151,6 +152,7 @@ def generar_productos(locales, cantidad=None):
             "precio": round(random.uniform(15, 80), 2),
             "descripcion": f"Delicioso plato de la categoría {categoria}",
             "categoria": categoria,
+            "local_categoria": f"{local['local_id']}#{categoria}",
             "stock": random.randint(0, 50),
             "imagen_url": imagen_url
         })
@@ -226,6 +228,9 @@ def generar_pedidos_y_historial(locales, usuarios, productos, cantidad=None):
             "estado": ultimo_estado,
             "created_at": created_at                                 # Nuevo campo requerido
         }
+        # GSI disperso by_local_estado: solo pedidos activos
+        if ultimo_estado not in ESTADOS_TERMINALES:
+            pedido["local_estado"] = f"{local_id}#{ultimo_estado}"
 
         pedidos.append(pedido)
 
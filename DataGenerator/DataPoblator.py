@@ -32,6 +32,7 @@ TABLE_PRODUCTOS = os.getenv('TABLE_PRODUCTOS')
 TABLE_PEDIDOS = os.getenv('TABLE_PEDIDOS')
 TABLE_HISTORIAL_ESTADOS = os.getenv('TABLE_HISTORIAL_ESTADOS')
 TABLE_TOKENS_USUARIOS   = os.getenv('TABLE_TOKENS_USUARIOS')
+TABLE_CONTADORES        = os.getenv('TABLE_CONTADORES')
 
 # Bucket S3 (para verificación; la carga de imágenes no se hace aquí)
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
@@ -546,6 +547,8 @@ def create_all_resources():
         return False
     
     # Empleados: PK = local_id, SK = dni
+    # GSI:
+    #   - by_role (role, local_id)
     if not create_dynamodb_table(
         table_name=TABLE_EMPLEADOS,
         key_schema=[
@@ -554,8 +557,20 @@ def create_all_resources():
         ],
         attribute_definitions=[
             {'AttributeName': 'local_id', 'AttributeType': 'S'},
-            {'AttributeName': 'dni', 'AttributeType': 'S'}
-        ]
+            {'AttributeName': 'dni', 'AttributeType': 'S'},
+            {'AttributeName': 'role', 'AttributeType': 'S'}
+        ],
+        global_secondary_indexes=[
+            {
+                'IndexName': 'by_role',
+                'KeySchema': [
+                    {'AttributeName': 'role', 'KeyType': 'HASH'},
+                    {'AttributeName': 'local_id', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }
+        ],
+        stream_enabled=True
     ):
         return False
     
@@ -568,6 +583,8 @@ def create_all_resources():
         return False
     
     # Productos: PK = local_id, SK = producto_id
+    # GSI:
+    #   - by_local_categoria (local_categoria, precio)
     if not create_dynamodb_table(
         table_name=TABLE_PRODUCTOS,
         key_schema=[
@@ -576,14 +593,28 @@ def create_all_resources():
         ],
         attribute_definitions=[
             {'AttributeName': 'local_id', 'AttributeType': 'S'},
-            {'AttributeName': 'producto_id', 'AttributeType': 'S'}
-        ]
+            {'AttributeName': 'producto_id', 'AttributeType': 'S'},
+            {'AttributeName': 'local_categoria', 'AttributeType': 'S'},
+            {'AttributeName': 'precio', 'AttributeType': 'N'}
+        ],
+        global_secondary_indexes=[
+            {
+                'IndexName': 'by_local_categoria',
+                'KeySchema': [
+                    {'AttributeName': 'local_categoria', 'KeyType': 'HASH'},
+                    {'AttributeName': 'precio', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }
+        ],
+        stream_enabled=True
     ):
         return False
     
     # Pedidos: PK = local_id, SK = pedido_id
     # GSI:
     #   - by_usuario_v2 (tenant_id_usuario, created_at)
+    #   - by_local_estado (local_estado, created_at), disperso: solo pedidos activos
     if not create_dynamodb_table(
         table_name=TABLE_PEDIDOS,
         key_schema=[
@@ -594,7 +625,8 @@ def create_all_resources():
             {'AttributeName': 'local_id', 'AttributeType': 'S'},
             {'AttributeName': 'pedido_id', 'AttributeType': 'S'},
             {'AttributeName': 'correo', 'AttributeType': 'S'},
-            {'AttributeName': 'created_at', 'AttributeType': 'S'}
+            {'AttributeName': 'created_at', 'AttributeType': 'S'},
+            {'AttributeName': 'local_estado', 'AttributeType': 'S'}
         ],
         global_secondary_indexes=[
             {
@@ -604,8 +636,17 @@ def create_all_resources():
                     {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
                 ],
                 'Projection': {'ProjectionType': 'ALL'}
+            },
+            {
+                'IndexName': 'by_local_estado',
+                'KeySchema': [
+                    {'AttributeName': 'local_estado', 'KeyType': 'HASH'},
+                    {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
             }
-        ]
+        ],
+        stream_enabled=True
     ):
         return False
     
@@ -632,6 +673,16 @@ def create_all_resources():
         ):
             return False
     
+    # Contadores por local (opcional): PK = local_id
+    # Los mantiene service-contadores desde los streams de las tablas de arriba
+    if TABLE_CONTADORES:
+        if not create_dynamodb_table(
+            table_name=TABLE_CONTADORES,
+            key_schema=[{'AttributeName': 'local_id', 'KeyType': 'HASH'}],
+            attribute_definitions=[{'AttributeName': 'local_id', 'AttributeType': 'S'}]
+        ):
+            return False
+    
     print("\n✅ Todos los recursos creados exitosamente")
     return True
 
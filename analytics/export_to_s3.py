@@ -2,7 +2,7 @@ import os
 import json
 import boto3
 from datetime import datetime
-from decimal import Decimal
+from json_helper import dumps
 
 # Variables de entorno
 TABLE_PEDIDOS = os.environ.get('TABLE_PEDIDOS')
@@ -20,12 +20,6 @@ CORS_HEADERS = {
     "Content-Type": "application/json"
 }
 
-def decimal_default(obj):
-    """Convierte Decimal a float para JSON"""
-    if isinstance(obj, Decimal):
-        return float(obj)
-    raise TypeError
-
 def export_table_to_s3(table_name, s3_prefix):
     """Exporta una tabla de DynamoDB a S3 en formato JSON"""
     print(f"📤 Exportando tabla {table_name}...")
@@ -54,7 +48,7 @@ def export_table_to_s3(table_name, s3_prefix):
     s3_key = f"{s3_prefix}/data_{timestamp}.json"
     
     # Convertir a JSON Lines (JSONL) - un objeto por línea
-    json_lines = '\n'.join([json.dumps(item, default=decimal_default, ensure_ascii=False) for item in items])
+    json_lines = '\n'.join(dumps(item) for item in items)
     
     # Subir a S3
     s3_client.put_object(
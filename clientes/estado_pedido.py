@@ -1,40 +1,90 @@
 import os
 import json
+import time
 from datetime import datetime
 import boto3
 from botocore.exceptions import ClientError
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from auth_helper import get_bearer_token, resolve_principal
 
 TABLE_PEDIDOS = os.environ["TABLE_PEDIDOS"]
-TOKENS_TABLE = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
+
+# Long-poll (?wait=N): máximo de segundos que se retiene la solicitud. Debe
+# quedar bajo el timeout de la Lambda y el de la integración HTTP API (30 s).
+ESTADO_MAX_WAIT_SECONDS = int(os.environ.get("ESTADO_MAX_WAIT_SECONDS", "15"))
+ESTADO_POLL_INTERVAL_SECONDS = float(os.environ.get("ESTADO_POLL_INTERVAL_SECONDS", "1"))
+ESTADO_POLL_INTERVAL_MAX_SECONDS = float(os.environ.get("ESTADO_POLL_INTERVAL_MAX_SECONDS", "3"))
+# Margen para responder antes de que la Lambda se corte
+MARGEN_RESPUESTA_MS = 1500
 
 dynamodb = boto3.resource("dynamodb")
 pedidos_table = dynamodb.Table(TABLE_PEDIDOS)
-tokens_table = dynamodb.Table(TOKENS_TABLE)
 
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
-    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization,If-None-Match",
+    "Access-Control-Expose-Headers": "ETag",
     "Access-Control-Allow-Methods": "OPTIONS,GET"
 }
 
-def _resp(code, body):
+def _resp(code, body, headers=None):
     return {
         "statusCode": code,
-        "headers": {"Content-Type": "application/json", **CORS_HEADERS},
+        "headers": {"Content-Type": "application/json", **CORS_HEADERS, **(headers or {})},
         "body": json.dumps(body, ensure_ascii=False, default=str)
     }
 
-def _get_correo_from_token(token: str):
-    """Obtiene el correo del usuario desde el token en la tabla"""
-    try:
-        response = tokens_table.get_item(Key={'token': token})
-        if 'Item' not in response:
-            return None
-        item = response['Item']
-        return item.get('user_id') or item.get('correo')
-    except Exception:
-        return None
+def _not_modified(etag):
+    return {
+        "statusCode": 304,
+        "headers": {**CORS_HEADERS, "ETag": etag, "Cache-Control": "no-cache"},
+        "body": ""
+    }
+
+def _header(event, nombre):
+    for key, value in (event.get("headers") or {}).items():
+        if key.lower() == nombre:
+            return value
+    return None
+
+def _etag(item):
+    """ETag del estado: cambia con cada transición (estado_version la suma el Step Function)."""
+    return f'"{item.get("estado")}.{int(item.get("estado_version", 0))}"'
+
+def _coincide(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    # Se comparan sin el prefijo de ETag débil (W/) que agregan algunos proxies
+    return "*" in candidatos or etag in [c[2:] if c.startswith("W/") else c for c in candidatos]
+
+def _leer(local_id, pedido_id):
+    r = pedidos_table.get_item(
+        Key={"local_id": local_id, "pedido_id": pedido_id},
+        ProjectionExpression="correo, estado, estado_version"
+    )
+    return r.get("Item")
+
+def _esperar_cambio(item, local_id, pedido_id, if_none_match, wait, context):
+    """
+    Relee el pedido hasta que su ETag deje de coincidir con If-None-Match o
+    pase wait segundos (acotado por el tiempo restante de la Lambda).
+
+    Retorna:
+        item (None si el pedido desapareció) con la última lectura
+    """
+    limite = time.time() + wait
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        limite = min(limite, time.time() + (context.get_remaining_time_in_millis() - MARGEN_RESPUESTA_MS) / 1000)
+    intervalo = ESTADO_POLL_INTERVAL_SECONDS
+    while True:
+        restante = limite - time.time()
+        if restante <= 0:
+            return item
+        time.sleep(min(intervalo, restante))
+        item = _leer(local_id, pedido_id)
+        if not item or not _coincide(if_none_match, _etag(item)):
+            return item
+        intervalo = min(intervalo * 1.5, ESTADO_POLL_INTERVAL_MAX_SECONDS)
 
 def lambda_handler(event, context):
     # CORS preflight
@@ -46,16 +96,12 @@ def lambda_handler(event, context):
     if method != "GET":
         return _resp(405, {"error": "Método no permitido"})
 
-    # Validar token mediante Lambda
+    # Resolver usuario del token (una sola lectura)
     token = get_bearer_token(event)
-    valido, error, rol = validate_token_via_lambda(token)
-    if not valido:
+    principal, error = resolve_principal(token)
+    if not principal:
         return _resp(403, {"error": error or "Token inválido"})
-    
-    # Obtener correo del usuario autenticado
-    correo_token = _get_correo_from_token(token)
-    if not correo_token:
-        return _resp(401, {"error": "No se pudo obtener el usuario del token"})
+    correo_token = principal.correo
 
     # Params: local_id y pedido_id por querystring
     qs = event.get("queryStringParameters") or {}
@@ -64,14 +110,20 @@ def lambda_handler(event, context):
     if not local_id or not pedido_id:
         return _resp(400, {"error": "Faltan parámetros local_id y/o pedido_id"})
 
+    # Long-poll opcional: ?wait=N (segundos) junto con If-None-Match
+    try:
+        wait = max(0, min(int(qs.get("wait") or 0), ESTADO_MAX_WAIT_SECONDS))
+    except ValueError:
+        return _resp(400, {"error": "wait debe ser un entero (segundos)"})
+    if_none_match = _header(event, "if-none-match")
+
     # Leer pedido
     try:
-        r = pedidos_table.get_item(Key={"local_id": local_id, "pedido_id": pedido_id})
+        item = _leer(local_id, pedido_id)
     except ClientError as e:
         print(f"Error get_item pedidos: {e}")
         return _resp(500, {"error": "Error consultando el pedido"})
 
-    item = r.get("Item")
     if not item:
         return _resp(404, {"error": "Pedido no encontrado"})
 
@@ -82,9 +134,24 @@ def lambda_handler(event, context):
     if item.get("correo") != expected_correo:
         return _resp(403, {"error": "No autorizado a consultar este pedido"})
 
+    # Sin cambios: esperar (long-poll) o responder 304 sin cuerpo
+    if _coincide(if_none_match, _etag(item)):
+        if wait:
+            try:
+                nuevo = _esperar_cambio(item, local_id, pedido_id, if_none_match, wait, context)
+            except ClientError as e:
+                print(f"Error get_item pedidos (long-poll): {e}")
+                nuevo = item
+            if nuevo is None:
+                return _resp(404, {"error": "Pedido no encontrado"})
+            item = nuevo
+        if _coincide(if_none_match, _etag(item)):
+            return _not_modified(_etag(item))
+
     # Respuesta mínima (estado del pedido)
     return _resp(200, {
         "local_id": local_id,
         "pedido_id": pedido_id,
         "estado": item.get("estado"),
-    })
+        "version": int(item.get("estado_version", 0)),
+    }, {"ETag": _etag(item), "Cache-Control": "no-cache"})
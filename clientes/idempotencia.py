@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import boto3
+from botocore.exceptions import ClientError
+from json_helper import dumps
+
+# Registro de idempotencia por (correo, Idempotency-Key), con TTL:
+#   PK clave = "<correo>#<Idempotency-Key>"
+#   estado   = "en_curso" (reservado por una ejecución) | "completado"
+#   huella   = sha256 del cuerpo, para detectar la misma clave con otro pedido
+#   dueno    = request id de la ejecución que tiene la reserva "en_curso"
+#   expira   = epoch en segundos (atributo TTL de la tabla)
+# La primera solicitud reserva la clave con un put condicional; el registro se
+# marca como completado dentro de la misma transacción que guarda el pedido.
+TABLE_IDEMPOTENCIA = os.environ.get("TABLE_IDEMPOTENCIA", "")
+IDEMPOTENCIA_TTL_SECONDS = int(os.environ.get("IDEMPOTENCIA_TTL_SECONDS", "86400"))
+# Tiempo que una reserva "en_curso" bloquea la clave (> timeout de la Lambda)
+IDEMPOTENCIA_BLOQUEO_SECONDS = int(os.environ.get("IDEMPOTENCIA_BLOQUEO_SECONDS", "30"))
+MAX_LARGO_CLAVE = 255
+
+HEADER = "idempotency-key"
+
+dynamodb = boto3.resource("dynamodb")
+
+
+def habilitada() -> bool:
+    return bool(TABLE_IDEMPOTENCIA)
+
+
+def _tabla():
+    return dynamodb.Table(TABLE_IDEMPOTENCIA)
+
+
+def leer_header(event):
+    """Valor del header Idempotency-Key (case-insensitive) o None."""
+    headers = event.get("headers") or {}
+    for key, value in headers.items():
+        if key.lower() == HEADER:
+            return value.strip() if isinstance(value, str) and value.strip() else None
+    return None
+
+
+def validar_clave(clave):
+    if len(clave) > MAX_LARGO_CLAVE:
+        return False, f"Idempotency-Key debe tener como máximo {MAX_LARGO_CLAVE} caracteres"
+    return True, None
+
+
+def huella(body) -> str:
+    canonico = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+
+def clave_registro(correo, clave):
+    return f"{correo}#{clave}"
+
+
+def reservar(registro, hue, dueno):
+    """
+    Reserva la clave para esta ejecución (dueno: su request id).
+
+    Retorna:
+        ("nuevo", None)          -> procesar la solicitud
+        ("repetido", item)       -> responder con la respuesta guardada
+        ("en_curso", None)       -> otra ejecución la está procesando
+        ("otro_cuerpo", None)    -> la clave ya se usó con un cuerpo distinto
+    """
+    ahora = int(time.time())
+    try:
+        _tabla().put_item(
+            Item={
+                "clave": registro,
+                "estado": "en_curso",
+                "huella": hue,
+                "dueno": dueno,
+                "bloqueo_hasta": ahora + IDEMPOTENCIA_BLOQUEO_SECONDS,
+                "expira": ahora + IDEMPOTENCIA_TTL_SECONDS
+            },
+            # Libre, vencido (el TTL borra con retraso) o reserva abandonada
+            ConditionExpression=(
+                "attribute_not_exists(clave) OR expira < :ahora OR "
+                "(estado = :en_curso AND huella = :h AND bloqueo_hasta < :ahora)"
+            ),
+            ExpressionAttributeValues={":ahora": ahora, ":en_curso": "en_curso", ":h": hue}
+        )
+        return "nuevo", None
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+
+    item = _tabla().get_item(Key={"clave": registro}, ConsistentRead=True).get("Item")
+    if not item:
+        # Se borró entre el put y el get (liberado por un error): que reintente
+        return "en_curso", None
+    if item.get("huella") != hue:
+        return "otro_cuerpo", None
+    if item.get("estado") == "completado":
+        return "repetido", item
+    return "en_curso", None
+
+
+def accion_completar(registro, hue, status_code, body):
+    """Acción de TransactWriteItems que guarda la respuesta junto con el pedido."""
+    return {
+        "Update": {
+            "TableName": TABLE_IDEMPOTENCIA,
+            "Key": {"clave": {"S": registro}},
+            "UpdateExpression": "SET estado = :completado, status_code = :s, respuesta = :r, expira = :e",
+            "ConditionExpression": "estado = :en_curso AND huella = :h",
+            "ExpressionAttributeValues": {
+                ":completado": {"S": "completado"},
+                ":en_curso": {"S": "en_curso"},
+                ":h": {"S": hue},
+                ":s": {"N": str(status_code)},
+                ":r": {"S": dumps(body)},
+                ":e": {"N": str(int(time.time()) + IDEMPOTENCIA_TTL_SECONDS)}
+            }
+        }
+    }
+
+
+def liberar(registro, hue, dueno):
+    """
+    Borra la reserva si la solicitud falló, para que un reintento la procese.
+    Solo si sigue siendo de esta ejecución: si otra la tomó por vencida, no se toca.
+    """
+    try:
+        _tabla().delete_item(
+            Key={"clave": registro},
+            ConditionExpression="estado = :en_curso AND huella = :h AND dueno = :d",
+            ExpressionAttributeValues={":en_curso": "en_curso", ":h": hue, ":d": dueno}
+        )
+    except Exception as e:
+        print(f"Error liberando clave de idempotencia {registro}: {e}")
+
+
+def respuesta_guardada(item):
+    """(status_code, body) de una solicitud ya completada."""
+    return int(item["status_code"]), json.loads(item["respuesta"])
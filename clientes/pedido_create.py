@@ -1,36 +1,45 @@
 import os
 import json
-import re
 import uuid
 from datetime import datetime, timezone
+import time
 import boto3
+from boto3.dynamodb.types import TypeSerializer
 from botocore.exceptions import ClientError
 from decimal import Decimal
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from auth_helper import get_bearer_token, resolve_principal
+from batch_get import batch_get_productos, PRODUCTS_TABLE
+import idempotencia
+import json_helper
+from event_helper import EventPublisher
 
 # ==== Variables de entorno ====
 TABLE_PEDIDOS = os.environ["TABLE_PEDIDOS"]
-TOKENS_TABLE_USERS = os.environ["TOKENS_TABLE_USERS"]
+
+# TransactWriteItems admite 100 acciones: 1 put del pedido, 1 update del
+# registro de idempotencia y 1 update por producto
+MAX_ACCIONES_TRANSACCION = 100
+ACCIONES_FIJAS = 2
+MAX_LINEAS_PEDIDO = MAX_ACCIONES_TRANSACCION - ACCIONES_FIJAS
+TRANSACCION_MAX_INTENTOS = 3
 
 # ==== Clientes AWS ====
 dynamodb = boto3.resource("dynamodb")
-pedidos_table = dynamodb.Table(TABLE_PEDIDOS)
-tokens_table = dynamodb.Table(TOKENS_TABLE_USERS)
+# Cliente de bajo nivel: las acciones ya van serializadas (TypeSerializer) y el
+# meta.client del resource las volvería a serializar
+ddb_client = boto3.client("dynamodb")
+serializer = TypeSerializer()
 lambda_client = boto3.client("lambda")
-eventbridge = boto3.client("events")  # bus por defecto
 
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
-    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization,Idempotency-Key",
     "Access-Control-Allow-Methods": "OPTIONS,POST"
 }
 
-def _resp(code, body):
-    return {
-        "statusCode": code,
-        "headers": {"Content-Type": "application/json", **CORS_HEADERS},
-        "body": json.dumps(body, ensure_ascii=False, default=str)
-    }
+def _resp(code, body, headers=None):
+    # json_helper: costo y precio (Decimal) salen como números, no como strings
+    return json_helper.respuesta(code, body, {**CORS_HEADERS, **(headers or {})})
 
 def _parse_body(event):
     body = event.get("body")
@@ -41,7 +50,8 @@ def _parse_body(event):
     return body
 
 def _validate_payload(p):
-    required = ["local_id","direccion","costo"]
+    # costo ya no es requerido: se calcula con los precios de la tabla Productos
+    required = ["local_id","direccion"]
     missing = [k for k in required if k not in p]
     if missing:
         return False, f"Faltan campos requeridos: {', '.join(missing)}"
@@ -50,7 +60,7 @@ def _validate_payload(p):
         return False, "local_id debe ser string"
     if not isinstance(p["direccion"], str) or not p["direccion"].strip():
         return False, "dirección debe ser string"
-    if not (isinstance(p["costo"], int) or isinstance(p["costo"], float)) or p["costo"] < 0:
+    if "costo" in p and (not isinstance(p["costo"], (int, float)) or p["costo"] < 0):
         return False, "costo debe ser number >= 0"
 
     if "productos" not in p or p["productos"] is None:
@@ -67,16 +77,107 @@ def _validate_payload(p):
 
     return True, None
 
-def _get_correo_from_token(token: str):
-    """Obtiene el correo del usuario desde el token en la tabla"""
-    try:
-        r = tokens_table.get_item(Key={"token": token})
-        item = r.get("Item")
-        if not item:
+def _agrupar_lineas(productos):
+    """Suma cantidades de un mismo producto (una transacción no puede tocar dos veces el mismo item)."""
+    lineas = {}
+    for it in productos:
+        lineas[it["producto_id"]] = lineas.get(it["producto_id"], 0) + it["cantidad"]
+    return lineas
+
+def _cotizar(local_id, lineas):
+    """
+    Lee los productos del pedido con BatchGetItem y arma las líneas con precio.
+
+    Retorna:
+        (productos: list, costo: Decimal, None) o (None, None, (code, body))
+    """
+    keys = [{"local_id": local_id, "producto_id": pid} for pid in lineas]
+    encontrados, no_procesados = batch_get_productos(keys, fields=["nombre", "precio", "stock"])
+    if no_procesados:
+        return None, None, (503, {"error": "No se pudieron leer los productos, reintenta"})
+
+    faltantes = [pid for pid in lineas if (local_id, pid) not in encontrados]
+    if faltantes:
+        return None, None, (400, {"error": "Productos no encontrados en el local", "productos": faltantes})
+
+    # Chequeo previo de stock: evita una transacción que igual se cancelaría
+    sin_stock = [
+        pid for pid, cantidad in lineas.items()
+        if Decimal(str(encontrados[(local_id, pid)].get("stock", 0))) < cantidad
+    ]
+    if sin_stock:
+        return None, None, (409, {"error": "Stock insuficiente", "productos": sin_stock})
+
+    productos, costo = [], Decimal("0")
+    for pid, cantidad in lineas.items():
+        prod = encontrados[(local_id, pid)]
+        precio = Decimal(str(prod.get("precio", 0)))
+        productos.append({
+            "producto_id": pid,
+            "nombre": prod.get("nombre"),
+            "cantidad": cantidad,
+            "precio": precio
+        })
+        costo += precio * cantidad
+    return productos, costo, None
+
+def _transaccion(item, extra=None):
+    """Put del pedido + decremento condicional de stock por línea, todo o nada."""
+    acciones = [{
+        "Put": {
+            "TableName": TABLE_PEDIDOS,
+            "Item": {k: serializer.serialize(v) for k, v in item.items()},
+            "ConditionExpression": "attribute_not_exists(local_id) AND attribute_not_exists(pedido_id)"
+        }
+    }]
+    for linea in item["productos"]:
+        acciones.append({
+            "Update": {
+                "TableName": PRODUCTS_TABLE,
+                "Key": {"local_id": {"S": item["local_id"]}, "producto_id": {"S": linea["producto_id"]}},
+                "UpdateExpression": "SET stock = stock - :qty",
+                "ConditionExpression": "attribute_exists(producto_id) AND stock >= :qty",
+                "ExpressionAttributeValues": {":qty": {"N": str(linea["cantidad"])}}
+            }
+        })
+    # Acciones adicionales al final, para no correr los índices de las líneas
+    return acciones + (extra or [])
+
+def _guardar_pedido(item, extra=None):
+    """
+    Ejecuta la transacción. Reintenta conflictos con otras transacciones.
+
+    Retorna:
+        None si se guardó, o (code, body) con el error para el cliente
+    """
+    acciones = _transaccion(item, extra)
+    for intento in range(TRANSACCION_MAX_INTENTOS):
+        try:
+            ddb_client.transact_write_items(TransactItems=acciones)
             return None
-        return item.get("correo") or item.get("email") or item.get("usuario_correo") or item.get("user_id")
-    except Exception:
-        return None
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                print(f"Error transact_write_items: {e}")
+                return 500, {"error": "Error guardando el pedido"}
+            # Un motivo por acción, en el mismo orden: [pedido, linea_1, ..., linea_n, extra...]
+            motivos = [r.get("Code") for r in e.response.get("CancellationReasons", [])]
+            if motivos and motivos[0] == "ConditionalCheckFailed":
+                return 409, {"error": "El pedido ya existe (local_id, pedido_id)"}
+            sin_stock = [
+                linea["producto_id"]
+                for linea, motivo in zip(item["productos"], motivos[1:])
+                if motivo == "ConditionalCheckFailed"
+            ]
+            if sin_stock:
+                return 409, {"error": "Stock insuficiente", "productos": sin_stock}
+            if extra and "ConditionalCheckFailed" in motivos[1 + len(item["productos"]):]:
+                return 409, {"error": "La solicitud ya se está procesando, reintenta"}
+            if "TransactionConflict" in motivos and intento + 1 < TRANSACCION_MAX_INTENTOS:
+                time.sleep(0.05 * (2 ** intento))
+                continue
+            print(f"Transacción cancelada: {motivos}")
+            return 409, {"error": "El pedido no se pudo registrar por concurrencia, reintenta"}
+    return 409, {"error": "El pedido no se pudo registrar por concurrencia, reintenta"}
 
 def _now_iso():
     return datetime.now(timezone.utc).isoformat()
@@ -92,14 +193,10 @@ def _publish_crear_pedido_event(item):
         "local_id": item["local_id"],
         "productos": productos_simple
     }
-    try:
-        eventbridge.put_events(Entries=[{
-            "Source": "200millas.pedidos",
-            "DetailType": "CrearPedido",
-            "Detail": json.dumps(detail, ensure_ascii=False)
-        }])
-    except Exception as e:
-        print(f"Error publicando evento CrearPedido: {e}")
+    with EventPublisher() as publisher:
+        publisher.add("200millas.pedidos", "CrearPedido", detail)
+    if publisher.failed:
+        print(f"Error publicando evento CrearPedido: {item['pedido_id']}")
 
 def lambda_handler(event, context):
     # Preflight CORS
@@ -109,17 +206,13 @@ def lambda_handler(event, context):
 
     body = _parse_body(event)
 
-    # ======== Validar token mediante Lambda ========
+    # ======== Resolver usuario y rol del token (una sola lectura) ========
     token = get_bearer_token(event)
-    valido, error, rol = validate_token_via_lambda(token)
-    if not valido:
+    principal, error = resolve_principal(token)
+    if not principal:
         return _resp(403, {"status": "Forbidden - Acceso No Autorizado", "error": error})
-    
-    # Obtener correo del token
-    correo_token = _get_correo_from_token(token)
-    if not correo_token:
-        return _resp(403, {"error": "Token sin correo asociado"})
-    
+    correo_token, rol = principal.correo, principal.rol
+
     # Verificar que sea Cliente
     if rol.lower() != "cliente":
         return _resp(403, {"error": "Permiso denegado: se requiere rol 'cliente'"})
@@ -129,8 +222,54 @@ def lambda_handler(event, context):
     if not ok:
         return _resp(400, {"error": msg})
 
-    # Generar ID y timestamps
-    pedido_id = str(uuid.uuid4())
+    # ======== Idempotency-Key: un reintento devuelve la respuesta guardada ========
+    registro = hue = dueno = None
+    clave = idempotencia.leer_header(event)
+    if clave and idempotencia.habilitada():
+        ok, msg = idempotencia.validar_clave(clave)
+        if not ok:
+            return _resp(400, {"error": msg})
+        registro = idempotencia.clave_registro(correo_token, clave)
+        hue = idempotencia.huella(body)
+        dueno = getattr(context, "aws_request_id", None) or str(uuid.uuid4())
+        try:
+            resultado, previo = idempotencia.reservar(registro, hue, dueno)
+        except ClientError as e:
+            print(f"Error reservando clave de idempotencia: {e}")
+            return _resp(500, {"error": "Error verificando Idempotency-Key"})
+        if resultado == "repetido":
+            code, cuerpo = idempotencia.respuesta_guardada(previo)
+            return _resp(code, cuerpo, {"Idempotent-Replayed": "true"})
+        if resultado == "otro_cuerpo":
+            return _resp(422, {"error": "Idempotency-Key ya usada con un pedido distinto"})
+        if resultado == "en_curso":
+            return _resp(409, {"error": "La solicitud ya se está procesando, reintenta"},
+                         {"Retry-After": "1"})
+
+    code, cuerpo = _crear_pedido(body, correo_token, registro, hue)
+    if code != 201 and registro:
+        idempotencia.liberar(registro, hue, dueno)
+    return _resp(code, cuerpo)
+
+def _crear_pedido(body, correo_token, registro=None, hue=None):
+    """
+    Cotiza, guarda el pedido (y completa la clave de idempotencia) y publica el evento.
+
+    Retorna:
+        (status_code, body)
+    """
+    lineas = _agrupar_lineas(body["productos"])
+    if len(lineas) > MAX_LINEAS_PEDIDO:
+        return 400, {"error": f"Máximo {MAX_LINEAS_PEDIDO} productos distintos por pedido"}
+
+    # Precio calculado en el servidor (no se confía en el costo del cliente)
+    productos, costo, error = _cotizar(body["local_id"], lineas)
+    if error:
+        return error
+
+    # Generar ID y timestamps. Con Idempotency-Key el ID es determinista, así
+    # la condición attribute_not_exists del put también frena duplicados.
+    pedido_id = str(uuid.uuid5(uuid.NAMESPACE_URL, registro)) if registro else str(uuid.uuid4())
     now_iso = _now_iso()
 
     # Construir item con nueva estructura
@@ -138,26 +277,23 @@ def lambda_handler(event, context):
         "local_id": body["local_id"],                           # PK (cambió de tenant_id)
         "pedido_id": pedido_id,                                  # SK
         "correo": correo_token,                       # GSI by_usuario_v2 (solo correo)
-        "productos": body["productos"],                         # Ahora usa producto_id
-        "costo": Decimal(str(body["costo"])),
+        "productos": productos,                                 # producto_id, nombre, cantidad, precio
+        "costo": costo,
         "direccion": body["direccion"],
         "estado": "procesando",                                  # Estado inicial por defecto
+        "local_estado": f"{body['local_id']}#procesando",        # GSI disperso by_local_estado
+        "stock_reservado": True,                                 # pedido_fallido lo devuelve
         "created_at": now_iso                                    # Nuevo campo requerido
     }
+    respuesta = {"message": "Pedido registrado", "pedido": item}
+
+    # Persistir pedido, reservar stock y guardar la respuesta idempotente en una sola transacción
+    extra = [idempotencia.accion_completar(registro, hue, 201, respuesta)] if registro else None
+    error = _guardar_pedido(item, extra)
+    if error:
+        return error
 
-    # Persistir en DynamoDB (unicidad por PK compuesta)
-    try:
-        pedidos_table.put_item(
-            Item=item,
-            ConditionExpression="attribute_not_exists(local_id) AND attribute_not_exists(pedido_id)"
-        )
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-            return _resp(409, {"error": "El pedido ya existe (local_id, pedido_id)"})
-        print(f"Error put_item: {e}")
-        return _resp(500, {"error": "Error guardando el pedido"})
-
-    # Publicar evento
+    # Publicar evento (solo la ejecución que guardó el pedido)
     _publish_crear_pedido_event(item)
 
-    return _resp(201, {"message": "Pedido registrado", "pedido": item})
+    return 201, respuesta
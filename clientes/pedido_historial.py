@@ -3,30 +3,18 @@ import json
 import math
 import base64
 import boto3
-from decimal import Decimal
 from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from auth_helper import get_bearer_token, resolve_principal
+from json_helper import respuesta
 
 TABLE_PEDIDOS = os.environ["TABLE_PEDIDOS"]
-TOKENS_TABLE_USERS = os.environ["TOKENS_TABLE_USERS"]
 
 dynamodb = boto3.resource("dynamodb")
 pedidos_table = dynamodb.Table(TABLE_PEDIDOS)
-tokens_table = dynamodb.Table(TOKENS_TABLE_USERS)
-
-CORS_HEADERS = {
-    "Access-Control-Allow-Origin": "*",
-    "Access-Control-Allow-Headers": "Content-Type,Authorization",
-    "Access-Control-Allow-Methods": "OPTIONS,POST"
-}
-
-def _resp(code, body):
-    return {
-        "statusCode": code,
-        "headers": {"Content-Type": "application/json", **CORS_HEADERS},
-        "body": json.dumps(body, ensure_ascii=False, default=str)
-    }
+
+def _resp(code, body, event=None):
+    return respuesta(code, body, event=event)
 
 def _parse_body(event):
     body = event.get("body")
@@ -40,15 +28,6 @@ def _safe_int(v, default):
     except Exception:
         return default
 
-def _convert_decimal(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    if isinstance(obj, dict):
-        return {k: _convert_decimal(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_convert_decimal(i) for i in obj]
-    return obj
-
 def _encode_token(lek: dict | None) -> str | None:
     if not lek:
         return None
@@ -62,16 +41,32 @@ def _decode_token(tok: str | None) -> dict | None:
     except Exception:
         return None
 
-def _get_correo_from_token(token: str):
-    """Obtiene el correo del usuario desde el token en la tabla"""
-    try:
-        r = tokens_table.get_item(Key={"token": token})
-        item = r.get("Item")
-        if not item:
-            return None
-        return item.get("correo") or item.get("email") or item.get("usuario_correo") or item.get("user_id")
-    except Exception:
-        return None
+MAX_FIELDS = 30
+
+def _validar_fields(fields):
+    """fields opcional: lista de nombres de atributo de primer nivel"""
+    if fields is None:
+        return True
+    return (
+        isinstance(fields, list) and 0 < len(fields) <= MAX_FIELDS
+        and all(isinstance(f, str) and f.strip() and len(f) <= 255 for f in fields)
+    )
+
+def _projection(fields, requeridos=()):
+    """
+    ProjectionExpression con placeholders (#pN) para cualquier nombre,
+    incluidas palabras reservadas. requeridos son atributos que el handler
+    necesita leer (orden, paginación, filtros) aunque no se pidan.
+    """
+    nombres = {}
+    for i, f in enumerate(dict.fromkeys([*fields, *requeridos])):
+        nombres[f"#p{i}"] = f
+    return {"ProjectionExpression": ", ".join(nombres), "ExpressionAttributeNames": nombres}
+
+def _recortar(items, fields):
+    """Deja solo las claves del pedido y los fields pedidos"""
+    visibles = {"local_id", "pedido_id", *fields}
+    return [{k: v for k, v in it.items() if k in visibles} for it in items]
 
 def lambda_handler(event, context):
     # CORS preflight
@@ -83,17 +78,13 @@ def lambda_handler(event, context):
     if method != "POST":
         return _resp(405, {"error": "Método no permitido. Usa POST."})
 
-    # Validar token mediante Lambda
+    # Resolver usuario y rol del token (una sola lectura)
     token = get_bearer_token(event)
-    valido, error, rol = validate_token_via_lambda(token)
-    if not valido:
+    principal, error = resolve_principal(token)
+    if not principal:
         return _resp(403, {"status": "Forbidden - Acceso No Autorizado", "error": error})
-    
-    # Obtener correo del token
-    correo_token = _get_correo_from_token(token)
-    if not correo_token:
-        return _resp(403, {"error": "Token sin correo asociado"})
-    
+    correo_token, rol = principal.correo, principal.rol
+
     print(f"Buscando pedidos para correo: {correo_token}")
     
     # Verificar que sea Cliente
@@ -111,6 +102,13 @@ def lambda_handler(event, context):
     next_token_in = body.get("next_token")
     lek = _decode_token(next_token_in)
 
+    # Selección de atributos (p. ej. ["estado", "costo", "created_at"]) para
+    # leer y serializar solo lo que muestra la vista de lista
+    fields = body.get("fields")
+    if not _validar_fields(fields):
+        return _resp(400, {"error": f"fields debe ser una lista de hasta {MAX_FIELDS} nombres de atributo"})
+    projection = _projection(fields, ("local_id", "pedido_id", "created_at")) if fields else {}
+
     # Intentar usar GSI by_usuario_v2 primero (más eficiente)
     # Si falla, usar Scan como fallback
     items = []
@@ -122,7 +120,8 @@ def lambda_handler(event, context):
             "IndexName": "by_usuario_v2",
             "KeyConditionExpression": Key("correo").eq(correo_token),
             "Limit": size,
-            "ScanIndexForward": False  # Ordenar por created_at descendente
+            "ScanIndexForward": False,  # Ordenar por created_at descendente
+            **projection
         }
         
         if lek:
@@ -139,7 +138,8 @@ def lambda_handler(event, context):
             print(f"GSI no disponible, usando Scan como fallback: {e}")
             
             scan_args = {
-                "FilterExpression": Attr("correo").eq(correo_token)
+                "FilterExpression": Attr("correo").eq(correo_token),
+                **projection
             }
             
             if lek:
@@ -181,7 +181,8 @@ def lambda_handler(event, context):
     items.sort(key=lambda x: x.get("created_at", ""), reverse=True)
     
     next_token_out = _encode_token(lek_out)
-    items = _convert_decimal(items)
+    if fields:
+        items = _recortar(items, fields)
 
     resp = {
         "pedidos": items,
@@ -189,4 +190,4 @@ def lambda_handler(event, context):
         "next_token": next_token_out
     }
 
-    return _resp(200, resp)
+    return _resp(200, resp, event)
@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.fixture
+def entorno():
+    return {
+        'TABLE_PEDIDOS': 'Pedidos',
+        'PRODUCTS_TABLE': 'Productos',
+        'TABLE_IDEMPOTENCIA': 'Idempotencia',
+    }
+
+
+@pytest.fixture
+def tablas(crear_tabla):
+    return {
+        'pedidos': crear_tabla('Pedidos', 'local_id', 'pedido_id'),
+        'productos': crear_tabla('Productos', 'local_id', 'producto_id'),
+        'idempotencia': crear_tabla('Idempotencia', 'clave'),
+    }
@@ -0,0 +1,98 @@
+import time
+import boto3
+
+
+def _completar(idem, registro, hue, code=201, body=None):
+    boto3.client('dynamodb').transact_write_items(
+        TransactItems=[idem.accion_completar(registro, hue, code, body or {'ok': True})]
+    )
+
+
+def test_clave_nueva_y_en_curso(importar, tablas):
+    idem = importar('idempotencia')
+    assert idem.reservar('c@x.com#k', 'h1', 'r1') == ('nuevo', None)
+    # Segunda solicitud con la misma clave mientras la primera sigue
+    assert idem.reservar('c@x.com#k', 'h1', 'r1') == ('en_curso', None)
+
+
+def test_misma_clave_con_otro_cuerpo(importar, tablas):
+    idem = importar('idempotencia')
+    idem.reservar('c@x.com#k', 'h1', 'r1')
+    assert idem.reservar('c@x.com#k', 'h2', 'r1') == ('otro_cuerpo', None)
+    _completar(idem, 'c@x.com#k', 'h1')
+    assert idem.reservar('c@x.com#k', 'h2', 'r1') == ('otro_cuerpo', None)
+
+
+def test_completada_devuelve_la_respuesta_guardada(importar, tablas):
+    idem = importar('idempotencia')
+    idem.reservar('c@x.com#k', 'h1', 'r1')
+    _completar(idem, 'c@x.com#k', 'h1', 201, {'pedido': {'pedido_id': 'P1'}})
+
+    resultado, item = idem.reservar('c@x.com#k', 'h1', 'r1')
+
+    assert resultado == 'repetido'
+    assert idem.respuesta_guardada(item) == (201, {'pedido': {'pedido_id': 'P1'}})
+
+
+def test_liberar_permite_reintentar(importar, tablas):
+    idem = importar('idempotencia')
+    idem.reservar('c@x.com#k', 'h1', 'r1')
+    idem.liberar('c@x.com#k', 'h1', 'r1')
+    assert idem.reservar('c@x.com#k', 'h1', 'r1') == ('nuevo', None)
+
+
+def test_liberar_no_borra_una_completada(importar, tablas):
+    idem = importar('idempotencia')
+    idem.reservar('c@x.com#k', 'h1', 'r1')
+    _completar(idem, 'c@x.com#k', 'h1')
+    idem.liberar('c@x.com#k', 'h1', 'r1')
+    assert idem.reservar('c@x.com#k', 'h1', 'r1')[0] == 'repetido'
+
+
+def test_liberar_no_borra_la_reserva_de_otra_ejecucion(importar, tablas):
+    idem = importar('idempotencia')
+    idem.reservar('c@x.com#k', 'h1', 'r1')
+    tablas['idempotencia'].update_item(
+        Key={'clave': 'c@x.com#k'},
+        UpdateExpression='SET bloqueo_hasta = :t',
+        ExpressionAttributeValues={':t': int(time.time()) - 1}
+    )
+    # r2 toma la reserva vencida; el error tardío de r1 no se la quita
+    assert idem.reservar('c@x.com#k', 'h1', 'r2') == ('nuevo', None)
+    idem.liberar('c@x.com#k', 'h1', 'r1')
+    assert idem.reservar('c@x.com#k', 'h1', 'r3') == ('en_curso', None)
+    idem.liberar('c@x.com#k', 'h1', 'r2')
+    assert idem.reservar('c@x.com#k', 'h1', 'r3') == ('nuevo', None)
+
+
+def test_reserva_abandonada_se_recupera(importar, tablas):
+    idem = importar('idempotencia')
+    idem.reservar('c@x.com#k', 'h1', 'r1')
+    tablas['idempotencia'].update_item(
+        Key={'clave': 'c@x.com#k'},
+        UpdateExpression='SET bloqueo_hasta = :t',
+        ExpressionAttributeValues={':t': int(time.time()) - 1}
+    )
+    # Misma huella: se puede tomar; otra huella no
+    assert idem.reservar('c@x.com#k', 'h2', 'r1') == ('otro_cuerpo', None)
+    assert idem.reservar('c@x.com#k', 'h1', 'r1') == ('nuevo', None)
+
+
+def test_registro_vencido_se_reutiliza(importar, tablas):
+    idem = importar('idempotencia')
+    idem.reservar('c@x.com#k', 'h1', 'r1')
+    _completar(idem, 'c@x.com#k', 'h1')
+    tablas['idempotencia'].update_item(
+        Key={'clave': 'c@x.com#k'},
+        UpdateExpression='SET expira = :t',
+        ExpressionAttributeValues={':t': int(time.time()) - 1}
+    )
+    assert idem.reservar('c@x.com#k', 'h2', 'r1') == ('nuevo', None)
+
+
+def test_validar_clave(importar):
+    idem = importar('idempotencia')
+    assert idem.validar_clave('a' * idem.MAX_LARGO_CLAVE) == (True, None)
+    assert idem.validar_clave('a' * (idem.MAX_LARGO_CLAVE + 1))[0] is False
+    assert idem.leer_header({'headers': {'Idempotency-Key': ' k1 '}}) == 'k1'
+    assert idem.leer_header({'headers': {'idempotency-key': '  '}}) is None
@@ -0,0 +1,66 @@
+import time
+import statistics
+from collections import Counter
+from decimal import Decimal
+import pytest
+
+pytestmark = pytest.mark.medicion
+
+PEDIDOS = 50
+
+
+def _body(i):
+    return {'local_id': 'L1', 'direccion': 'Av. Siempre Viva 742',
+            'productos': [{'producto_id': 'p01', 'cantidad': 1}, {'producto_id': f'p{i % 5 + 2:02d}', 'cantidad': 1}]}
+
+
+def _medir(llamadas_aws, crear):
+    tiempos, por_pedido = [], []
+    for i in range(PEDIDOS):
+        llamadas_aws.clear()
+        inicio = time.perf_counter()
+        assert crear(i) == 201
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        por_pedido.append(Counter(op for _, op, _ in llamadas_aws))
+    return statistics.median(tiempos), por_pedido[-1]
+
+
+def test_costo_de_la_idempotency_key(importar, tablas, llamadas_aws):
+    """
+    Lo que agrega la Idempotency-Key a la creación de un pedido (el tramo de
+    lambda_handler después de autenticar): llamadas AWS y tiempo bajo
+    moto, sin clave, con clave nueva y para una repetición.
+    """
+    pc = importar('pedido_create')
+    idem = importar('idempotencia')
+    for n in range(1, 7):
+        tablas['productos'].put_item(Item={'local_id': 'L1', 'producto_id': f'p{n:02d}', 'nombre': f'Plato {n}',
+                                           'precio': Decimal('10.50'), 'stock': 10 * PEDIDOS})
+
+    def sin_clave(i):
+        return pc._crear_pedido(_body(i), 'c@x.com')[0]
+
+    def con_clave(i):
+        body = _body(i)
+        registro, hue = idem.clave_registro('c@x.com', f'k{i}'), idem.huella(body)
+        assert idem.reservar(registro, hue, f'r{i}')[0] == 'nuevo'
+        return pc._crear_pedido(body, 'c@x.com', registro, hue)[0]
+
+    def repeticion(i):
+        body = _body(i)
+        resultado, previo = idem.reservar(idem.clave_registro('c@x.com', f'k{i}'), idem.huella(body), f'x{i}')
+        assert resultado == 'repetido'
+        return idem.respuesta_guardada(previo)[0]
+
+    print()
+    print(f"{'camino':<12} {'p50 ms':>7}  llamadas por pedido")
+    for nombre, crear in (('sin clave', sin_clave), ('con clave', con_clave), ('repetición', repeticion)):
+        p50, llamadas = _medir(llamadas_aws, crear)
+        print(f"{nombre:<12} {p50:>7.2f}  {dict(llamadas)}")
+        if nombre == 'sin clave':
+            base = llamadas
+        elif nombre == 'con clave':
+            # Una escritura más (la reserva); completar va dentro de la misma transacción
+            assert llamadas - base == Counter({'PutItem': 1})
+        else:
+            assert llamadas == Counter({'PutItem': 1, 'GetItem': 1})
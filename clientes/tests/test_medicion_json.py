@@ -0,0 +1,62 @@
+import json
+import time
+import statistics
+from decimal import Decimal
+import pytest
+
+pytestmark = pytest.mark.medicion
+
+MUESTRAS = 30
+
+
+def _convert_decimal(obj):
+    # Camino anterior de pedido_historial: copia recursiva y luego json.dumps
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, dict):
+        return {k: _convert_decimal(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_convert_decimal(i) for i in obj]
+    return obj
+
+
+def _anterior(obj):
+    return json.dumps(_convert_decimal(obj), ensure_ascii=False, default=str)
+
+
+def _pedidos(n):
+    return {'pedidos': [{
+        'local_id': 'L1', 'pedido_id': f'P{i:04d}', 'correo': 'c@x.com', 'estado': 'entregado',
+        'created_at': '2026-10-17T12:00:00Z', 'costo': Decimal('42.50'), 'direccion': 'Av. Siempre Viva 742',
+        'productos': [{'producto_id': f'p{k:02d}', 'nombre': f'Plato {k}', 'cantidad': Decimal(2),
+                       'precio': Decimal('10.625')} for k in range(4)]
+    } for i in range(n)], 'size': n, 'next_token': None}
+
+
+def _p50(fn, obj):
+    tiempos = []
+    for _ in range(MUESTRAS):
+        inicio = time.perf_counter()
+        fn(obj)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def test_json_helper_vs_convert_decimal(importar, monkeypatch):
+    """_convert_decimal + json.dumps contra json_helper.dumps con 1000 pedidos."""
+    jh = importar('json_helper')
+    payload = _pedidos(1000)
+    assert json.loads(jh.dumps(payload)) == json.loads(_anterior(payload))
+
+    caminos = [('_convert_decimal + json.dumps', _anterior)]
+    if jh.orjson is not None:
+        caminos.append(('json_helper (orjson)', jh.dumps))
+    caminos.append(('json_helper (json estándar)', None))
+
+    print()
+    print(f"{'camino':<30} {'p50 ms':>7}")
+    for nombre, fn in caminos:
+        if fn is None:
+            monkeypatch.setattr(jh, 'orjson', None)
+            fn = jh.dumps
+        print(f"{nombre:<30} {_p50(fn, payload):>7.1f}")
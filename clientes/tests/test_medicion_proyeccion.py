@@ -0,0 +1,81 @@
+import json
+import time
+import statistics
+from decimal import Decimal
+import pytest
+
+pytestmark = pytest.mark.medicion
+
+PEDIDOS = 100
+MUESTRAS = 20
+FIELDS = ['estado', 'costo', 'created_at']
+
+
+@pytest.fixture
+def entorno(entorno):
+    return {**entorno, 'TOKENS_TABLE_USERS': 'Tokens'}
+
+
+@pytest.fixture
+def pedidos(importar, crear_tabla):
+    import boto3
+    crear_tabla('Tokens', 'token').put_item(Item={
+        'token': 'tk', 'user_id': 'c@x.com', 'rol': 'Cliente', 'expires': '2999-01-01 00:00:00'
+    })
+    # Con el GSI by_usuario_v2 que usa el historial
+    tabla = boto3.resource('dynamodb').create_table(
+        TableName='Pedidos',
+        KeySchema=[{'AttributeName': 'local_id', 'KeyType': 'HASH'},
+                   {'AttributeName': 'pedido_id', 'KeyType': 'RANGE'}],
+        AttributeDefinitions=[{'AttributeName': n, 'AttributeType': 'S'}
+                              for n in ('local_id', 'pedido_id', 'correo', 'created_at')],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'by_usuario_v2',
+            'KeySchema': [{'AttributeName': 'correo', 'KeyType': 'HASH'},
+                          {'AttributeName': 'created_at', 'KeyType': 'RANGE'}],
+            'Projection': {'ProjectionType': 'ALL'}
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    with tabla.batch_writer() as batch:
+        for i in range(PEDIDOS):
+            batch.put_item(Item={
+                'local_id': 'L1', 'pedido_id': f'P{i:03d}', 'correo': 'c@x.com',
+                'created_at': f'2026-10-{i % 28 + 1:02d}T12:{i % 60:02d}:00Z',
+                'estado': 'entregado', 'local_estado': 'L1#entregado', 'costo': Decimal('42.50'),
+                'direccion': 'Av. Siempre Viva 742, Dpto. 1203, Miraflores, Lima',
+                'productos': [{'producto_id': f'p{n:02d}', 'nombre': f'Plato de la casa número {n}',
+                               'cantidad': 2, 'precio': Decimal('10.625')} for n in range(4)]
+            })
+    return tabla
+
+
+def test_respuesta_con_y_sin_fields(importar, pedidos, capsys):
+    """
+    Bytes de respuesta y tiempo de pedido_historial (size=100) con y sin
+    fields. La proyección recorta lo que DynamoDB devuelve y lo que se
+    serializa; las RCU de un Query se cobran por el tamaño del ítem completo,
+    así que no bajan con ProjectionExpression.
+    """
+    ph = importar('pedido_historial')
+
+    filas = [f"{'fields':<32} {'bytes':>7} {'p50 ms':>7}"]
+    for fields in (None, FIELDS):
+        cuerpo = {'size': PEDIDOS, **({'fields': fields} if fields else {})}
+        evento = {'httpMethod': 'POST', 'headers': {'Authorization': 'Bearer tk'}, 'body': json.dumps(cuerpo)}
+        tiempos = []
+        for _ in range(MUESTRAS):
+            inicio = time.perf_counter()
+            r = ph.lambda_handler(evento, None)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        assert r['statusCode'] == 200
+        pedidos_resp = json.loads(r['body'])['pedidos']
+        assert len(pedidos_resp) == PEDIDOS
+        if fields:
+            assert set(pedidos_resp[0]) == {'local_id', 'pedido_id', *fields}
+        filas.append(f"{str(fields):<32} {len(r['body'].encode('utf-8')):>7} {statistics.median(tiempos):>7.1f}")
+
+    # Sin los print del handler
+    capsys.readouterr()
+    with capsys.disabled():
+        print('', *filas, sep='\n')
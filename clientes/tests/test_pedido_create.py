@@ -0,0 +1,139 @@
+import json
+from decimal import Decimal
+
+
+def _producto(tablas, pid, precio='10.50', stock=5):
+    tablas['productos'].put_item(Item={
+        'local_id': 'L1', 'producto_id': pid, 'nombre': f'Plato {pid}',
+        'precio': Decimal(precio), 'stock': stock
+    })
+
+
+def _stock(tablas, pid):
+    return tablas['productos'].get_item(Key={'local_id': 'L1', 'producto_id': pid})['Item']['stock']
+
+
+def _body(*lineas):
+    return {'local_id': 'L1', 'direccion': 'Av. Siempre Viva 742',
+            'productos': [{'producto_id': pid, 'cantidad': c} for pid, c in lineas]}
+
+
+def _item(pc, *lineas, pedido_id='P1'):
+    return {
+        'local_id': 'L1', 'pedido_id': pedido_id, 'correo': 'c@x.com', 'estado': 'procesando',
+        'productos': [{'producto_id': pid, 'cantidad': c, 'precio': Decimal('1')} for pid, c in lineas],
+        'costo': Decimal('1'), 'direccion': 'x', 'created_at': pc._now_iso()
+    }
+
+
+def test_crea_pedido_con_precio_del_servidor_y_reserva_stock(importar, tablas):
+    pc = importar('pedido_create')
+    _producto(tablas, 'p01', '10.50', stock=5)
+    _producto(tablas, 'p02', '3', stock=2)
+
+    body = _body(('p01', 1), ('p02', 2), ('p01', 1))
+    body['costo'] = 0  # se ignora
+    code, cuerpo = pc._crear_pedido(body, 'c@x.com')
+
+    assert code == 201
+    pedido = cuerpo['pedido']
+    assert pedido['costo'] == Decimal('27.00')
+    assert pedido['stock_reservado'] is True
+    assert {p['producto_id']: p['cantidad'] for p in pedido['productos']} == {'p01': 2, 'p02': 2}
+    assert _stock(tablas, 'p01') == 3
+    assert _stock(tablas, 'p02') == 0
+
+    # En la respuesta HTTP costo y precio son números, no strings
+    enviado = json.loads(pc._resp(code, cuerpo)['body'])['pedido']
+    assert enviado['costo'] == 27 and isinstance(enviado['costo'], int)
+    assert sorted(p['precio'] for p in enviado['productos']) == [3, 10.5]
+
+
+def test_stock_insuficiente_en_la_cotizacion(importar, tablas):
+    pc = importar('pedido_create')
+    _producto(tablas, 'p01', stock=1)
+    code, cuerpo = pc._crear_pedido(_body(('p01', 2)), 'c@x.com')
+    assert code == 409
+    assert cuerpo['productos'] == ['p01']
+    assert tablas['pedidos'].scan()['Items'] == []
+
+
+def test_producto_inexistente(importar, tablas):
+    pc = importar('pedido_create')
+    _producto(tablas, 'p01')
+    code, cuerpo = pc._crear_pedido(_body(('p01', 1), ('zzz', 1)), 'c@x.com')
+    assert code == 400
+    assert cuerpo['productos'] == ['zzz']
+
+
+def test_maximo_de_lineas(importar, tablas):
+    pc = importar('pedido_create')
+    assert pc.MAX_LINEAS_PEDIDO == 98
+    code, _ = pc._crear_pedido(_body(*[(f'p{i:03}', 1) for i in range(99)]), 'c@x.com')
+    assert code == 400
+
+
+def test_cancelacion_por_stock_indica_las_lineas(importar, tablas):
+    pc = importar('pedido_create')
+    # El stock cambió entre la cotización y la transacción
+    _producto(tablas, 'p01', stock=5)
+    _producto(tablas, 'p02', stock=1)
+    _producto(tablas, 'p03', stock=0)
+
+    error = pc._guardar_pedido(_item(pc, ('p01', 1), ('p02', 2), ('p03', 1)))
+
+    assert error == (409, {'error': 'Stock insuficiente', 'productos': ['p02', 'p03']})
+    assert _stock(tablas, 'p01') == 5
+    assert tablas['pedidos'].scan()['Items'] == []
+
+
+def test_cancelacion_por_pedido_existente(importar, tablas):
+    pc = importar('pedido_create')
+    _producto(tablas, 'p01', stock=5)
+    assert pc._guardar_pedido(_item(pc, ('p01', 1))) is None
+
+    code, cuerpo = pc._guardar_pedido(_item(pc, ('p01', 1)))
+
+    assert code == 409 and 'ya existe' in cuerpo['error']
+    assert _stock(tablas, 'p01') == 4
+
+
+def test_cancelacion_por_producto_eliminado(importar, tablas):
+    pc = importar('pedido_create')
+    error = pc._guardar_pedido(_item(pc, ('borrado', 1)))
+    assert error == (409, {'error': 'Stock insuficiente', 'productos': ['borrado']})
+
+
+def test_cancelacion_por_idempotencia(importar, tablas):
+    pc = importar('pedido_create')
+    idem = importar('idempotencia')
+    _producto(tablas, 'p01', stock=5)
+    # Nadie reservó la clave: la acción extra (estado = en_curso) falla
+    extra = [idem.accion_completar('c@x.com#k1', 'h', 201, {})]
+
+    code, cuerpo = pc._guardar_pedido(_item(pc, ('p01', 1)), extra)
+
+    assert code == 409 and 'procesando' in cuerpo['error']
+    assert _stock(tablas, 'p01') == 5
+
+
+def test_idempotency_key_crea_un_solo_pedido(importar, tablas):
+    pc = importar('pedido_create')
+    idem = importar('idempotencia')
+    _producto(tablas, 'p01', stock=5)
+    body = _body(('p01', 1))
+    registro, hue = idem.clave_registro('c@x.com', 'k1'), idem.huella(body)
+
+    assert idem.reservar(registro, hue, 'r1') == ('nuevo', None)
+    code, primera = pc._crear_pedido(body, 'c@x.com', registro, hue)
+    assert code == 201
+
+    resultado, previo = idem.reservar(registro, hue, 'r1')
+    assert resultado == 'repetido'
+    # La repetición devuelve exactamente el cuerpo de la primera, con números
+    repetida = idem.respuesta_guardada(previo)[1]
+    assert repetida == json.loads(pc._resp(code, primera)['body'])
+    assert repetida['pedido']['costo'] == 10.5 and isinstance(repetida['pedido']['costo'], float)
+    assert isinstance(repetida['pedido']['productos'][0]['precio'], float)
+    assert len(tablas['pedidos'].scan()['Items']) == 1
+    assert _stock(tablas, 'p01') == 4
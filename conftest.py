@@ -0,0 +1,84 @@
+import os
+import sys
+import importlib
+import pytest
+
+# Fixtures compartidos por las pruebas de cada servicio (<servicio>/tests/),
+# con moto (pip install -r Dependencias/requirements-dev.txt).
+# Cada servicio tiene sus propias copias de los helpers (json_helper,
+# event_helper, ...): importar carga los módulos desde el servicio de la
+# prueba y saca del sys.modules los del mismo nombre que haya cargado otro.
+# Las variables propias de cada servicio van en su fixture `entorno`.
+ENTORNO_AWS = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+}
+
+
+def _es_local(nombre, modulo, servicio):
+    archivo = getattr(modulo, '__file__', None) or ''
+    if archivo.startswith(os.path.join(servicio, 'tests') + os.sep):
+        return False
+    raiz = nombre.split('.')[0]
+    return (
+        archivo.startswith(servicio + os.sep) or
+        os.path.exists(os.path.join(servicio, raiz + '.py')) or
+        os.path.isdir(os.path.join(servicio, raiz))
+    )
+
+
+@pytest.fixture
+def entorno():
+    """Variables de entorno del servicio; cada tests/conftest.py lo redefine."""
+    return {}
+
+
+@pytest.fixture
+def importar(request, monkeypatch, entorno):
+    """importar('modulo') -> módulo recién cargado desde el servicio de la prueba."""
+    from moto import mock_aws
+
+    servicio = os.path.dirname(os.path.dirname(str(request.path)))
+    for clave, valor in {**ENTORNO_AWS, **entorno}.items():
+        monkeypatch.setenv(clave, valor)
+    monkeypatch.syspath_prepend(servicio)
+    for nombre, modulo in list(sys.modules.items()):
+        if _es_local(nombre, modulo, servicio):
+            monkeypatch.delitem(sys.modules, nombre)
+
+    with mock_aws():
+        yield importlib.import_module
+
+
+@pytest.fixture
+def crear_tabla(importar):
+    """crear_tabla('Pedidos', 'local_id', 'pedido_id') -> tabla on-demand con claves S."""
+    import boto3
+    dynamodb = boto3.resource('dynamodb')
+
+    def crear(nombre, *claves):
+        return dynamodb.create_table(
+            TableName=nombre,
+            KeySchema=[{'AttributeName': c, 'KeyType': t} for c, t in zip(claves, ('HASH', 'RANGE'))],
+            AttributeDefinitions=[{'AttributeName': c, 'AttributeType': 'S'} for c in claves],
+            BillingMode='PAY_PER_REQUEST'
+        )
+    return crear
+
+
+@pytest.fixture
+def llamadas_aws(importar):
+    """
+    [(servicio, operación, tabla)] de cada llamada AWS de los clientes creados
+    después de pedir el fixture (importar los módulos en la prueba).
+    """
+    import boto3
+    llamadas = []
+
+    def registrar(model, params, **kwargs):
+        llamadas.append((model.service_model.service_name, model.name, params.get('TableName')))
+
+    boto3.setup_default_session()
+    boto3.DEFAULT_SESSION.events.register('before-parameter-build', registrar)
+    return llamadas
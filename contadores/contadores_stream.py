@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+from collections import Counter
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+
+# === ENV ===
+TABLE_CONTADORES = os.environ.get("TABLE_CONTADORES", "TABLE_CONTADORES")
+TABLE_EMPLEADOS  = os.environ.get("TABLE_EMPLEADOS", "TABLE_EMPLEADOS")
+TABLE_PRODUCTOS  = os.environ.get("TABLE_PRODUCTOS", "TABLE_PRODUCTOS")
+TABLE_PEDIDOS    = os.environ.get("TABLE_PEDIDOS", "TABLE_PEDIDOS")
+
+# tabla origen -> (entidad, atributo por el que se desglosa)
+ENTIDADES = {
+    TABLE_EMPLEADOS: ("empleados", "role"),
+    TABLE_PRODUCTOS: ("productos", "categoria"),
+    TABLE_PEDIDOS:   ("pedidos", "estado"),
+}
+
+# === AWS ===
+dynamodb = boto3.resource("dynamodb")
+t_contadores = dynamodb.Table(TABLE_CONTADORES)
+
+_deserializer = TypeDeserializer()
+
+
+# ---------- helpers ----------
+def claves_contador(entidad, campo, item):
+    """Atributos del item de contadores que suma un registro: total y desglose."""
+    claves = [entidad]
+    valor = item.get(campo)
+    if valor:
+        claves.append(f"{entidad}#{valor}")
+    return claves
+
+
+def _tabla_origen(event_source_arn):
+    # arn:aws:dynamodb:<region>:<cuenta>:table/<tabla>/stream/<fecha>
+    try:
+        return event_source_arn.split(":table/", 1)[1].split("/", 1)[0]
+    except (AttributeError, IndexError):
+        return None
+
+
+def _imagen(record, nombre):
+    raw = record.get("dynamodb", {}).get(nombre)
+    if not raw:
+        return None
+    return {k: _deserializer.deserialize(v) for k, v in raw.items()}
+
+
+def deltas_de_record(record):
+    """
+    Calcula (local_id, {atributo: delta}) para un registro del stream.
+    INSERT suma la imagen nueva, REMOVE resta la vieja y MODIFY hace ambas,
+    así un cambio de estado/rol/categoria mueve el conteo sin tocar el total.
+    """
+    entidad = ENTIDADES.get(_tabla_origen(record.get("eventSourceARN")))
+    if not entidad:
+        return None, {}
+    nombre, campo = entidad
+
+    vieja = _imagen(record, "OldImage")
+    nueva = _imagen(record, "NewImage")
+
+    deltas = Counter()
+    if vieja:
+        for clave in claves_contador(nombre, campo, vieja):
+            deltas[clave] -= 1
+    if nueva:
+        for clave in claves_contador(nombre, campo, nueva):
+            deltas[clave] += 1
+
+    local_id = (nueva or vieja or {}).get("local_id")
+    return local_id, {k: v for k, v in deltas.items() if v}
+
+
+def aplicar_deltas(local_id, deltas):
+    """Un solo update_item con ADD atómico por registro."""
+    nombres, valores, partes = {}, {}, []
+    for i, (atributo, delta) in enumerate(sorted(deltas.items())):
+        nombres[f"#a{i}"] = atributo
+        valores[f":d{i}"] = delta
+        partes.append(f"#a{i} :d{i}")
+    t_contadores.update_item(
+        Key={"local_id": local_id},
+        UpdateExpression="ADD " + ", ".join(partes),
+        ExpressionAttributeNames=nombres,
+        ExpressionAttributeValues=valores
+    )
+
+
+# ---------- handler ----------
+def lambda_handler(event, context):
+    """
+    Consumidor de los streams de Empleados, Productos y Pedidos.
+    Los registros se aplican en orden; ante un error se reporta ese registro
+    (ReportBatchItemFailures) para que Lambda reintente desde ahí sin volver
+    a sumar los anteriores.
+    """
+    procesados = 0
+    for record in event.get("Records", []):
+        # Cualquier error (también un registro que no se puede deserializar)
+        # se reporta: si se propaga, Lambda reintenta el lote completo
+        try:
+            local_id, deltas = deltas_de_record(record)
+            if not local_id or not deltas:
+                continue
+            aplicar_deltas(local_id, deltas)
+            procesados += 1
+        except Exception as e:
+            print(f"Error aplicando contadores ({record.get('eventID')}): {e}")
+            seq = record.get("dynamodb", {}).get("SequenceNumber")
+            return {"batchItemFailures": [{"itemIdentifier": seq}]}
+
+    print(f"Contadores actualizados: {procesados} registro(s)")
+    return {"batchItemFailures": []}
+
+
+# ---------- replay local ----------
+if __name__ == "__main__":
+    # Reproduce registros de stream guardados en JSON ({"Records": [...]}).
+    #   python contadores_stream.py registros.json            -> muestra los deltas
+    #   python contadores_stream.py registros.json --aplicar  -> además los escribe
+    if len(sys.argv) < 2:
+        print("Uso: python contadores_stream.py <registros.json> [--aplicar]")
+        sys.exit(1)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        evento = json.load(f)
+
+    if "--aplicar" in sys.argv:
+        print(json.dumps(lambda_handler(evento, None), indent=2))
+    else:
+        acumulado = {}
+        for record in evento.get("Records", []):
+            local_id, deltas = deltas_de_record(record)
+            print(f"{record.get('eventName')}: {local_id} {deltas}")
+            if local_id:
+                acumulado.setdefault(local_id, Counter()).update(deltas)
+        print("\nTotal por local:")
+        for local_id, deltas in acumulado.items():
+            print(f"  {local_id}: {dict((k, v) for k, v in deltas.items() if v)}")
@@ -0,0 +1,86 @@
+import json
+from collections import Counter
+from contadores_stream import ENTIDADES, claves_contador, aplicar_deltas, t_contadores, dynamodb
+
+
+def _contar_tabla(table_name, entidad, campo, acumulado):
+    """Scan paginado proyectando solo local_id y el campo de desglose."""
+    table = dynamodb.Table(table_name)
+    scan_args = {
+        "ProjectionExpression": "local_id, #c",
+        "ExpressionAttributeNames": {"#c": campo}
+    }
+    leidos = 0
+    while True:
+        r = table.scan(**scan_args)
+        for item in r.get("Items", []):
+            local_id = item.get("local_id")
+            if not local_id:
+                continue
+            acumulado.setdefault(local_id, Counter()).update(claves_contador(entidad, campo, item))
+            leidos += 1
+        lek = r.get("LastEvaluatedKey")
+        if not lek:
+            break
+        scan_args["ExclusiveStartKey"] = lek
+    return leidos
+
+
+def _es_contador(atributo):
+    return any(atributo == e or atributo.startswith(f"{e}#") for e, _ in ENTIDADES.values())
+
+
+def _contadores_actuales():
+    """local_id -> {atributo contador: valor}. Ignora el resto (empleados_version)."""
+    actuales = {}
+    scan_args = {}
+    while True:
+        r = t_contadores.scan(**scan_args)
+        for it in r.get("Items", []):
+            actuales[it["local_id"]] = {k: int(v) for k, v in it.items() if _es_contador(k)}
+        lek = r.get("LastEvaluatedKey")
+        if not lek:
+            break
+        scan_args["ExclusiveStartKey"] = lek
+    return actuales
+
+
+def lambda_handler(event, context):
+    """
+    Corrige la deriva de la tabla de contadores que puedan dejar reintentos
+    del stream, comparándola con un scan de las tablas origen.
+
+    Los contadores se leen ANTES del scan y la corrección se aplica con ADD
+    de la diferencia (aplicar_deltas), no reescribiendo el item: los ADD del
+    stream que lleguen mientras tanto se conservan, igual que el sello
+    empleados_version. Los registros que lleguen por el stream durante el
+    scan pueden quedar contados dos veces hasta la siguiente ejecución.
+    """
+    actuales = _contadores_actuales()
+
+    acumulado = {}
+    leidos = {}
+    for table_name, (entidad, campo) in ENTIDADES.items():
+        leidos[entidad] = _contar_tabla(table_name, entidad, campo, acumulado)
+
+    corregidos = 0
+    # Locales que ya no tienen registros quedan en cero
+    for local_id in set(actuales) | set(acumulado):
+        contado = acumulado.get(local_id, Counter())
+        actual = actuales.get(local_id, {})
+        deltas = {}
+        for atributo in set(contado) | set(actual):
+            delta = contado.get(atributo, 0) - actual.get(atributo, 0)
+            if delta:
+                deltas[atributo] = delta
+        if deltas:
+            aplicar_deltas(local_id, deltas)
+            corregidos += 1
+
+    resumen = {"locales": len(set(actuales) | set(acumulado)), "corregidos": corregidos, "leidos": leidos}
+    print(f"Contadores reconciliados: {json.dumps(resumen)}")
+    return resumen
+
+
+if __name__ == "__main__":
+    print(json.dumps(lambda_handler({}, None), indent=2))
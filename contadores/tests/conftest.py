@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.fixture
+def entorno():
+    return {
+        'TABLE_CONTADORES': 'Contadores',
+        'TABLE_EMPLEADOS': 'Empleados',
+        'TABLE_PRODUCTOS': 'Productos',
+        'TABLE_PEDIDOS': 'Pedidos',
+    }
+
+
+@pytest.fixture
+def contadores(crear_tabla):
+    return crear_tabla('Contadores', 'local_id')
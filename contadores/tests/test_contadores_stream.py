@@ -0,0 +1,36 @@
+ARN_PEDIDOS = 'arn:aws:dynamodb:us-east-1:123456789012:table/Pedidos/stream/2026-01-01T00:00:00.000'
+
+
+def _insert(seq, estado):
+    return {
+        'eventID': f'e{seq}', 'eventName': 'INSERT', 'eventSourceARN': ARN_PEDIDOS,
+        'dynamodb': {'SequenceNumber': seq, 'NewImage': {
+            'local_id': {'S': 'L1'}, 'pedido_id': {'S': f'P{seq}'}, 'estado': estado
+        }}
+    }
+
+
+def test_cuenta_insert_y_modify(importar, contadores):
+    cs = importar('contadores_stream')
+    modify = _insert('2', {'S': 'cocinando'})
+    modify['eventName'] = 'MODIFY'
+    modify['dynamodb']['NewImage']['pedido_id'] = {'S': 'P1'}
+    modify['dynamodb']['OldImage'] = _insert('1', {'S': 'procesando'})['dynamodb']['NewImage']
+
+    r = cs.lambda_handler({'Records': [_insert('1', {'S': 'procesando'}), modify]}, None)
+
+    assert r == {'batchItemFailures': []}
+    item = contadores.get_item(Key={'local_id': 'L1'})['Item']
+    assert (item['pedidos'], item['pedidos#procesando'], item['pedidos#cocinando']) == (1, 0, 1)
+
+
+def test_registro_ilegible_se_reporta_y_corta_el_lote(importar, contadores):
+    cs = importar('contadores_stream')
+    # Tipo desconocido: TypeDeserializer lanza TypeError, no ClientError
+    registros = [_insert('1', {'S': 'procesando'}), _insert('2', {'X': '?'}), _insert('3', {'S': 'procesando'})]
+
+    r = cs.lambda_handler({'Records': registros}, None)
+
+    assert r == {'batchItemFailures': [{'itemIdentifier': '2'}]}
+    # Solo se aplicó el anterior al fallido; Lambda reintenta desde el 2
+    assert contadores.get_item(Key={'local_id': 'L1'})['Item']['pedidos'] == 1
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Script para crear el GSI disperso by_local_estado en la tabla de pedidos.
+Este índice contiene solo los pedidos activos (no entregados ni fallidos),
+así que listar los pedidos de un local por estado cuesta lo que hay en
+cocina/delivery y no todo el historial.
+
+Antes de crear el índice completa el atributo local_estado
+("<local_id>#<estado>") en los pedidos activos que no lo tengan; los
+pedidos terminados no lo llevan y no aparecen en el índice.
+
+Uso:
+    python crear_gsi_pedidos_activos.py
+
+Requisitos:
+    - AWS CLI configurado con credenciales
+    - Variable de entorno TABLE_PEDIDOS o editar el nombre de la tabla abajo
+"""
+
+import os
+import boto3
+import time
+
+# Nombre de la tabla (ajusta según tu .env)
+TABLE_NAME = os.environ.get("TABLE_PEDIDOS", "Millas-Pedidos")
+INDEX_NAME = "by_local_estado"
+
+# Estados en los que el pedido sale del índice (mismos que stepFunction/handlers/pedido_estado.py)
+ESTADOS_TERMINALES = {"entrega_delivery", "recibido", "fallido"}
+
+def backfill_local_estado():
+    """Escribe local_estado en los pedidos activos que aún no lo tienen"""
+    table = boto3.resource('dynamodb').Table(TABLE_NAME)
+    scan_args = {
+        "ProjectionExpression": "local_id, pedido_id, estado",
+        "FilterExpression": "attribute_not_exists(local_estado)"
+    }
+    total = 0
+    print(f"Completando local_estado en '{TABLE_NAME}'...")
+    while True:
+        r = table.scan(**scan_args)
+        for item in r.get("Items", []):
+            if not item.get("estado") or item["estado"] in ESTADOS_TERMINALES:
+                continue
+            table.update_item(
+                Key={"local_id": item["local_id"], "pedido_id": item["pedido_id"]},
+                UpdateExpression="SET local_estado = :le",
+                ExpressionAttributeValues={":le": f"{item['local_id']}#{item['estado']}"}
+            )
+            total += 1
+        lek = r.get("LastEvaluatedKey")
+        if not lek:
+            break
+        scan_args["ExclusiveStartKey"] = lek
+    print(f"✓ {total} pedidos activos actualizados")
+
+def create_gsi():
+    """Crea el GSI by_local_estado en la tabla de pedidos"""
+    dynamodb = boto3.client('dynamodb')
+    
+    print(f"Creando GSI '{INDEX_NAME}' en la tabla '{TABLE_NAME}'...")
+    
+    try:
+        response = dynamodb.update_table(
+            TableName=TABLE_NAME,
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'local_estado',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'created_at',
+                    'AttributeType': 'S'
+                }
+            ],
+            GlobalSecondaryIndexUpdates=[
+                {
+                    'Create': {
+                        'IndexName': INDEX_NAME,
+                        'KeySchema': [
+                            {
+                                'AttributeName': 'local_estado',
+                                'KeyType': 'HASH'  # Partition key
+                            },
+                            {
+                                'AttributeName': 'created_at',
+                                'KeyType': 'RANGE'  # Sort key
+                            }
+                        ],
+                        'Projection': {
+                            'ProjectionType': 'ALL'  # Incluye todos los atributos
+                        },
+                        'ProvisionedThroughput': {
+                            'ReadCapacityUnits': 5,
+                            'WriteCapacityUnits': 5
+                        }
+                    }
+                }
+            ]
+        )
+        
+        print("✓ Solicitud de creación enviada exitosamente")
+        print(f"  Estado de la tabla: {response['TableDescription']['TableStatus']}")
+        print("\nEsperando a que el índice se cree...")
+        print("Esto puede tomar varios minutos dependiendo del tamaño de la tabla.")
+        
+        # Esperar a que el índice esté activo
+        waiter = dynamodb.get_waiter('table_exists')
+        waiter.wait(TableName=TABLE_NAME)
+        
+        # Verificar el estado del GSI
+        while True:
+            table_info = dynamodb.describe_table(TableName=TABLE_NAME)
+            gsi_status = None
+            
+            if 'GlobalSecondaryIndexes' in table_info['Table']:
+                for gsi in table_info['Table']['GlobalSecondaryIndexes']:
+                    if gsi['IndexName'] == INDEX_NAME:
+                        gsi_status = gsi['IndexStatus']
+                        break
+            
+            if gsi_status == 'ACTIVE':
+                print(f"\n✓ ¡GSI '{INDEX_NAME}' creado exitosamente!")
+                print("\nAhora puedes usar queries eficientes por estado:")
+                print("  - Partition Key: local_estado")
+                print("  - Sort Key: created_at")
+                break
+            elif gsi_status == 'CREATING':
+                print(".", end="", flush=True)
+                time.sleep(10)
+            else:
+                print(f"\n⚠ Estado inesperado del GSI: {gsi_status}")
+                break
+                
+    except dynamodb.exceptions.ResourceInUseException:
+        print("⚠ La tabla está siendo actualizada. Espera un momento e intenta de nuevo.")
+    except dynamodb.exceptions.LimitExceededException:
+        print("⚠ Has alcanzado el límite de GSIs para esta tabla (máximo 20).")
+    except Exception as e:
+        print(f"✗ Error al crear el GSI: {e}")
+        return False
+    
+    return True
+
+def verify_gsi():
+    """Verifica que el GSI existe y está activo"""
+    dynamodb = boto3.client('dynamodb')
+    
+    try:
+        response = dynamodb.describe_table(TableName=TABLE_NAME)
+        
+        if 'GlobalSecondaryIndexes' not in response['Table']:
+            print(f"La tabla '{TABLE_NAME}' no tiene GSIs.")
+            return False
+        
+        for gsi in response['Table']['GlobalSecondaryIndexes']:
+            if gsi['IndexName'] == INDEX_NAME:
+                print(f"\n✓ GSI '{INDEX_NAME}' encontrado:")
+                print(f"  Estado: {gsi['IndexStatus']}")
+                print(f"  Partition Key: {gsi['KeySchema'][0]['AttributeName']}")
+                print(f"  Sort Key: {gsi['KeySchema'][1]['AttributeName']}")
+                return gsi['IndexStatus'] == 'ACTIVE'
+        
+        print(f"GSI '{INDEX_NAME}' no encontrado en la tabla '{TABLE_NAME}'.")
+        return False
+        
+    except Exception as e:
+        print(f"Error al verificar el GSI: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Creador de GSI de Pedidos Activos")
+    print("=" * 60)
+    print()
+    
+    # Los pedidos sin local_estado no entran al índice
+    backfill_local_estado()
+    
+    # Verificar si ya existe
+    if verify_gsi():
+        print("\n✓ El GSI ya existe y está activo. No es necesario crearlo.")
+    else:
+        print("\nEl GSI no existe. Procediendo a crearlo...\n")
+        if create_gsi():
+            print("\n" + "=" * 60)
+            print("Proceso completado exitosamente")
+            print("=" * 60)
+        else:
+            print("\n" + "=" * 60)
+            print("El proceso falló. Revisa los errores arriba.")
+            print("=" * 60)
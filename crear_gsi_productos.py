@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Script para crear el GSI by_local_categoria en la tabla de productos.
+Este índice permite listar productos de una categoría de un local sin
+FilterExpression, ordenados por precio.
+
+Antes de crear el índice completa el atributo local_categoria
+("<local_id>#<categoria>") en los productos que no lo tengan; los que no
+lo tienen no aparecen en el índice.
+
+Uso:
+    python crear_gsi_productos.py
+
+Requisitos:
+    - AWS CLI configurado con credenciales
+    - Variable de entorno TABLE_PRODUCTOS o editar el nombre de la tabla abajo
+"""
+
+import os
+import boto3
+import time
+
+# Nombre de la tabla (ajusta según tu .env)
+TABLE_NAME = os.environ.get("TABLE_PRODUCTOS", "Millas-Productos")
+INDEX_NAME = "by_local_categoria"
+
+def backfill_local_categoria():
+    """Escribe local_categoria en los productos que aún no lo tienen"""
+    table = boto3.resource('dynamodb').Table(TABLE_NAME)
+    scan_args = {
+        "ProjectionExpression": "local_id, producto_id, categoria",
+        "FilterExpression": "attribute_not_exists(local_categoria)"
+    }
+    total = 0
+    print(f"Completando local_categoria en '{TABLE_NAME}'...")
+    while True:
+        r = table.scan(**scan_args)
+        for item in r.get("Items", []):
+            if not item.get("categoria"):
+                continue
+            table.update_item(
+                Key={"local_id": item["local_id"], "producto_id": item["producto_id"]},
+                UpdateExpression="SET local_categoria = :lc",
+                ExpressionAttributeValues={":lc": f"{item['local_id']}#{item['categoria']}"}
+            )
+            total += 1
+        lek = r.get("LastEvaluatedKey")
+        if not lek:
+            break
+        scan_args["ExclusiveStartKey"] = lek
+    print(f"✓ {total} productos actualizados")
+
+def create_gsi():
+    """Crea el GSI by_local_categoria en la tabla de productos"""
+    dynamodb = boto3.client('dynamodb')
+    
+    print(f"Creando GSI '{INDEX_NAME}' en la tabla '{TABLE_NAME}'...")
+    
+    try:
+        response = dynamodb.update_table(
+            TableName=TABLE_NAME,
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'local_categoria',
+                    'AttributeType': 'S'
+                },
+                {
+                    'AttributeName': 'precio',
+                    'AttributeType': 'N'
+                }
+            ],
+            GlobalSecondaryIndexUpdates=[
+                {
+                    'Create': {
+                        'IndexName': INDEX_NAME,
+                        'KeySchema': [
+                            {
+                                'AttributeName': 'local_categoria',
+                                'KeyType': 'HASH'  # Partition key
+                            },
+                            {
+                                'AttributeName': 'precio',
+                                'KeyType': 'RANGE'  # Sort key
+                            }
+                        ],
+                        'Projection': {
+                            'ProjectionType': 'ALL'  # Incluye todos los atributos
+                        }
+                    }
+                }
+            ]
+        )
+        
+        print("✓ Solicitud de creación enviada exitosamente")
+        print(f"  Estado de la tabla: {response['TableDescription']['TableStatus']}")
+        print("\nEsperando a que el índice se cree...")
+        print("Esto puede tomar varios minutos dependiendo del tamaño de la tabla.")
+        
+        # Esperar a que el índice esté activo
+        waiter = dynamodb.get_waiter('table_exists')
+        waiter.wait(TableName=TABLE_NAME)
+        
+        # Verificar el estado del GSI
+        while True:
+            table_info = dynamodb.describe_table(TableName=TABLE_NAME)
+            gsi_status = None
+            
+            if 'GlobalSecondaryIndexes' in table_info['Table']:
+                for gsi in table_info['Table']['GlobalSecondaryIndexes']:
+                    if gsi['IndexName'] == INDEX_NAME:
+                        gsi_status = gsi['IndexStatus']
+                        break
+            
+            if gsi_status == 'ACTIVE':
+                print(f"\n✓ ¡GSI '{INDEX_NAME}' creado exitosamente!")
+                print("\nAhora puedes usar queries eficientes por categoría:")
+                print("  - Partition Key: local_categoria")
+                print("  - Sort Key: precio")
+                break
+            elif gsi_status == 'CREATING':
+                print(".", end="", flush=True)
+                time.sleep(10)
+            else:
+                print(f"\n⚠ Estado inesperado del GSI: {gsi_status}")
+                break
+                
+    except dynamodb.exceptions.ResourceInUseException:
+        print("⚠ La tabla está siendo actualizada. Espera un momento e intenta de nuevo.")
+    except dynamodb.exceptions.LimitExceededException:
+        print("⚠ Has alcanzado el límite de GSIs para esta tabla (máximo 20).")
+    except Exception as e:
+        print(f"✗ Error al crear el GSI: {e}")
+        return False
+    
+    return True
+
+def verify_gsi():
+    """Verifica que el GSI existe y está activo"""
+    dynamodb = boto3.client('dynamodb')
+    
+    try:
+        response = dynamodb.describe_table(TableName=TABLE_NAME)
+        
+        if 'GlobalSecondaryIndexes' not in response['Table']:
+            print(f"La tabla '{TABLE_NAME}' no tiene GSIs.")
+            return False
+        
+        for gsi in response['Table']['GlobalSecondaryIndexes']:
+            if gsi['IndexName'] == INDEX_NAME:
+                print(f"\n✓ GSI '{INDEX_NAME}' encontrado:")
+                print(f"  Estado: {gsi['IndexStatus']}")
+                print(f"  Partition Key: {gsi['KeySchema'][0]['AttributeName']}")
+                print(f"  Sort Key: {gsi['KeySchema'][1]['AttributeName']}")
+                return gsi['IndexStatus'] == 'ACTIVE'
+        
+        print(f"GSI '{INDEX_NAME}' no encontrado en la tabla '{TABLE_NAME}'.")
+        return False
+        
+    except Exception as e:
+        print(f"Error al verificar el GSI: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Creador de GSI para Tabla de Productos")
+    print("=" * 60)
+    print()
+    
+    # Los productos sin local_categoria no entran al índice
+    backfill_local_categoria()
+    
+    # Verificar si ya existe
+    if verify_gsi():
+        print("\n✓ El GSI ya existe y está activo. No es necesario crearlo.")
+    else:
+        print("\nEl GSI no existe. Procediendo a crearlo...\n")
+        if create_gsi():
+            print("\n" + "=" * 60)
+            print("Proceso completado exitosamente")
+            print("=" * 60)
+        else:
+            print("\n" + "=" * 60)
+            print("El proceso falló. Revisa los errores arriba.")
+            print("=" * 60)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Script para crear y poblar el índice de búsqueda por nombre de productos.
+Crea la tabla TABLE_BUSQUEDA_PRODUCTOS (si no existe) y reindexa todos los
+productos existentes, que no pasaron por product_create.
+
+Uso:
+    python crear_indice_busqueda_productos.py
+
+Requisitos:
+    - AWS CLI configurado con credenciales
+    - Variables de entorno TABLE_PRODUCTOS y TABLE_BUSQUEDA_PRODUCTOS
+"""
+
+import os
+import sys
+import boto3
+
+# Nombres de las tablas (ajusta según tu .env)
+TABLE_PRODUCTOS = os.environ.get("TABLE_PRODUCTOS", "Millas-Productos")
+TABLE_NAME = os.environ.setdefault("TABLE_BUSQUEDA_PRODUCTOS", "Millas-Busqueda-Productos")
+
+# Misma normalización y prefijos que usa el servicio de productos
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "products"))
+from busqueda import indexar  # noqa: E402
+
+
+def create_table():
+    """Crea la tabla del índice (PK clave, SK producto_id)"""
+    dynamodb = boto3.client('dynamodb')
+
+    try:
+        dynamodb.describe_table(TableName=TABLE_NAME)
+        print(f"✓ La tabla '{TABLE_NAME}' ya existe")
+        return True
+    except dynamodb.exceptions.ResourceNotFoundException:
+        pass
+
+    print(f"Creando tabla '{TABLE_NAME}'...")
+    try:
+        dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {'AttributeName': 'clave', 'KeyType': 'HASH'},         # <local_id>#<prefijo>
+                {'AttributeName': 'producto_id', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'clave', 'AttributeType': 'S'},
+                {'AttributeName': 'producto_id', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        dynamodb.get_waiter('table_exists').wait(TableName=TABLE_NAME)
+        print("✓ Tabla creada")
+        return True
+    except Exception as e:
+        print(f"✗ Error al crear la tabla: {e}")
+        return False
+
+
+def backfill():
+    """Recorre la tabla de productos y escribe sus entradas en el índice"""
+    table = boto3.resource('dynamodb').Table(TABLE_PRODUCTOS)
+    scan_args = {
+        "ProjectionExpression": "local_id, producto_id, nombre, categoria"
+    }
+    total = 0
+    while True:
+        r = table.scan(**scan_args)
+        for producto in r.get("Items", []):
+            indexar(producto)
+            total += 1
+            if total % 50 == 0:
+                print(".", end="", flush=True)
+        lek = r.get("LastEvaluatedKey")
+        if not lek:
+            break
+        scan_args["ExclusiveStartKey"] = lek
+    print(f"\n✓ {total} productos indexados")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Índice de Búsqueda de Productos")
+    print("=" * 60)
+    print()
+
+    if create_table() and backfill():
+        print("\n" + "=" * 60)
+        print("Proceso completado exitosamente")
+        print("=" * 60)
+    else:
+        print("\n" + "=" * 60)
+        print("El proceso falló. Revisa los errores arriba.")
+        print("=" * 60)
@@ -0,0 +1,56 @@
+import os
+import time
+import random
+import boto3
+
+PRODUCTS_TABLE = os.environ.get("PRODUCTS_TABLE", "PRODUCTS_TABLE")
+
+BATCH_GET_CHUNK = 100         # límite de BatchGetItem por request
+BATCH_GET_MAX_RETRIES = 5
+BATCH_GET_BACKOFF_BASE = 0.05  # segundos; se duplica por intento, con jitter
+BATCH_GET_BACKOFF_MAX = 1.0
+
+dynamodb = boto3.resource("dynamodb")
+
+
+def _projection(fields):
+    """ProjectionExpression con las claves siempre incluidas (para mapear la respuesta)."""
+    nombres = {}
+    partes = []
+    for i, f in enumerate(dict.fromkeys(["local_id", "producto_id", *fields])):
+        nombres[f"#p{i}"] = f
+        partes.append(f"#p{i}")
+    return {"ProjectionExpression": ", ".join(partes), "ExpressionAttributeNames": nombres}
+
+
+def batch_get_productos(keys, fields=None):
+    """
+    Lee productos por (local_id, producto_id) con BatchGetItem en bloques de
+    BATCH_GET_CHUNK. Reintenta UnprocessedKeys con backoff exponencial.
+
+    Retorna:
+        (encontrados: dict[(local_id, producto_id)] -> item,
+         no_procesados: list[dict] claves que siguieron sin procesar)
+    """
+    unicas = list({(k["local_id"], k["producto_id"]): k for k in keys}.values())
+    encontrados, no_procesados = {}, []
+    extra = _projection(fields) if fields else {}
+
+    for i in range(0, len(unicas), BATCH_GET_CHUNK):
+        request = {PRODUCTS_TABLE: {"Keys": unicas[i:i + BATCH_GET_CHUNK], **extra}}
+        intento = 0
+        while request:
+            r = dynamodb.batch_get_item(RequestItems=request)
+            for it in r.get("Responses", {}).get(PRODUCTS_TABLE, []):
+                encontrados[(it["local_id"], it["producto_id"])] = it
+            request = r.get("UnprocessedKeys") or None
+            if not request:
+                break
+            intento += 1
+            if intento > BATCH_GET_MAX_RETRIES:
+                no_procesados.extend(request[PRODUCTS_TABLE]["Keys"])
+                break
+            espera = min(BATCH_GET_BACKOFF_BASE * (2 ** intento), BATCH_GET_BACKOFF_MAX)
+            time.sleep(espera * random.uniform(0.5, 1.0))
+
+    return encontrados, no_procesados
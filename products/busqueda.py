@@ -0,0 +1,107 @@
+import os
+import unicodedata
+import boto3
+from boto3.dynamodb.conditions import Key, Attr
+
+# Índice invertido de nombres de producto (tabla propia):
+#   PK clave = "<local_id>#<prefijo>"   SK producto_id
+# Cada palabra del nombre (minúsculas, sin tildes) aporta todos sus prefijos
+# desde MIN_PREFIJO caracteres, así que "cev" y "ceviche" caen en la misma
+# búsqueda de una sola query. Lo mantienen product_create/update/delete.
+TABLE_BUSQUEDA_PRODUCTOS = os.environ.get("TABLE_BUSQUEDA_PRODUCTOS", "TABLE_BUSQUEDA_PRODUCTOS")
+
+MIN_PREFIJO = 2
+MAX_PREFIJO = 20
+
+dynamodb = boto3.resource("dynamodb")
+t_busqueda = dynamodb.Table(TABLE_BUSQUEDA_PRODUCTOS)
+
+
+def normalizar(texto) -> str:
+    """Minúsculas, sin tildes/diacríticos y con separadores como espacio."""
+    if not isinstance(texto, str):
+        return ""
+    sin_tildes = "".join(
+        ch for ch in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(ch)
+    )
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in sin_tildes.lower()).split())
+
+
+def palabras(texto):
+    return normalizar(texto).split()
+
+
+def prefijos(nombre):
+    """Conjunto de prefijos indexados para un nombre de producto."""
+    out = set()
+    for palabra in palabras(nombre):
+        for n in range(MIN_PREFIJO, min(len(palabra), MAX_PREFIJO) + 1):
+            out.add(palabra[:n])
+    return out
+
+
+def _clave(local_id, prefijo):
+    return f"{local_id}#{prefijo}"
+
+
+def _entrada(producto, prefijo):
+    return {
+        "clave": _clave(producto["local_id"], prefijo),
+        "producto_id": producto["producto_id"],
+        "local_id": producto["local_id"],
+        "categoria": producto.get("categoria"),
+        # con espacio inicial para filtrar por inicio de palabra con contains
+        "nombre_norm": " " + normalizar(producto.get("nombre")),
+    }
+
+
+def reindexar(anterior, nuevo):
+    """
+    Sincroniza el índice entre dos versiones de un producto (None = no existe).
+    Solo reescribe lo necesario: si cambia el nombre o la categoría.
+    """
+    viejos = prefijos(anterior.get("nombre")) if anterior else set()
+    nuevos = prefijos(nuevo.get("nombre")) if nuevo else set()
+    if anterior and nuevo and viejos == nuevos and anterior.get("categoria") == nuevo.get("categoria"):
+        return
+
+    with t_busqueda.batch_writer() as batch:
+        for p in viejos - nuevos:
+            batch.delete_item(Key={"clave": _clave(anterior["local_id"], p), "producto_id": anterior["producto_id"]})
+        for p in nuevos:
+            batch.put_item(Item=_entrada(nuevo, p))
+
+
+def indexar(producto):
+    reindexar(None, producto)
+
+
+def desindexar(producto):
+    reindexar(producto, None)
+
+
+def consulta_nombre(local_id, nombre, categoria=None):
+    """
+    Argumentos de query para buscar por nombre, o None si el texto no tiene
+    ninguna palabra indexable. La palabra más larga va a la clave; el resto
+    (y la categoría) se filtran dentro de la partición, que ya solo contiene
+    productos que coinciden.
+    """
+    ps = [p for p in palabras(nombre) if len(p) >= MIN_PREFIJO]
+    if not ps:
+        return None
+    principal = max(ps, key=len)
+    args = {"KeyConditionExpression": Key("clave").eq(_clave(local_id, principal[:MAX_PREFIJO]))}
+
+    filtro = None
+    for p in ps:
+        if p == principal and len(p) <= MAX_PREFIJO:
+            continue
+        cond = Attr("nombre_norm").contains(" " + p)
+        filtro = cond if filtro is None else filtro & cond
+    if categoria:
+        cond = Attr("categoria").eq(categoria)
+        filtro = cond if filtro is None else filtro & cond
+    if filtro is not None:
+        args["FilterExpression"] = filtro
+    return args
@@ -0,0 +1,84 @@
+import os
+import uuid
+import boto3
+
+# Tabla de contadores agregados: un item por local_id (PK) con atributos planos
+#   <entidad>           -> total del local (empleados, productos, pedidos)
+#   <entidad>#<valor>   -> total por rol / categoria / estado
+# La mantiene el Lambda de service-contadores desde los DynamoDB Streams.
+# El mismo item guarda empleados_version, un sello que cambia con cada alta,
+# modificación o baja de empleados del local (invalida cachés de empleados).
+TABLE_CONTADORES = os.environ.get("TABLE_CONTADORES", "")
+
+dynamodb = boto3.resource("dynamodb")
+t_contadores = dynamodb.Table(TABLE_CONTADORES) if TABLE_CONTADORES else None
+
+
+ATRIBUTO_VERSION_EMPLEADOS = "empleados_version"
+
+
+def atributo_contador(entidad, valor=None):
+    return f"{entidad}#{valor}" if valor else entidad
+
+
+def contadores_habilitados() -> bool:
+    return t_contadores is not None
+
+
+def leer_total(entidad, local_id=None, valor=None):
+    """
+    Total mantenido para la entidad (opcionalmente filtrada por valor).
+    Con local_id es un get_item; sin local_id suma los items de la tabla
+    de contadores (uno por local, no uno por registro).
+
+    Retorna None si la tabla de contadores no está configurada.
+    """
+    if not contadores_habilitados():
+        return None
+    atributo = atributo_contador(entidad, valor)
+
+    if local_id:
+        r = t_contadores.get_item(
+            Key={"local_id": local_id},
+            ProjectionExpression="#a",
+            ExpressionAttributeNames={"#a": atributo}
+        )
+        return int((r.get("Item") or {}).get(atributo, 0))
+
+    total = 0
+    scan_args = {"ProjectionExpression": "#a", "ExpressionAttributeNames": {"#a": atributo}}
+    while True:
+        r = t_contadores.scan(**scan_args)
+        total += sum(int(it.get(atributo, 0)) for it in r.get("Items", []))
+        lek = r.get("LastEvaluatedKey")
+        if not lek:
+            break
+        scan_args["ExclusiveStartKey"] = lek
+    return total
+
+
+def marcar_cambio_empleados(local_id):
+    """Cambia el sello de versión de empleados del local (sin romper la operación si falla)."""
+    if not contadores_habilitados():
+        return
+    try:
+        t_contadores.update_item(
+            Key={"local_id": local_id},
+            UpdateExpression="SET #v = :v",
+            ExpressionAttributeNames={"#v": ATRIBUTO_VERSION_EMPLEADOS},
+            ExpressionAttributeValues={":v": uuid.uuid4().hex}
+        )
+    except Exception as e:
+        print(f"Error marcando versión de empleados de {local_id}: {e}")
+
+
+def leer_version_empleados(local_id):
+    """Sello actual ("" si nunca cambió), o None si la tabla no está configurada."""
+    if not contadores_habilitados():
+        return None
+    r = t_contadores.get_item(
+        Key={"local_id": local_id},
+        ProjectionExpression="#v",
+        ExpressionAttributeNames={"#v": ATRIBUTO_VERSION_EMPLEADOS}
+    )
+    return (r.get("Item") or {}).get(ATRIBUTO_VERSION_EMPLEADOS, "")
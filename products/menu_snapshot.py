@@ -0,0 +1,204 @@
+import os
+import json
+import gzip
+import time
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from json_helper import dumps_bytes
+
+# Snapshot materializado del menú de cada local, en el bucket de imágenes:
+#   s3://<PRODUCTS_BUCKET>/menus/<local_id>/menu.json.gz
+# JSON gzip con los productos ordenados por producto_id (mismo orden que la
+# query a DynamoDB, así los next_token son intercambiables). Se actualiza de
+# forma incremental en cada create/update/delete con escritura condicional
+# (If-Match) y se reconstruye completo si no existe o hay conflicto. La
+# reconstrucción también es condicional (If-None-Match al crearlo, If-Match con
+# el ETag leído antes de la query al reemplazarlo): si otra escritura llegó
+# primero se descarta, para no pisar un cambio más nuevo.
+# El stock no se guarda: pedido_create lo descuenta sin pasar por aquí, así
+# que se consulta en vivo (/productos/batch o /productos/id). product_list
+# también lo quita cuando lee de DynamoDB, para responder siempre igual.
+PRODUCTS_TABLE = os.environ.get("PRODUCTS_TABLE", "PRODUCTS_TABLE")
+PRODUCTS_BUCKET = os.environ.get("PRODUCTS_BUCKET", "")
+MENU_SNAPSHOT_PREFIX = os.environ.get("MENU_SNAPSHOT_PREFIX", "menus")
+MENU_SNAPSHOT_TTL_SECONDS = int(os.environ.get("MENU_SNAPSHOT_TTL_SECONDS", "30"))
+MENU_CACHE_CONTROL = os.environ.get("MENU_CACHE_CONTROL", "public, max-age=60")
+# Endpoint alternativo (MinIO, moto_server, localstack) para probar en local
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL") or None
+
+dynamodb = boto3.resource("dynamodb")
+s3 = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL)
+productos_table = dynamodb.Table(PRODUCTS_TABLE)
+
+# Caché por contenedor: {local_id: (etag, snapshot, leido_en)}
+_cache = {}
+
+_CONFLICTO = {"PreconditionFailed", "ConditionalRequestConflict", "412"}
+_NO_EXISTE = {"NoSuchKey", "404"}
+# Atributos que cambian fuera de products/ y no se guardan en el snapshot
+CAMPOS_EXCLUIDOS = {"stock"}
+
+
+def sin_excluidos(producto):
+    return {k: v for k, v in producto.items() if k not in CAMPOS_EXCLUIDOS}
+
+
+def snapshot_key(local_id):
+    return f"{MENU_SNAPSHOT_PREFIX}/{local_id}/menu.json.gz"
+
+
+def snapshots_habilitados() -> bool:
+    return bool(PRODUCTS_BUCKET)
+
+
+def _error_code(e):
+    return e.response.get("Error", {}).get("Code")
+
+
+def _escribir(local_id, productos, if_match=None, if_none_match=None):
+    contents = sorted((sin_excluidos(p) for p in productos), key=lambda p: p["producto_id"])
+    snapshot = {
+        "local_id": local_id,
+        "version": int(time.time() * 1000),
+        "count": len(contents),
+        "contents": contents
+    }
+    args = {
+        "Bucket": PRODUCTS_BUCKET,
+        "Key": snapshot_key(local_id),
+        # Misma conversión de Decimal que las respuestas leídas de DynamoDB
+        "Body": gzip.compress(dumps_bytes(snapshot)),
+        "ContentType": "application/json",
+        "ContentEncoding": "gzip",
+        "CacheControl": MENU_CACHE_CONTROL
+    }
+    if if_match:
+        args["IfMatch"] = if_match
+    if if_none_match:
+        args["IfNoneMatch"] = if_none_match
+    r = s3.put_object(**args)
+    _cache[local_id] = (r.get("ETag"), snapshot, time.time())
+    return snapshot
+
+
+def _leer_s3(local_id, if_none_match=None):
+    """Retorna (snapshot, etag); snapshot None si no cambió (304) o no existe."""
+    args = {"Bucket": PRODUCTS_BUCKET, "Key": snapshot_key(local_id)}
+    if if_none_match:
+        args["IfNoneMatch"] = if_none_match
+    try:
+        r = s3.get_object(**args)
+    except ClientError as e:
+        code = _error_code(e)
+        if code in ("304", "NotModified"):
+            return None, if_none_match
+        if code in _NO_EXISTE:
+            return None, None
+        raise
+    return json.loads(gzip.decompress(r["Body"].read())), r.get("ETag")
+
+
+def reconstruir(local_id, etag=None):
+    """
+    Snapshot completo desde la partición del local en DynamoDB.
+
+    etag es el del snapshot que se reemplaza, leído ANTES de la query
+    (None si no existe). Retorna el snapshot escrito, o None si otra
+    escritura cambió el objeto mientras tanto y esta se descartó.
+    """
+    productos = []
+    qargs = {"KeyConditionExpression": Key("local_id").eq(local_id)}
+    while True:
+        r = productos_table.query(**qargs)
+        productos.extend(r.get("Items", []))
+        lek = r.get("LastEvaluatedKey")
+        if not lek:
+            break
+        qargs["ExclusiveStartKey"] = lek
+    try:
+        if etag:
+            return _escribir(local_id, productos, if_match=etag)
+        return _escribir(local_id, productos, if_none_match="*")
+    except ClientError as e:
+        if _error_code(e) in _CONFLICTO:
+            print(f"Snapshot de {local_id} cambió durante la reconstrucción; se descarta")
+            return None
+        raise
+
+
+def leer_snapshot(local_id):
+    """
+    Snapshot del menú del local. Sirve desde memoria durante
+    MENU_SNAPSHOT_TTL_SECONDS; después revalida contra S3 con If-None-Match.
+    Si aún no existe lo construye.
+
+    Retorna:
+        (snapshot: dict, etag: str)
+    """
+    cached = _cache.get(local_id)
+    if cached and time.time() - cached[2] < MENU_SNAPSHOT_TTL_SECONDS:
+        return cached[1], cached[0]
+
+    snapshot, etag = _leer_s3(local_id, cached[0] if cached else None)
+    if snapshot is None and cached and etag == cached[0]:
+        _cache[local_id] = (cached[0], cached[1], time.time())
+        return cached[1], cached[0]
+    if snapshot is None:
+        snapshot = reconstruir(local_id)
+        if snapshot is not None:
+            return snapshot, _cache[local_id][0]
+        # Otro contenedor lo creó primero: servir ese
+        snapshot, etag = _leer_s3(local_id)
+        if snapshot is None:
+            raise RuntimeError(f"Snapshot de {local_id} no disponible")
+
+    _cache[local_id] = (etag, snapshot, time.time())
+    return snapshot, etag
+
+
+def aplicar_cambio(local_id, producto=None, eliminado_id=None, max_intentos=3):
+    """
+    Actualiza el snapshot con un producto nuevo/modificado o eliminado.
+    Lee-modifica-escribe con If-Match; ante conflictos repetidos reconstruye
+    completo, condicionado al último ETag leído.
+    """
+    if not snapshots_habilitados():
+        return
+    etag = None
+    for _ in range(max_intentos):
+        snapshot, etag = _leer_s3(local_id)
+        if snapshot is None:
+            # Se crea desde DynamoDB (ya incluye este cambio); si otro
+            # contenedor lo creó primero, se reintenta sobre el suyo
+            if reconstruir(local_id) is not None:
+                return
+            continue
+        por_id = {p["producto_id"]: p for p in snapshot.get("contents", [])}
+        if producto:
+            por_id[producto["producto_id"]] = producto
+        if eliminado_id:
+            por_id.pop(eliminado_id, None)
+        try:
+            _escribir(local_id, por_id.values(), if_match=etag)
+            return
+        except ClientError as e:
+            if _error_code(e) in _CONFLICTO:
+                continue
+            raise
+    reconstruir(local_id, etag)
+
+
+def pagina(snapshot, size, lek=None):
+    """Página del snapshot con la misma semántica de ExclusiveStartKey que la query."""
+    contents = snapshot.get("contents", [])
+    inicio = 0
+    if lek and lek.get("producto_id"):
+        desde = lek["producto_id"]
+        inicio = next((i for i, p in enumerate(contents) if p["producto_id"] > desde), len(contents))
+    # Snapshots escritos antes de excluir stock pueden traerlo todavía
+    items = [sin_excluidos(p) for p in contents[inicio:inicio + size]]
+    lek_out = None
+    if items and inicio + size < len(contents):
+        lek_out = {"local_id": snapshot["local_id"], "producto_id": items[-1]["producto_id"]}
+    return items, lek_out
@@ -7,7 +7,9 @@ from datetime import datetime
 
 import boto3
 from botocore.exceptions import ClientError
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from auth_helper import get_bearer_token, resolve_principal
+from busqueda import indexar
+from menu_snapshot import aplicar_cambio
 
 # ---------- Config ----------
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
@@ -98,11 +100,12 @@ def lambda_handler(event, context):
     if not PRODUCTS_TABLE:
         return _resp(500, {"message": "PRODUCTS_TABLE no configurado"})
 
-    # 1) Validar token y rol mediante Lambda
+    # 1) Resolver rol del token (una sola lectura)
     token = get_bearer_token(event)
-    valido, error, rol = validate_token_via_lambda(token)
-    if not valido:
+    principal, error = resolve_principal(token)
+    if not principal:
         return _resp(403, {"message": error or "Token inválido"})
+    rol = principal.rol
     
     # Verificar que sea Admin o Gerente
     if rol not in ("Admin", "Gerente"):
@@ -198,6 +201,7 @@ def lambda_handler(event, context):
         "precio": precio,                # Decimal -> DDB Number
         "descripcion": descripcion or "",
         "categoria": categoria,
+        "local_categoria": f"{local_id.strip()}#{categoria}",  # PK del GSI by_local_categoria
         "stock": stock,
         "imagen_url": imagen_url_https
     }
@@ -214,6 +218,17 @@ def lambda_handler(event, context):
             return _resp(409, {"message": "Ya existe un producto con ese producto_id"})
         return _resp(500, {"message": f"Error al crear el producto: {e}"})
 
+    # 7) Índice de búsqueda por nombre y snapshot del menú (derivados: si
+    #    fallan se registra y el producto ya creado se responde igual)
+    try:
+        indexar(item)
+    except Exception as e:
+        print(f"Error indexando producto {producto_id}: {e}")
+    try:
+        aplicar_cambio(item["local_id"], producto=item)
+    except Exception as e:
+        print(f"Error actualizando snapshot del menú: {e}")
+
     return _resp(201, {
         "message": "Producto creado correctamente",
         "producto": {
@@ -1,19 +1,19 @@
 import os
 import json
 import boto3
-from decimal import Decimal
 from datetime import datetime
 from urllib.parse import urlparse
 
 from botocore.exceptions import ClientError
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from auth_helper import get_bearer_token, resolve_principal
+from busqueda import desindexar
+from menu_snapshot import aplicar_cambio
+from json_helper import respuesta
 
 PRODUCTS_TABLE = os.environ.get("PRODUCTS_TABLE")
 PRODUCTS_BUCKET = os.environ.get("PRODUCTS_BUCKET", "")
 TOKENS_TABLE = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
 
-CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
-
 dynamodb = boto3.resource("dynamodb")
 s3 = boto3.client("s3")
 table = dynamodb.Table(PRODUCTS_TABLE)
@@ -21,11 +21,7 @@ tokens_table = dynamodb.Table(TOKENS_TABLE)
 
 
 def _resp(code, body):
-    return {
-        "statusCode": code,
-        "headers": {"Content-Type": "application/json", **CORS_HEADERS},
-        "body": json.dumps(body, ensure_ascii=False),
-    }
+    return respuesta(code, body)
 
 def _parse_body(event):
     body = event.get("body") or {}
@@ -35,15 +31,6 @@ def _parse_body(event):
         body = {}
     return body
 
-def _convert_decimal(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    if isinstance(obj, dict):
-        return {k: _convert_decimal(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_convert_decimal(i) for i in obj]
-    return obj
-
 def _parse_s3_from_url(url: str):
     """
     Soporta:
@@ -74,11 +61,12 @@ def _parse_s3_from_url(url: str):
     return (None, None)
 
 def lambda_handler(event, context):
-    # Validar token y rol mediante Lambda
+    # Resolver rol del token (una sola lectura)
     token = get_bearer_token(event)
-    valido, error, rol = validate_token_via_lambda(token)
-    if not valido:
+    principal, error = resolve_principal(token)
+    if not principal:
         return _resp(403, {"message": error or "Token inválido"})
+    rol = principal.rol
     
     # Verificar que sea Admin o Gerente
     if rol not in ("Admin", "Gerente"):
@@ -135,5 +123,15 @@ def lambda_handler(event, context):
             return _resp(404, {"error": "Producto no encontrado"})
         return _resp(500, {"error": f"Error al eliminar producto: {e}"})
 
-    deleted_attributes = _convert_decimal(del_res.get("Attributes") or {})
-    return _resp(200, {"ok": True, "deleted": deleted_attributes})
+    # Índice y snapshot son derivados: un fallo se registra y no cambia la respuesta
+    try:
+        if del_res.get("Attributes"):
+            desindexar(del_res["Attributes"])
+    except Exception as e:
+        print(f"Error quitando producto {producto_id} del índice: {e}")
+    try:
+        aplicar_cambio(local_id, eliminado_id=producto_id)
+    except Exception as e:
+        print(f"Error actualizando snapshot del menú: {e}")
+
+    return _resp(200, {"ok": True, "deleted": del_res.get("Attributes") or {}})
@@ -2,10 +2,12 @@ import os
 import json
 import boto3
 from botocore.exceptions import ClientError
+from batch_get import batch_get_productos
 
 # ---------- Config ----------
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 PRODUCTS_TABLE = os.environ.get("PRODUCTS_TABLE", "PRODUCTS_TABLE")
+BATCH_MAX_ITEMS = 100
 
 dynamodb = boto3.resource("dynamodb")
 productos_table = dynamodb.Table(PRODUCTS_TABLE)
@@ -26,6 +28,49 @@ def _parse_body(event):
         body = {}
     return body
 
+def _batch(body):
+    """
+    Modo batch (/productos/batch): hasta BATCH_MAX_ITEMS pares
+    (local_id, producto_id) en una llamada. Responde en el orden de entrada,
+    con null en las posiciones no encontradas.
+    """
+    entrada = body.get("productos")
+    if not isinstance(entrada, list) or not entrada:
+        return _resp(400, {"error": "productos debe ser una lista no vacía de {local_id, producto_id}"})
+    if len(entrada) > BATCH_MAX_ITEMS:
+        return _resp(400, {"error": f"Máximo {BATCH_MAX_ITEMS} productos por llamada"})
+
+    local_default = body.get("local_id")
+    keys = []
+    for i, p in enumerate(entrada):
+        if not isinstance(p, dict):
+            return _resp(400, {"error": f"productos[{i}] debe ser un objeto"})
+        local_id = p.get("local_id") or local_default
+        producto_id = p.get("producto_id")
+        if not isinstance(local_id, str) or not local_id or not isinstance(producto_id, str) or not producto_id:
+            return _resp(400, {"error": f"productos[{i}] requiere local_id y producto_id"})
+        keys.append({"local_id": local_id, "producto_id": producto_id})
+
+    fields = body.get("fields")
+    if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields)):
+        return _resp(400, {"error": "fields debe ser una lista de nombres de atributo"})
+
+    try:
+        encontrados, no_procesados = batch_get_productos(keys, fields)
+    except ClientError as e:
+        return _resp(500, {"error": f"Error al buscar productos: {str(e)}"})
+
+    productos = [encontrados.get((k["local_id"], k["producto_id"])) for k in keys]
+    pendientes = {(k["local_id"], k["producto_id"]) for k in no_procesados}
+    no_encontrados = [k for k, item in zip(keys, productos)
+                      if item is None and (k["local_id"], k["producto_id"]) not in pendientes]
+
+    return _resp(200, {
+        "productos": productos,
+        "no_encontrados": no_encontrados,
+        "no_procesados": no_procesados
+    })
+
 # ---------- Handler ----------
 def lambda_handler(event, context):
     # Preflight
@@ -34,6 +79,10 @@ def lambda_handler(event, context):
         return _resp(204, {})
 
     body = _parse_body(event)
+
+    # Modo batch: {"productos": [{local_id, producto_id}, ...], "fields": [...]}
+    if "productos" in body:
+        return _batch(body)
     
     # Buscar por local_id y producto_id
     local_id = body.get("local_id")
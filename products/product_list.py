@@ -2,25 +2,22 @@ import os
 import json
 import math
 import base64
-import boto3
 from decimal import Decimal
+import boto3
 from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
+from contadores import leer_total
+from busqueda import consulta_nombre, t_busqueda, MIN_PREFIJO
+from batch_get import batch_get_productos
+from json_helper import respuesta, dumps_bytes, CORS_HEADERS
+from menu_snapshot import leer_snapshot, pagina, sin_excluidos, snapshots_habilitados, MENU_CACHE_CONTROL
 
 PRODUCTS_TABLE = os.environ.get("PRODUCTS_TABLE", "")
+# GSI de Productos: HASH local_categoria ("<local_id>#<categoria>"), RANGE precio
+PRODUCTOS_CATEGORIA_INDEX = os.environ.get("PRODUCTOS_CATEGORIA_INDEX", "by_local_categoria")
 
-CORS_HEADERS = {
-    "Access-Control-Allow-Origin": "*",
-    "Access-Control-Allow-Headers": "Content-Type,Authorization",
-    "Access-Control-Allow-Methods": "OPTIONS,POST"
-}
-
-def _resp(code, body):
-    return {
-        "statusCode": code,
-        "headers": {"Content-Type": "application/json", **CORS_HEADERS},
-        "body": json.dumps(body, ensure_ascii=False, default=str)
-    }
+def _resp(code, body, headers=None, event=None):
+    return respuesta(code, body, headers, event)
 
 def _parse_body(event):
     body = event.get("body")
@@ -34,28 +31,57 @@ def _safe_int(v, default):
     except Exception:
         return default
 
-def _convert_decimal(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    if isinstance(obj, dict):
-        return {k: _convert_decimal(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_convert_decimal(i) for i in obj]
-    return obj
-
+# La clave del GSI por categoría incluye precio (N): el LastEvaluatedKey trae
+# Decimal, que vuelve a Decimal al decodificar (boto3 rechaza float)
 def _encode_token(lek: dict | None) -> str | None:
     if not lek:
         return None
-    return base64.urlsafe_b64encode(json.dumps(lek).encode("utf-8")).decode("ascii")
+    return base64.urlsafe_b64encode(dumps_bytes(lek)).decode("ascii")
 
 def _decode_token(tok: str | None) -> dict | None:
     if not tok:
         return None
     try:
-        return json.loads(base64.urlsafe_b64decode(tok.encode("ascii")).decode("utf-8"))
+        return json.loads(base64.urlsafe_b64decode(tok.encode("ascii")).decode("utf-8"), parse_float=Decimal)
     except Exception:
         return None
 
+def _contar_busqueda(busqueda_args):
+    count_args = dict(busqueda_args, Select="COUNT")
+    total = 0
+    while True:
+        r = t_busqueda.query(**count_args)
+        total += r.get("Count", 0)
+        lek = r.get("LastEvaluatedKey")
+        if not lek:
+            return total
+        count_args["ExclusiveStartKey"] = lek
+
+def _leer_productos(producto_ids, local_id):
+    """BatchGetItem de los productos encontrados, en el orden del índice."""
+    encontrados, _ = batch_get_productos([{"local_id": local_id, "producto_id": pid} for pid in producto_ids])
+    return [encontrados[(local_id, pid)] for pid in producto_ids if (local_id, pid) in encontrados]
+
+def _pagina_desde_snapshot(event, body, local_id, size, lek, page):
+    snapshot, etag = leer_snapshot(local_id)
+    items, lek_out = pagina(snapshot, size, lek)
+    next_token_out = _encode_token(lek_out)
+
+    # ETag por versión del snapshot + página pedida
+    page_etag = '"{}:{}:{}"'.format(snapshot.get("version"), body.get("next_token") or "", size)
+    headers = {"ETag": page_etag, "Cache-Control": MENU_CACHE_CONTROL}
+    req_headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    if req_headers.get("if-none-match") == page_etag:
+        return {"statusCode": 304, "headers": {**CORS_HEADERS, **headers}, "body": ""}
+
+    resp = {"contents": items, "size": size, "next_token": next_token_out}
+    if page is not None:
+        resp["page"] = page
+    if body.get("include_total"):
+        total = snapshot.get("count", 0)
+        resp.update({"totalElements": total, "totalPages": math.ceil(total / size)})
+    return _resp(200, resp, headers, event)
+
 def lambda_handler(event, context):
     # CORS preflight
     method = event.get("httpMethod") or event.get("requestContext", {}).get("http", {}).get("method")
@@ -79,13 +105,11 @@ def lambda_handler(event, context):
 
     # Filtros y paginación
     categoria = body.get("categoria")
-    nombre = body.get("nombre")  # Filtro por nombre (case-insensitive)
+    orden_desc = str(body.get("orden", "")).lower() == "desc"  # por precio, solo con categoria
+    nombre = body.get("nombre")  # Búsqueda por nombre (prefijo, sin tildes ni mayúsculas)
     size = _safe_int(body.get("size", body.get("limit", 10)), 10)
     if size <= 0 or size > 100:
         size = 10
-    
-    # Normalizar nombre para búsqueda case-insensitive
-    nombre_lower = nombre.lower() if nombre else None
 
     # Paginación por token (recomendada)
     next_token_in = body.get("next_token")
@@ -98,6 +122,13 @@ def lambda_handler(event, context):
         if page < 0:
             page = 0
 
+    # Menú sin filtros: se sirve del snapshot del local (sin query ni Decimal)
+    if local_id and not categoria and not nombre and snapshots_habilitados():
+        try:
+            return _pagina_desde_snapshot(event, body, local_id, size, lek, page)
+        except Exception as e:
+            print(f"Snapshot de menú no disponible, usando DynamoDB: {e}")
+
     ddb = boto3.resource("dynamodb")
     table = ddb.Table(PRODUCTS_TABLE)
 
@@ -107,60 +138,55 @@ def lambda_handler(event, context):
     else:
         key_cond = Key("tenant_id").eq(tenant_id)
 
-    # include_total (costoso: múltiples queries)
+    # Búsqueda por nombre: una query al índice invertido del local
+    busqueda_args = None
+    if nombre:
+        if not local_id:
+            return _resp(400, {"error": "La búsqueda por nombre requiere local_id"})
+        busqueda_args = consulta_nombre(local_id, nombre, categoria)
+        if busqueda_args is None:
+            return _resp(400, {"error": f"nombre debe tener al menos {MIN_PREFIJO} caracteres alfanuméricos"})
+
+    # include_total: con nombre se cuenta la partición del índice (solo coincidencias);
+    # sin nombre, O(1) desde los contadores por local (productos#<categoria>)
     include_total = bool(body.get("include_total"))
     total = None
     total_pages = None
-    if include_total:
-        total = 0
-        count_args = {
-            "KeyConditionExpression": key_cond,
-            "Select": "COUNT"
+    if include_total and (busqueda_args or local_id):
+        try:
+            if busqueda_args:
+                total = _contar_busqueda(busqueda_args)
+            else:
+                total = leer_total("productos", local_id, categoria)
+        except ClientError as e:
+            print(f"Error calculando total: {e}")
+        if total is not None:
+            total_pages = math.ceil(total / size) if size > 0 else 0
+            if page is not None and total_pages and page >= total_pages:
+                return _resp(200, {
+                    "contents": [],
+                    "page": page,
+                    "size": size,
+                    "totalElements": total,
+                    "totalPages": total_pages,
+                    "next_token": None
+                })
+
+    # Query principal: índice de búsqueda, GSI por categoría o tabla de productos
+    if busqueda_args:
+        qtable, qargs = t_busqueda, dict(busqueda_args)
+    elif categoria and local_id:
+        qtable, qargs = table, {
+            "IndexName": PRODUCTOS_CATEGORIA_INDEX,
+            "KeyConditionExpression": Key("local_categoria").eq(f"{local_id}#{categoria}"),
+            "ScanIndexForward": not orden_desc
         }
-        # Solo filtrar por categoría en DynamoDB para count
+    else:
+        qtable, qargs = table, {"KeyConditionExpression": key_cond}
+        # Legado (tenant_id): la categoría solo se puede filtrar
         if categoria:
-            count_args["FilterExpression"] = Attr("categoria").eq(categoria)
-        
-        count_lek = None
-        while True:
-            if count_lek:
-                count_args["ExclusiveStartKey"] = count_lek
-            rcount = table.query(**count_args)
-            total += rcount.get("Count", 0)
-            count_lek = rcount.get("LastEvaluatedKey")
-            if not count_lek:
-                break
-        # Si hay filtro por nombre, el total es aproximado
-        if nombre_lower:
-            # Filtrar por nombre en memoria
-            temp_total = 0
-            for _ in range(total):
-                # Esto es una aproximación, no es exacto
-                pass
-            total = temp_total if nombre_lower else total
-        
-        total_pages = math.ceil(total / size) if size > 0 else 0
-        if page is not None and total_pages and page >= total_pages:
-            return _resp(200, {
-                "contents": [],
-                "page": page,
-                "size": size,
-                "totalElements": total,
-                "totalPages": total_pages,
-                "next_token": None
-            })
-
-    # Query principal - solo filtrar por categoría en DynamoDB
-    qargs = {
-        "KeyConditionExpression": key_cond
-    }
-    
-    # Solo agregar FilterExpression para categoría (más eficiente)
-    if categoria:
-        qargs["FilterExpression"] = Attr("categoria").eq(categoria)
+            qargs["FilterExpression"] = Attr("categoria").eq(categoria)
 
-    # Si hay filtro por nombre, necesitamos obtener más items y filtrar en memoria
-    # porque DynamoDB no soporta búsquedas case-insensitive con contains
     items = []
     query_lek = lek
     max_queries = 10  # Límite de seguridad
@@ -170,39 +196,21 @@ def lambda_handler(event, context):
         while len(items) < size and queries_done < max_queries:
             if query_lek:
                 qargs["ExclusiveStartKey"] = query_lek
+            # Pedir solo lo que falta para no saltarse items al paginar
+            qargs["Limit"] = size - len(items)
             
-            # Obtener más items de los necesarios para compensar el filtro por nombre
-            qargs["Limit"] = size * 2 if nombre_lower else size
-            
-            rpage = table.query(**qargs)
-            page_items = rpage.get("Items", [])
+            rpage = qtable.query(**qargs)
+            items.extend(rpage.get("Items", []))
             query_lek = rpage.get("LastEvaluatedKey")
             queries_done += 1
             
-            # Filtrar por nombre en memoria (case-insensitive, palabra completa)
-            if nombre_lower:
-                for item in page_items:
-                    item_nombre = item.get("nombre", "").lower()
-                    # Buscar la palabra completa (separada por espacios)
-                    palabras = item_nombre.split()
-                    if nombre_lower in palabras:
-                        items.append(item)
-                        if len(items) >= size:
-                            break
-            else:
-                items.extend(page_items)
-            
             # Si no hay más items en DynamoDB, parar
             if not query_lek:
                 break
-            
-            # Si ya tenemos suficientes items, parar
-            if len(items) >= size:
-                break
-        
-        # Limitar a size items
-        if len(items) > size:
-            items = items[:size]
+
+        # Las entradas del índice solo traen la clave: leer los productos
+        if busqueda_args:
+            items = _leer_productos([it["producto_id"] for it in items], local_id)
         
         lek_out = query_lek
         next_token_out = _encode_token(lek_out)
@@ -211,12 +219,11 @@ def lambda_handler(event, context):
         print(f"Error query productos: {e}")
         return _resp(500, {"error": "Error consultando productos"})
 
-    items = _convert_decimal(items)
-
-    resp = {"contents": items, "size": size, "next_token": next_token_out}
+    # Mismos atributos que las páginas del snapshot (sin stock)
+    resp = {"contents": [sin_excluidos(p) for p in items], "size": size, "next_token": next_token_out}
     if page is not None:
         resp["page"] = page
     if include_total:
         resp.update({"totalElements": total, "totalPages": total_pages})
 
-    return _resp(200, resp)
+    return _resp(200, resp, event=event)
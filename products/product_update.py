@@ -2,7 +2,9 @@ import os, json, boto3
 from decimal import Decimal, InvalidOperation
 from datetime import datetime
 from botocore.exceptions import ClientError
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from auth_helper import get_bearer_token, resolve_principal
+from busqueda import reindexar
+from menu_snapshot import aplicar_cambio
 
 PRODUCTS_TABLE = os.environ.get("PRODUCTS_TABLE", "")
 TOKENS_TABLE = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
@@ -56,11 +58,12 @@ def lambda_handler(event, context):
     if not PRODUCTS_TABLE:
         return _resp(500, {"error": "PRODUCTS_TABLE no configurado"})
 
-    # Validar token y rol mediante Lambda
+    # Resolver rol del token (una sola lectura)
     token = get_bearer_token(event)
-    valido, error, rol = validate_token_via_lambda(token)
-    if not valido:
+    principal, error = resolve_principal(token)
+    if not principal:
         return _resp(403, {"error": error or "Token inválido"})
+    rol = principal.rol
     
     # Verificar que sea Admin o Gerente
     if rol not in ALLOWED_ROLES:
@@ -79,11 +82,15 @@ def lambda_handler(event, context):
     
     key = {"local_id": local_id, "producto_id": producto_id}
 
-    # No permitir que intenten cambiar PK/SK en el update
-    for forbidden in ("local_id", "producto_id"):
+    # No permitir que intenten cambiar PK/SK (ni la clave derivada del GSI) en el update
+    for forbidden in ("local_id", "producto_id", "local_categoria"):
         if forbidden in data:
             data.pop(forbidden, None)
 
+    # Mantener la PK del GSI by_local_categoria si cambia la categoría
+    if data.get("categoria"):
+        data["local_categoria"] = f"{local_id}#{data['categoria']}"
+
     if not data:
         return _resp(400, {"error": "Body vacío; nada que actualizar"})
 
@@ -109,7 +116,7 @@ def lambda_handler(event, context):
             ExpressionAttributeNames=expr_names,
             ExpressionAttributeValues=expr_values,
             ConditionExpression="attribute_exists(local_id) AND attribute_exists(producto_id)",
-            ReturnValues="ALL_NEW"
+            ReturnValues="ALL_OLD"
         )
     except ClientError as e:
         code = e.response.get("Error", {}).get("Code")
@@ -119,4 +126,18 @@ def lambda_handler(event, context):
     except Exception as e:
         return _resp(500, {"error": f"Error inesperado: {e}"})
 
-    return _resp(200, {"ok": True, "item": res.get("Attributes")})
+    anterior = res.get("Attributes") or {}
+    actualizado = {**anterior, **data}
+
+    # Índice de búsqueda: solo se reescribe si cambió nombre o categoría.
+    # Índice y snapshot son derivados: un fallo se registra y no cambia la respuesta
+    try:
+        reindexar(anterior, actualizado)
+    except Exception as e:
+        print(f"Error reindexando producto {producto_id}: {e}")
+    try:
+        aplicar_cambio(local_id, producto=actualizado)
+    except Exception as e:
+        print(f"Error actualizando snapshot del menú: {e}")
+
+    return _resp(200, {"ok": True, "item": actualizado})
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import uuid
+import hmac
+import base64
+import hashlib
+from datetime import datetime, timezone
+from decimal import Decimal
+import boto3
+from botocore.exceptions import ClientError
+
+# Tokens firmados (HMAC-SHA256): "st1.<payload_b64>.<firma_b64>"
+# El payload lleva correo, rol y expiración, así que validar no requiere
+# leer la tabla de tokens. Si TOKEN_SIGNING_KEY no está configurada se
+# siguen emitiendo los tokens opacos (uuid4) de siempre.
+TOKEN_SIGNING_KEY = os.environ.get("TOKEN_SIGNING_KEY", "")
+TOKENS_TABLE_USERS = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
+
+SIGNED_TOKEN_PREFIX = "st1."
+
+# Revocaciones: un item por token (jti) o por usuario en la tabla de tokens,
+# con "expira" como TTL de DynamoDB para que se borren solas. Escribir una
+# revocación es un put independiente, sin item compartido que se dispute.
+REVOCATION_PREFIX = "__revocado__#"
+REVOCATION_CACHE_TTL_SECONDS = int(os.environ.get("REVOCATION_CACHE_TTL_SECONDS", "30"))
+REVOCATION_CACHE_MAX_SIZE = int(os.environ.get("REVOCATION_CACHE_MAX_SIZE", "4096"))
+# Debe ser mayor que la vida máxima de un token (60 min)
+REVOCATION_RETENTION_SECONDS = int(os.environ.get("REVOCATION_RETENTION_SECONDS", "86400"))
+
+EXPIRES_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+dynamodb = boto3.resource("dynamodb")
+tokens_table = dynamodb.Table(TOKENS_TABLE_USERS)
+
+# clave de revocación -> (consultado_ts, item o None), cacheado por contenedor
+_revocados = {}
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(signing_input: str) -> str:
+    # utf-8 (no ascii): un token manipulado puede traer cualquier carácter
+    digest = hmac.new(TOKEN_SIGNING_KEY.encode("utf-8"), signing_input.encode("utf-8"), hashlib.sha256).digest()
+    return _b64encode(digest)
+
+
+def _expires_ts(expires_str):
+    try:
+        return datetime.strptime(expires_str, EXPIRES_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def signing_enabled() -> bool:
+    return bool(TOKEN_SIGNING_KEY)
+
+
+def is_signed_token(token) -> bool:
+    return isinstance(token, str) and token.startswith(SIGNED_TOKEN_PREFIX)
+
+
+def mint_token(correo: str, rol: str, expires_str: str) -> str:
+    """Genera un token firmado con correo, rol y expiración embebidos."""
+    claims = {
+        "sub": correo,
+        "rol": rol,
+        "exp": expires_str,
+        "iat": round(time.time(), 3),
+        "jti": uuid.uuid4().hex
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    signing_input = SIGNED_TOKEN_PREFIX + payload
+    return f"{signing_input}.{_sign(signing_input)}"
+
+
+def _decode(token: str):
+    """Verifica la firma y devuelve los claims, o (None, error)."""
+    if not signing_enabled():
+        return None, "Tokens firmados no habilitados"
+    try:
+        signing_input, firma = token.rsplit(".", 1)
+        payload = signing_input[len(SIGNED_TOKEN_PREFIX):]
+    except ValueError:
+        return None, "Token mal formado"
+    # Se comparan bytes: compare_digest con str no ASCII lanza TypeError
+    if not hmac.compare_digest(firma.encode("utf-8"), _sign(signing_input).encode("ascii")):
+        return None, "Firma de token inválida"
+    try:
+        claims = json.loads(_b64decode(payload))
+    except Exception:
+        return None, "Token mal formado"
+    if not isinstance(claims, dict):
+        return None, "Token mal formado"
+    return claims, None
+
+
+def _clave_token(jti):
+    return f"{REVOCATION_PREFIX}jti#{jti}"
+
+
+def _clave_usuario(correo):
+    return f"{REVOCATION_PREFIX}usuario#{correo}"
+
+
+def _load_revocados(claves):
+    """Devuelve {clave: item} de las revocaciones existentes, con caché por contenedor."""
+    now = time.time()
+    faltan = [c for c in claves
+              if c not in _revocados or now - _revocados[c][0] >= REVOCATION_CACHE_TTL_SECONDS]
+    if faltan:
+        if len(_revocados) + len(faltan) > REVOCATION_CACHE_MAX_SIZE:
+            _revocados.clear()
+        encontrados = {}
+        pendientes = {"Keys": [{"token": c} for c in faltan], "ConsistentRead": True}
+        while pendientes:
+            r = dynamodb.batch_get_item(RequestItems={TOKENS_TABLE_USERS: pendientes})
+            for item in r.get("Responses", {}).get(TOKENS_TABLE_USERS, []):
+                encontrados[item["token"]] = item
+            pendientes = r.get("UnprocessedKeys", {}).get(TOKENS_TABLE_USERS)
+        for c in faltan:
+            _revocados[c] = (now, encontrados.get(c))
+    return {c: _revocados[c][1] for c in claves if _revocados[c][1]}
+
+
+def verify_token(token: str):
+    """
+    Verifica un token firmado en CPU; las revocaciones del token y del
+    usuario se releen como máximo cada REVOCATION_CACHE_TTL_SECONDS.
+
+    Retorna:
+        (valido: bool, error: str, claims: dict)
+    """
+    claims, error = _decode(token)
+    if error:
+        return False, error, None
+
+    expires_ts = _expires_ts(claims.get("exp"))
+    if expires_ts is None:
+        return False, "Formato de expiración inválido", None
+    if time.time() > expires_ts:
+        return False, "Token expirado", None
+    if not claims.get("sub"):
+        return False, "Token sin usuario asociado", None
+
+    clave_token = _clave_token(claims.get("jti"))
+    clave_usuario = _clave_usuario(claims["sub"])
+    try:
+        revocados = _load_revocados([clave_token, clave_usuario])
+    except Exception as e:
+        return False, f"Error al validar token: {str(e)}", None
+    if clave_token in revocados:
+        return False, "Token revocado", None
+    usuario = revocados.get(clave_usuario)
+    if usuario and float(claims.get("iat", 0)) < float(usuario["revocado_antes"]):
+        return False, "Token revocado", None
+
+    return True, None, claims
+
+
+def revoke_user_tokens(correo: str):
+    """Revoca todos los tokens firmados emitidos hasta ahora para el usuario (cambio de contraseña)."""
+    now = time.time()
+    clave = _clave_usuario(correo)
+    try:
+        # Solo avanza la marca: un cambio anterior que llegue tarde no la retrocede
+        tokens_table.update_item(
+            Key={"token": clave},
+            UpdateExpression="SET revocado_antes = :ts, expira = :expira",
+            ConditionExpression="attribute_not_exists(revocado_antes) OR revocado_antes < :ts",
+            ExpressionAttributeValues={
+                ":ts": Decimal(str(round(now, 3))),
+                ":expira": int(now) + REVOCATION_RETENTION_SECONDS
+            }
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+    _revocados.pop(clave, None)
+    return True
+
+
+def revoke_token(token: str):
+    """Revoca un token firmado concreto (logout)."""
+    claims, error = _decode(token)
+    if error:
+        return False
+    expires_ts = _expires_ts(claims.get("exp"))
+    if not claims.get("jti") or expires_ts is None or expires_ts < time.time():
+        return True
+
+    clave = _clave_token(claims["jti"])
+    # El item vive hasta que el token expira; después lo borra el TTL
+    tokens_table.put_item(Item={"token": clave, "expira": int(expires_ts) + 1})
+    _revocados.pop(clave, None)
+    return True
@@ -0,0 +1,33 @@
+import pytest
+
+
+@pytest.fixture
+def entorno():
+    return {
+        'PRODUCTS_TABLE': 'Productos',
+        'PRODUCTS_BUCKET': 'imagenes-productos',
+        'MENU_SNAPSHOT_TTL_SECONDS': '0',
+    }
+
+
+@pytest.fixture
+def productos(importar):
+    import boto3
+    boto3.client('s3').create_bucket(Bucket='imagenes-productos')
+    # Mismo esquema que setup_backend.sh + crear_gsi_productos.py
+    return boto3.resource('dynamodb').create_table(
+        TableName='Productos',
+        KeySchema=[{'AttributeName': 'local_id', 'KeyType': 'HASH'},
+                   {'AttributeName': 'producto_id', 'KeyType': 'RANGE'}],
+        AttributeDefinitions=[{'AttributeName': 'local_id', 'AttributeType': 'S'},
+                              {'AttributeName': 'producto_id', 'AttributeType': 'S'},
+                              {'AttributeName': 'local_categoria', 'AttributeType': 'S'},
+                              {'AttributeName': 'precio', 'AttributeType': 'N'}],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'by_local_categoria',
+            'KeySchema': [{'AttributeName': 'local_categoria', 'KeyType': 'HASH'},
+                          {'AttributeName': 'precio', 'KeyType': 'RANGE'}],
+            'Projection': {'ProjectionType': 'ALL'}
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
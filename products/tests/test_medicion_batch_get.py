@@ -0,0 +1,44 @@
+import json
+import time
+import pytest
+
+pytestmark = pytest.mark.medicion
+
+
+def _llamar(pid, body):
+    r = pid.lambda_handler({'httpMethod': 'POST', 'body': json.dumps(body)}, None)
+    assert r['statusCode'] == 200
+    return json.loads(r['body'])
+
+
+def test_gets_individuales_vs_batch(importar, productos, llamadas_aws):
+    """
+    N GetItem (una invocación de product_id por producto) contra una sola
+    invocación de /productos/batch. Bajo moto no hay latencia de red: lo que
+    se traslada a producción es el número de llamadas, cada una con su RTT.
+    """
+    pid = importar('product_id')
+    for i in range(100):
+        productos.put_item(Item={'local_id': 'L1', 'producto_id': f'p{i}', 'nombre': f'Plato {i}', 'precio': 10})
+
+    print()
+    print(f"{'N':>4} {'llamadas 1x1':>13} {'ms 1x1':>8} {'llamadas batch':>15} {'ms batch':>9}")
+    for n in (10, 50, 100):
+        ids = [f'p{i}' for i in range(n)]
+
+        llamadas_aws.clear()
+        inicio = time.perf_counter()
+        for producto_id in ids:
+            _llamar(pid, {'local_id': 'L1', 'producto_id': producto_id})
+        ms_individual = (time.perf_counter() - inicio) * 1000
+        individuales = len(llamadas_aws)
+
+        llamadas_aws.clear()
+        inicio = time.perf_counter()
+        cuerpo = _llamar(pid, {'local_id': 'L1', 'productos': [{'producto_id': p} for p in ids]})
+        ms_batch = (time.perf_counter() - inicio) * 1000
+
+        assert [p['producto_id'] for p in cuerpo['productos']] == ids
+        assert individuales == n
+        assert llamadas_aws == [('dynamodb', 'BatchGetItem', None)]
+        print(f"{n:>4} {individuales:>13} {ms_individual:>8.1f} {len(llamadas_aws):>15} {ms_batch:>9.1f}")
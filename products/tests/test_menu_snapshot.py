@@ -0,0 +1,106 @@
+import gzip
+import json
+from decimal import Decimal
+import boto3
+
+
+def _producto(pid, precio='12', stock=5):
+    return {'local_id': 'L1', 'producto_id': pid, 'nombre': f'Plato {pid}',
+            'precio': Decimal(precio), 'stock': stock}
+
+
+def _en_s3(ms):
+    r = boto3.client('s3').get_object(Bucket='imagenes-productos', Key=ms.snapshot_key('L1'))
+    return json.loads(gzip.decompress(r['Body'].read())), r['ETag']
+
+
+def test_reconstruir_crea_snapshot_sin_stock(importar, productos):
+    ms = importar('menu_snapshot')
+    productos.put_item(Item=_producto('p2', '12.50'))
+    productos.put_item(Item=_producto('p1'))
+
+    snapshot, _ = ms.leer_snapshot('L1')
+    guardado, _ = _en_s3(ms)
+
+    assert [p['producto_id'] for p in guardado['contents']] == ['p1', 'p2']
+    # Decimal entero -> int, igual que json_helper en las respuestas de DynamoDB
+    assert guardado['contents'][0]['precio'] == 12
+    assert isinstance(guardado['contents'][0]['precio'], int)
+    assert guardado['contents'][1]['precio'] == 12.5
+    assert all('stock' not in p for p in guardado['contents'])
+    assert all('stock' not in p for p in snapshot['contents'])
+
+
+def test_reconstruir_no_pisa_un_snapshot_creado_por_otro(importar, productos):
+    ms = importar('menu_snapshot')
+    productos.put_item(Item=_producto('p1'))
+    ms._escribir('L1', [_producto('otro')])
+
+    # Sin ETag = crear: el objeto ya existe y se descarta la escritura
+    assert ms.reconstruir('L1') is None
+    guardado, _ = _en_s3(ms)
+    assert [p['producto_id'] for p in guardado['contents']] == ['otro']
+
+
+def test_reconstruir_descarta_si_cambio_el_etag(importar, productos):
+    ms = importar('menu_snapshot')
+    productos.put_item(Item=_producto('p1'))
+    ms.reconstruir('L1')
+    _, viejo = _en_s3(ms)
+
+    # Escritura incremental más nueva entre la lectura del ETag y el put
+    ms.aplicar_cambio('L1', producto=_producto('p2'))
+    assert ms.reconstruir('L1', viejo) is None
+    guardado, _ = _en_s3(ms)
+    assert [p['producto_id'] for p in guardado['contents']] == ['p1', 'p2']
+
+    _, actual = _en_s3(ms)
+    assert ms.reconstruir('L1', actual) is not None
+
+
+def test_aplicar_cambio_incremental(importar, productos):
+    ms = importar('menu_snapshot')
+    productos.put_item(Item=_producto('p1'))
+    ms.aplicar_cambio('L1', producto=_producto('p1'))  # crea desde DynamoDB
+    ms.aplicar_cambio('L1', producto=_producto('p3', '7'))
+    ms.aplicar_cambio('L1', eliminado_id='p1')
+
+    guardado, _ = _en_s3(ms)
+    assert guardado['contents'] == [
+        {'local_id': 'L1', 'producto_id': 'p3', 'nombre': 'Plato p3', 'precio': 7}
+    ]
+
+
+def test_aplicar_cambio_reintenta_ante_conflicto(importar, productos, monkeypatch):
+    ms = importar('menu_snapshot')
+    productos.put_item(Item=_producto('p1'))
+    ms.reconstruir('L1')
+
+    leer = ms._leer_s3
+    carreras = []
+
+    def leer_con_carrera(local_id, if_none_match=None):
+        resultado = leer(local_id, if_none_match)
+        if not carreras:
+            # Otro contenedor escribe entre la lectura y el put condicional
+            carreras.append(1)
+            ms._escribir('L1', resultado[0]['contents'] + [_producto('p9')])
+        return resultado
+
+    monkeypatch.setattr(ms, '_leer_s3', leer_con_carrera)
+    ms.aplicar_cambio('L1', producto=_producto('p2'))
+
+    guardado, _ = _en_s3(ms)
+    assert [p['producto_id'] for p in guardado['contents']] == ['p1', 'p2', 'p9']
+
+
+def test_pagina_quita_stock_de_snapshots_viejos(importar):
+    ms = importar('menu_snapshot')
+    snapshot = {'local_id': 'L1', 'contents': [
+        {'producto_id': 'a', 'stock': 3}, {'producto_id': 'b', 'stock': 1}, {'producto_id': 'c'}
+    ]}
+    items, lek = ms.pagina(snapshot, 2)
+    assert items == [{'producto_id': 'a'}, {'producto_id': 'b'}]
+    assert lek == {'local_id': 'L1', 'producto_id': 'b'}
+    items, lek = ms.pagina(snapshot, 2, lek)
+    assert items == [{'producto_id': 'c'}] and lek is None
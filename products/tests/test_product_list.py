@@ -0,0 +1,50 @@
+import json
+from decimal import Decimal
+
+
+def _listar(pl, **body):
+    r = pl.lambda_handler({'httpMethod': 'POST', 'body': json.dumps({'local_id': 'L1', **body})}, None)
+    return r['statusCode'], json.loads(r['body'])
+
+
+def test_pagina_categoria_mas_alla_de_la_primera(importar, productos):
+    pl = importar('product_list')
+    for i, precio in enumerate(['9.90', '12.50', '7', '15.25', '11']):
+        productos.put_item(Item={
+            'local_id': 'L1', 'producto_id': f'p{i}', 'nombre': f'Plato {i}', 'categoria': 'Fondos',
+            'local_categoria': 'L1#Fondos', 'precio': Decimal(precio), 'stock': 3
+        })
+
+    vistos, token = [], None
+    for _ in range(3):
+        code, cuerpo = _listar(pl, categoria='Fondos', size=2, next_token=token)
+        assert code == 200
+        vistos.extend(p['precio'] for p in cuerpo['contents'])
+        token = cuerpo['next_token']
+        if not token:
+            break
+
+    assert vistos == [7, 9.9, 11, 12.5, 15.25]
+    assert token is None
+
+
+def test_token_con_decimal_vuelve_como_decimal(importar):
+    pl = importar('product_list')
+    lek = {'local_categoria': 'L1#Fondos', 'precio': Decimal('12.5'), 'local_id': 'L1', 'producto_id': 'p1'}
+    assert pl._decode_token(pl._encode_token(lek)) == lek
+    assert isinstance(pl._decode_token(pl._encode_token(lek))['precio'], Decimal)
+
+
+def test_snapshot_y_dynamodb_responden_sin_stock(importar, productos):
+    pl = importar('product_list')
+    productos.put_item(Item={
+        'local_id': 'L1', 'producto_id': 'p1', 'nombre': 'Ceviche', 'categoria': 'Fondos',
+        'local_categoria': 'L1#Fondos', 'precio': Decimal('25'), 'stock': 3
+    })
+
+    code_snapshot, desde_snapshot = _listar(pl)
+    code_categoria, desde_dynamodb = _listar(pl, categoria='Fondos')
+
+    assert code_snapshot == code_categoria == 200
+    assert desde_snapshot['contents'] == desde_dynamodb['contents']
+    assert 'stock' not in desde_dynamodb['contents'][0]
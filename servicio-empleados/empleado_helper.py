@@ -1,53 +1,146 @@
 import os
+import json
+import time
+from collections import OrderedDict
 import boto3
 from botocore.exceptions import ClientError
+from contadores import leer_version_empleados
 
 TABLE_EMPLEADOS = os.environ.get("TABLE_EMPLEADOS", "")
 
+# Caché por contenedor de empleados (LRU con TTL), clave (local_id, dni).
+# Los DNI inexistentes también se guardan (caché negativa, con TTL corto).
+# Cada entrada lleva el sello empleados_version del local (tabla de
+# contadores) con el que se leyó; si actualizar/eliminar/registrar empleado
+# cambian el sello, las entradas de ese local dejan de valer.
+EMPLEADOS_CACHE_TTL_SECONDS = int(os.environ.get("EMPLEADOS_CACHE_TTL_SECONDS", "300"))
+EMPLEADOS_CACHE_NEGATIVE_TTL_SECONDS = int(os.environ.get("EMPLEADOS_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+EMPLEADOS_CACHE_MAX = int(os.environ.get("EMPLEADOS_CACHE_MAX", "1024"))
+# Cada cuánto se vuelve a leer el sello de versión de un local
+EMPLEADOS_VERSION_TTL_SECONDS = int(os.environ.get("EMPLEADOS_VERSION_TTL_SECONDS", "5"))
+# Cada cuántas validaciones se imprimen las estadísticas en CloudWatch
+EMPLEADOS_CACHE_LOG_EVERY = int(os.environ.get("EMPLEADOS_CACHE_LOG_EVERY", "100"))
+
 dynamodb = boto3.resource("dynamodb")
 
+_cache = OrderedDict()   # (local_id, dni) -> (empleado | None, version, guardado_en)
+_versiones = {}          # local_id -> (version, leido_en)
+_stats = {"hits": 0, "misses": 0, "negativos": 0, "lecturas_version": 0, "invalidados": 0}
+
+
+def estadisticas_cache():
+    """Contadores del contenedor: hits/misses y lecturas de Empleados ahorradas."""
+    total = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "entradas": len(_cache),
+        "hit_ratio": round(_stats["hits"] / total, 3) if total else 0.0,
+        # Cada hit ahorra un get_item a Empleados; las lecturas del sello cuestan
+        "lecturas_ahorradas": _stats["hits"] - _stats["lecturas_version"]
+    }
+
+
+def _registrar_stats():
+    total = _stats["hits"] + _stats["misses"]
+    if EMPLEADOS_CACHE_LOG_EVERY and total % EMPLEADOS_CACHE_LOG_EVERY == 0:
+        print(f"empleados_cache {json.dumps(estadisticas_cache())}")
+
+
+def _version_local(local_id):
+    """Sello de versión del local, leído como mucho cada EMPLEADOS_VERSION_TTL_SECONDS."""
+    ahora = time.time()
+    cached = _versiones.get(local_id)
+    if cached and ahora - cached[1] < EMPLEADOS_VERSION_TTL_SECONDS:
+        return cached[0]
+    try:
+        version = leer_version_empleados(local_id)
+    except Exception as e:
+        print(f"Error leyendo versión de empleados de {local_id}: {e}")
+        _versiones.pop(local_id, None)
+        return False
+    _stats["lecturas_version"] += 1
+    _versiones[local_id] = (version, ahora)
+    return version
+
+
+def _desde_cache(key, version):
+    """(True, empleado|None) si hay una entrada vigente, (False, None) si no."""
+    entrada = _cache.get(key)
+    if not entrada or version is False:
+        return False, None
+    empleado, version_entrada, guardado_en = entrada
+    ttl = EMPLEADOS_CACHE_TTL_SECONDS if empleado else EMPLEADOS_CACHE_NEGATIVE_TTL_SECONDS
+    if version_entrada != version or time.time() - guardado_en >= ttl:
+        if version_entrada != version:
+            _stats["invalidados"] += 1
+        del _cache[key]
+        return False, None
+    _cache.move_to_end(key)
+    return True, empleado
+
+
+def _guardar(key, empleado, version):
+    if version is False:
+        return
+    _cache[key] = (empleado, version, time.time())
+    _cache.move_to_end(key)
+    while len(_cache) > EMPLEADOS_CACHE_MAX:
+        _cache.popitem(last=False)
+
+
 def validar_empleado(local_id, dni):
     """
     Valida que un empleado existe en la tabla de empleados
-    
+
     Args:
         local_id: ID del local/restaurante
         dni: DNI del empleado
-        
+
     Returns:
         tuple: (es_valido: bool, empleado: dict|None, error: str|None)
     """
     if not TABLE_EMPLEADOS:
         return False, None, "TABLE_EMPLEADOS no configurado"
-    
+
     if not local_id or not dni:
         return False, None, "local_id y dni son requeridos"
-    
-    try:
-        table = dynamodb.Table(TABLE_EMPLEADOS)
-        
-        # La tabla tiene PK=local_id, SK=dni
-        response = table.get_item(
-            Key={
-                "local_id": local_id,
-                "dni": dni
-            }
-        )
-        
-        empleado = response.get("Item")
-        
-        if not empleado:
-            return False, None, f"Empleado con DNI {dni} no encontrado en local {local_id}"
-        
-        # Verificar que el empleado esté activo (si existe ese campo)
-        if empleado.get("activo") is False:
-            return False, None, f"Empleado con DNI {dni} está inactivo"
-        
-        return True, empleado, None
-        
-    except ClientError as e:
-        print(f"Error validando empleado: {e}")
-        return False, None, f"Error consultando empleado: {str(e)}"
-    except Exception as e:
-        print(f"Error inesperado validando empleado: {e}")
-        return False, None, f"Error inesperado: {str(e)}"
+
+    key = (local_id, dni)
+    version = _version_local(local_id)
+    encontrado, empleado = _desde_cache(key, version)
+    if encontrado:
+        _stats["hits"] += 1
+        if empleado is None:
+            _stats["negativos"] += 1
+    else:
+        _stats["misses"] += 1
+        try:
+            table = dynamodb.Table(TABLE_EMPLEADOS)
+
+            # La tabla tiene PK=local_id, SK=dni
+            response = table.get_item(
+                Key={
+                    "local_id": local_id,
+                    "dni": dni
+                }
+            )
+
+            empleado = response.get("Item")
+            _guardar(key, empleado, version)
+
+        except ClientError as e:
+            print(f"Error validando empleado: {e}")
+            return False, None, f"Error consultando empleado: {str(e)}"
+        except Exception as e:
+            print(f"Error inesperado validando empleado: {e}")
+            return False, None, f"Error inesperado: {str(e)}"
+    _registrar_stats()
+
+    if not empleado:
+        return False, None, f"Empleado con DNI {dni} no encontrado en local {local_id}"
+
+    # Verificar que el empleado esté activo (si existe ese campo)
+    if empleado.get("activo") is False:
+        return False, None, f"Empleado con DNI {dni} está inactivo"
+
+    return True, empleado, None
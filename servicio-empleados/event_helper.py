@@ -1,27 +1,149 @@
 import json
 import os
+import time
+import random
 import boto3
-from datetime import datetime
+from botocore.exceptions import ClientError
 
 events = boto3.client('events')
 EVENT_BUS_NAME = os.environ.get('EVENT_BUS_NAME', 'default')
 
-def publish_event(source, detail_type, detail):
-    """Helper function to publish events to EventBridge"""
-    try:
-        events.put_events(
-            Entries=[{
-                'Source': source,
-                'DetailType': detail_type,
-                'Detail': json.dumps(detail),
-                'EventBusName': EVENT_BUS_NAME
-            }]
-        )
+# PutEvents limits: 10 entries per call and 256 KB per entry / per request
+MAX_ENTRIES_PER_CALL = 10
+MAX_REQUEST_BYTES = 256 * 1024
+PUBLISH_MAX_ATTEMPTS = 4
+PUBLISH_BACKOFF_BASE = 0.1   # seconds; doubles per attempt, with jitter
+PUBLISH_BACKOFF_MAX = 2.0
+# Entry-level errors worth retrying (the rest are permanent, e.g. malformed)
+RETRYABLE_ERRORS = {'ThrottlingException', 'InternalFailure', 'InternalException'}
+
+def is_retryable_call_error(error):
+    """A failed PutEvents call is retried only on throttling or a 5xx"""
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get('Error', {}).get('Code')
+    status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+    return code in RETRYABLE_ERRORS or status >= 500
+
+def entry_size(entry):
+    """Entry size as EventBridge computes it for the 256 KB limit"""
+    size = 14 if entry.get('Time') else 0
+    for key in ('Source', 'DetailType', 'Detail', 'EventBusName'):
+        if entry.get(key):
+            size += len(entry[key].encode('utf-8'))
+    for resource in entry.get('Resources', []):
+        size += len(resource.encode('utf-8'))
+    return size
+
+class EventPublisher:
+    """
+    Buffers EventBridge entries and sends them with as few PutEvents calls as
+    possible (up to 10 entries per call). Only the entries that failed are
+    retried, with jittered exponential backoff.
+
+    Usage:
+        with EventPublisher() as publisher:
+            publisher.add('200millas.pedidos', 'CrearPedido', detail)
+            publisher.add('200millas.pedidos', 'OtroEvento', detail)
+        # flushed on exit; publisher.failed holds the entries that were lost
+    """
+
+    def __init__(self, event_bus_name=None, client=None):
+        self.event_bus_name = event_bus_name or EVENT_BUS_NAME
+        self.client = client or events
+        self.pending = []
+        self.failed = []
+
+    def add(self, source, detail_type, detail):
+        """Queues an event. Returns False if it exceeds the 256 KB entry limit."""
+        entry = {
+            'Source': source,
+            'DetailType': detail_type,
+            'Detail': detail if isinstance(detail, str) else json.dumps(detail, ensure_ascii=False, default=str),
+            'EventBusName': self.event_bus_name
+        }
+        if entry_size(entry) > MAX_REQUEST_BYTES:
+            print(f"Event {detail_type} discarded: {entry_size(entry)} bytes exceeds the 256 KB limit")
+            self.failed.append(entry)
+            return False
+        self.pending.append(entry)
+        if len(self.pending) >= MAX_ENTRIES_PER_CALL:
+            self.flush()
         return True
-    except Exception as e:
-        print(f"Error publishing event: {e}")
+
+    def _chunks(self, entries):
+        """Groups entries respecting both the per-call count and size limits"""
+        chunk, chunk_size = [], 0
+        for entry in entries:
+            size = entry_size(entry)
+            if chunk and (len(chunk) == MAX_ENTRIES_PER_CALL or chunk_size + size > MAX_REQUEST_BYTES):
+                yield chunk
+                chunk, chunk_size = [], 0
+            chunk.append(entry)
+            chunk_size += size
+        if chunk:
+            yield chunk
+
+    def _send(self, entries):
+        """Sends one chunk, returns the entries that should be retried"""
+        try:
+            response = self.client.put_events(Entries=entries)
+        except Exception as e:
+            if is_retryable_call_error(e):
+                print(f"Error publishing events, will retry: {e}")
+                return entries
+            # Permanent (validation, permissions, bad bus name...): retrying won't help
+            print(f"Error publishing events: {e}")
+            self.failed.extend(entries)
+            return []
+        if not response.get('FailedEntryCount'):
+            return []
+        retry = []
+        # Results come back in the same order as the request entries
+        for entry, result in zip(entries, response.get('Entries', [])):
+            code = result.get('ErrorCode')
+            if not code:
+                continue
+            if code in RETRYABLE_ERRORS:
+                retry.append(entry)
+            else:
+                print(f"Event {entry['DetailType']} rejected: {code} {result.get('ErrorMessage')}")
+                self.failed.append(entry)
+        return retry
+
+    def flush(self):
+        """Publishes everything pending. Returns the number of entries lost."""
+        entries, self.pending = self.pending, []
+        attempt = 0
+        while entries:
+            retry = []
+            for chunk in self._chunks(entries):
+                retry.extend(self._send(chunk))
+            entries = retry
+            if not entries:
+                break
+            attempt += 1
+            if attempt >= PUBLISH_MAX_ATTEMPTS:
+                print(f"Giving up on {len(entries)} events after {attempt} attempts")
+                self.failed.extend(entries)
+                break
+            wait = min(PUBLISH_BACKOFF_BASE * (2 ** attempt), PUBLISH_BACKOFF_MAX)
+            time.sleep(wait * random.uniform(0.5, 1.0))
+        return len(self.failed)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
         return False
 
+def publish_event(source, detail_type, detail):
+    """Helper function to publish events to EventBridge"""
+    with EventPublisher() as publisher:
+        publisher.add(source, detail_type, detail)
+    return not publisher.failed
+
 def response(status_code, body):
     """Helper function to create HTTP response"""
     return {
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+from datetime import datetime, timezone
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from empleado_helper import validar_empleado
+from feed_difusion import GestorConexiones, mensajes, t_conexiones
+
+TABLE_PEDIDOS = os.environ.get("TABLE_PEDIDOS", "")
+PEDIDOS_ESTADO_INDEX = os.environ.get("PEDIDOS_ESTADO_INDEX", "by_local_estado")
+# API Gateway corta las conexiones WebSocket a las 2 horas
+FEED_CONEXION_TTL_SECONDS = int(os.environ.get("FEED_CONEXION_TTL_SECONDS", str(2 * 3600 + 300)))
+
+# Estados activos (los que están en el GSI disperso by_local_estado)
+ESTADOS_ACTIVOS = ["procesando", "en_preparacion", "cocina_completa", "empaquetando", "pedido_en_camino"]
+
+dynamodb = boto3.resource("dynamodb")
+
+
+def _resp(code, body=None):
+    return {"statusCode": code, "body": json.dumps(body or {}, ensure_ascii=False)}
+
+
+def _connection_id(event):
+    return event.get("requestContext", {}).get("connectionId")
+
+
+def conectar(event, context):
+    """
+    $connect  wss://<api>/<stage>?local_id=...&dni=...
+    Valida al empleado (igual que los triggers) y registra la conexión del local.
+    """
+    params = event.get("queryStringParameters") or {}
+    local_id = params.get("local_id")
+    dni = params.get("dni")
+    if not local_id or not dni:
+        return _resp(400, {"error": "local_id y dni son requeridos"})
+
+    es_valido, empleado, error = validar_empleado(local_id, dni)
+    if not es_valido:
+        return _resp(403, {"error": f"Empleado no autorizado: {error}"})
+
+    try:
+        t_conexiones.put_item(Item={
+            "connection_id": _connection_id(event),
+            "local_id": local_id,
+            "dni": dni,
+            "empleado_nombre": empleado.get("nombre", ""),
+            "conectado_en": datetime.now(timezone.utc).isoformat(),
+            "expira": int(time.time()) + FEED_CONEXION_TTL_SECONDS
+        })
+    except ClientError as e:
+        print(f"Error registrando conexión: {e}")
+        return _resp(500, {"error": "Error registrando conexión"})
+    return _resp(200)
+
+
+def desconectar(event, context):
+    """$disconnect: elimina la conexión (el TTL limpia las que no lleguen aquí)."""
+    try:
+        t_conexiones.delete_item(Key={"connection_id": _connection_id(event)})
+    except ClientError as e:
+        print(f"Error eliminando conexión: {e}")
+    return _resp(200)
+
+
+def _pedidos_activos(local_id):
+    """Pedidos activos del local desde el GSI disperso, una query por estado."""
+    table = dynamodb.Table(TABLE_PEDIDOS)
+    pedidos = []
+    for estado in ESTADOS_ACTIVOS:
+        qargs = {
+            "IndexName": PEDIDOS_ESTADO_INDEX,
+            "KeyConditionExpression": Key("local_estado").eq(f"{local_id}#{estado}"),
+            "ProjectionExpression": "pedido_id, estado, created_at, productos, direccion"
+        }
+        while True:
+            r = table.query(**qargs)
+            pedidos.extend(r.get("Items", []))
+            lek = r.get("LastEvaluatedKey")
+            if not lek:
+                break
+            qargs["ExclusiveStartKey"] = lek
+    pedidos.sort(key=lambda p: p.get("created_at", ""))
+    return pedidos
+
+
+def mensaje(event, context):
+    """
+    $default: mensajes de la pantalla.
+      {"accion": "ping"} -> {"tipo": "pong"}
+      {"accion": "sync"} -> {"tipo": "snapshot", "pedidos": [...activos del local]}
+    Después de un sync la pantalla solo aplica los deltas que lleguen.
+    """
+    connection_id = _connection_id(event)
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except json.JSONDecodeError:
+        body = {}
+    accion = body.get("accion")
+    gestor = GestorConexiones()
+
+    try:
+        if accion == "ping":
+            gestor.enviar(connection_id, json.dumps({"tipo": "pong"}))
+            return _resp(200)
+
+        if accion == "sync":
+            conexion = t_conexiones.get_item(Key={"connection_id": connection_id}).get("Item")
+            if not conexion:
+                return _resp(403, {"error": "Conexión no registrada"})
+            for data in mensajes("snapshot", _pedidos_activos(conexion["local_id"])):
+                gestor.enviar(connection_id, data)
+            return _resp(200)
+    except ClientError as e:
+        print(f"Error atendiendo mensaje {accion}: {e}")
+        return _resp(500, {"error": "Error atendiendo mensaje"})
+
+    gestor.enviar(connection_id, json.dumps({"tipo": "error", "error": "accion debe ser 'ping' o 'sync'"}))
+    return _resp(400)
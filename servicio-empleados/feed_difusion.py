@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from json_helper import dumps, dumps_bytes
+
+# Feed en tiempo real para pantallas de cocina/despacho (API WebSocket).
+# Las conexiones se guardan en TABLE_CONEXIONES_FEED (PK connection_id,
+# GSI by_local por local_id). Este Lambda lee el stream de Pedidos, que ya
+# refleja cada cambio de estado (pedido_create y los handlers del Step
+# Function), y envía a cada pantalla del local solo los deltas.
+TABLE_CONEXIONES_FEED = os.environ.get("TABLE_CONEXIONES_FEED", "TABLE_CONEXIONES_FEED")
+FEED_CONEXIONES_INDEX = os.environ.get("FEED_CONEXIONES_INDEX", "by_local")
+# https://<api_id>.execute-api.<region>.amazonaws.com/<stage>
+FEED_WS_ENDPOINT = os.environ.get("FEED_WS_ENDPOINT", "")
+FEED_MAX_WORKERS = int(os.environ.get("FEED_MAX_WORKERS", "32"))
+# Las API WebSocket aceptan mensajes de hasta 128 KB
+FEED_MAX_BYTES_MENSAJE = 120 * 1024
+
+# Mismos estados terminales que el GSI by_local_estado (pedidos_restaurante)
+ESTADOS_TERMINALES = {"entrega_delivery", "recibido", "fallido"}
+
+dynamodb = boto3.resource("dynamodb")
+t_conexiones = dynamodb.Table(TABLE_CONEXIONES_FEED)
+
+_deserializer = TypeDeserializer()
+
+
+def _imagen(record, nombre):
+    raw = record.get("dynamodb", {}).get(nombre)
+    if not raw:
+        return None
+    return {k: _deserializer.deserialize(v) for k, v in raw.items()}
+
+
+def delta_de_record(record):
+    """
+    Delta para las pantallas a partir de un registro del stream de Pedidos.
+
+    Retorna:
+        (local_id, delta) o (None, None) si no cambió el estado.
+        delta["accion"]: "nuevo" | "cambio" | "sale" (terminó o se eliminó)
+    """
+    vieja = _imagen(record, "OldImage")
+    nueva = _imagen(record, "NewImage")
+    estado_viejo = (vieja or {}).get("estado")
+    estado_nuevo = (nueva or {}).get("estado")
+
+    if vieja and nueva and estado_viejo == estado_nuevo:
+        return None, None
+    activo_antes = bool(vieja) and estado_viejo not in ESTADOS_TERMINALES
+    activo_ahora = bool(nueva) and estado_nuevo not in ESTADOS_TERMINALES
+    if not activo_antes and not activo_ahora:
+        return None, None
+
+    pedido = nueva or vieja
+    if not activo_ahora:
+        accion = "sale"
+    elif not activo_antes:
+        accion = "nuevo"
+    else:
+        accion = "cambio"
+
+    delta = {
+        "accion": accion,
+        "pedido_id": pedido.get("pedido_id"),
+        "estado": estado_nuevo,
+        "estado_anterior": estado_viejo,
+        "created_at": pedido.get("created_at"),
+        "at": record.get("dynamodb", {}).get("ApproximateCreationDateTime")
+    }
+    if accion == "nuevo":
+        delta["productos"] = [
+            {"producto_id": p.get("producto_id"), "nombre": p.get("nombre"), "cantidad": p.get("cantidad")}
+            for p in pedido.get("productos", []) if isinstance(p, dict)
+        ]
+        delta["direccion"] = pedido.get("direccion")
+    return pedido.get("local_id"), delta
+
+
+def mensajes(tipo, pedidos):
+    """Parte la lista en mensajes JSON que respeten el límite de tamaño."""
+    out, actual, tam = [], [], 0
+    for p in pedidos:
+        n = len(dumps_bytes(p))
+        if actual and tam + n > FEED_MAX_BYTES_MENSAJE:
+            out.append(actual)
+            actual, tam = [], 0
+        actual.append(p)
+        tam += n
+    if actual:
+        out.append(actual)
+    return [
+        dumps({"tipo": tipo, "pedidos": grupo})
+        for grupo in out
+    ]
+
+
+class GestorConexiones:
+    """Conexiones WebSocket de un local sobre DynamoDB + API de administración."""
+
+    def __init__(self, endpoint=None):
+        self.endpoint = endpoint or FEED_WS_ENDPOINT
+        self._api = None
+
+    @property
+    def api(self):
+        if self._api is None:
+            self._api = boto3.client("apigatewaymanagementapi", endpoint_url=self.endpoint)
+        return self._api
+
+    def listar(self, local_id):
+        ids, qargs = [], {
+            "IndexName": FEED_CONEXIONES_INDEX,
+            "KeyConditionExpression": Key("local_id").eq(local_id),
+            "ProjectionExpression": "connection_id"
+        }
+        while True:
+            r = t_conexiones.query(**qargs)
+            ids.extend(it["connection_id"] for it in r.get("Items", []))
+            lek = r.get("LastEvaluatedKey")
+            if not lek:
+                return ids
+            qargs["ExclusiveStartKey"] = lek
+
+    def enviar(self, connection_id, data):
+        """True si se entregó, False si la conexión ya no existe."""
+        try:
+            self.api.post_to_connection(ConnectionId=connection_id, Data=data.encode("utf-8"))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "GoneException":
+                return False
+            raise
+
+    def eliminar(self, connection_id):
+        t_conexiones.delete_item(Key={"connection_id": connection_id})
+
+
+def difundir(gestor, local_id, payloads):
+    """
+    Envía los mensajes a todas las pantallas del local en paralelo.
+    Las conexiones cerradas (GoneException) se eliminan.
+
+    Retorna:
+        (enviados, conexiones_eliminadas, errores)
+    """
+    conexiones = gestor.listar(local_id)
+    if not conexiones or not payloads:
+        return 0, 0, 0
+
+    def _a_conexion(connection_id):
+        try:
+            for data in payloads:
+                if not gestor.enviar(connection_id, data):
+                    gestor.eliminar(connection_id)
+                    return "eliminada"
+            return "ok"
+        except Exception as e:
+            print(f"Error enviando a {connection_id}: {e}")
+            return "error"
+
+    with ThreadPoolExecutor(max_workers=min(FEED_MAX_WORKERS, len(conexiones))) as pool:
+        resultados = list(pool.map(_a_conexion, conexiones))
+    return resultados.count("ok"), resultados.count("eliminada"), resultados.count("error")
+
+
+def lambda_handler(event, context, gestor=None):
+    """
+    Consumidor del stream de Pedidos. Agrupa los deltas del lote por local
+    (en orden) y hace una difusión por local. El feed es best effort: una
+    pantalla que pierda mensajes se resincroniza con {"accion": "sync"}.
+    """
+    gestor = gestor or GestorConexiones()
+    por_local = {}
+    for record in event.get("Records", []):
+        local_id, delta = delta_de_record(record)
+        if local_id and delta:
+            por_local.setdefault(local_id, []).append(delta)
+
+    for local_id, deltas in por_local.items():
+        try:
+            enviados, eliminadas, errores = difundir(gestor, local_id, mensajes("deltas", deltas))
+            print(f"Feed {local_id}: {len(deltas)} delta(s) -> {enviados} pantalla(s), "
+                  f"{eliminadas} desconectada(s), {errores} error(es)")
+        except ClientError as e:
+            print(f"Error difundiendo feed de {local_id}: {e}")
+
+    return {"batchItemFailures": []}
+
+
+# ---------- replay local ----------
+class GestorConsola:
+    """Gestor de prueba: N pantallas ficticias por local, imprime lo que recibirían."""
+
+    def __init__(self, pantallas=1):
+        self.pantallas = pantallas
+
+    def listar(self, local_id):
+        return [f"{local_id}-pantalla-{i}" for i in range(self.pantallas)]
+
+    def enviar(self, connection_id, data):
+        if connection_id.endswith("-pantalla-0"):
+            print(f"  -> {connection_id}: {data}")
+        return True
+
+    def eliminar(self, connection_id):
+        pass
+
+
+if __name__ == "__main__":
+    # Reproduce registros del stream de Pedidos guardados en JSON ({"Records": [...]})
+    # sin API Gateway ni tabla de conexiones.
+    #   python feed_difusion.py registros.json [pantallas_por_local]
+    if len(sys.argv) < 2:
+        print("Uso: python feed_difusion.py <registros.json> [pantallas_por_local]")
+        sys.exit(1)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        evento = json.load(f)
+    pantallas = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    lambda_handler(evento, None, gestor=GestorConsola(pantallas))
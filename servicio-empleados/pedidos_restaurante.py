@@ -3,24 +3,22 @@ import json
 import math
 import base64
 import boto3
-from decimal import Decimal
 from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
+from contadores import leer_total
+from json_helper import respuesta
 
 TABLE_PEDIDOS = os.environ.get("TABLE_PEDIDOS", "")
+# GSI disperso (local_estado = "<local_id>#<estado>", created_at): solo pedidos activos
+PEDIDOS_ESTADO_INDEX = os.environ.get("PEDIDOS_ESTADO_INDEX", "by_local_estado")
+# Estados que salen del índice (mismos que stepFunction/handlers/pedido_estado.py)
+ESTADOS_TERMINALES = {"entrega_delivery", "recibido", "fallido"}
+# Máximo de queries por llamada cuando se filtran productos en memoria;
+# al agotarse se responde lo encontrado con next_token para seguir
+MAX_QUERIES_POR_PAGINA = 10
 
-CORS_HEADERS = {
-    "Access-Control-Allow-Origin": "*",
-    "Access-Control-Allow-Headers": "Content-Type,Authorization",
-    "Access-Control-Allow-Methods": "OPTIONS,POST"
-}
-
-def _resp(code, body):
-    return {
-        "statusCode": code,
-        "headers": {"Content-Type": "application/json", **CORS_HEADERS},
-        "body": json.dumps(body, ensure_ascii=False, default=str)
-    }
+def _resp(code, body, event=None):
+    return respuesta(code, body, event=event)
 
 def _parse_body(event):
     body = event.get("body")
@@ -34,15 +32,6 @@ def _safe_int(v, default):
     except Exception:
         return default
 
-def _convert_decimal(obj):
-    if isinstance(obj, Decimal):
-        return float(obj)
-    if isinstance(obj, dict):
-        return {k: _convert_decimal(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_convert_decimal(i) for i in obj]
-    return obj
-
 def _encode_token(lek: dict | None) -> str | None:
     if not lek:
         return None
@@ -72,11 +61,75 @@ def _filter_productos(productos, categoria=None, nombre=None):
     
     return filtered
 
-def _matches_estado(pedido_estado, estado_filter):
-    """Verifica si el estado del pedido coincide con el filtro"""
-    if not estado_filter:
+MAX_FIELDS = 30
+
+def _validar_fields(fields):
+    """fields opcional: lista de nombres de atributo de primer nivel"""
+    if fields is None:
         return True
-    return pedido_estado == estado_filter
+    return (
+        isinstance(fields, list) and 0 < len(fields) <= MAX_FIELDS
+        and all(isinstance(f, str) and f.strip() and len(f) <= 255 for f in fields)
+    )
+
+def _projection(fields, requeridos=()):
+    """
+    ProjectionExpression con placeholders (#pN) para cualquier nombre,
+    incluidas palabras reservadas. requeridos son atributos que el handler
+    necesita leer (orden, paginación, filtros) aunque no se pidan.
+    """
+    nombres = {}
+    for i, f in enumerate(dict.fromkeys([*fields, *requeridos])):
+        nombres[f"#p{i}"] = f
+    return {"ProjectionExpression": ", ".join(nombres), "ExpressionAttributeNames": nombres}
+
+def _recortar(items, fields):
+    """Deja solo las claves del pedido y los fields pedidos"""
+    visibles = {"local_id", "pedido_id", *fields}
+    return [{k: v for k, v in it.items() if k in visibles} for it in items]
+
+def _claves_consulta(usa_indice):
+    claves = ["local_id", "pedido_id"]
+    return claves + ["local_estado", "created_at"] if usa_indice else claves
+
+def _consultar(table, qargs, claves, size, lek, categoria=None, nombre=None):
+    """
+    Pagina la query hasta juntar size pedidos. Con filtros de producto
+    (categoria/nombre) se filtra en memoria y el next_token apunta al
+    último pedido revisado, así la página siguiente sigue desde ahí.
+
+    Retorna:
+        (items, lek_out, queries)
+    """
+    items, queries = [], 0
+    while queries < MAX_QUERIES_POR_PAGINA:
+        args = {**qargs, "Limit": size}
+        if lek:
+            args["ExclusiveStartKey"] = lek
+        response = table.query(**args)
+        page_items = response.get("Items", [])
+        lek = response.get("LastEvaluatedKey")
+        queries += 1
+
+        for i, item in enumerate(page_items):
+            # Filtrar productos dentro del pedido si se especificaron filtros de producto
+            if categoria or nombre:
+                productos_filtrados = _filter_productos(item.get("productos", []), categoria, nombre)
+                # Solo incluir el pedido si tiene productos que coinciden con los filtros
+                if not productos_filtrados:
+                    continue
+                item = {**item, "productos": productos_filtrados}
+            items.append(item)
+
+            if len(items) >= size:
+                if i < len(page_items) - 1:
+                    lek = {k: page_items[i][k] for k in claves}
+                return items, lek, queries
+
+        # Si no hay más items en DynamoDB, parar
+        if not lek:
+            break
+    return items, lek, queries
 
 def lambda_handler(event, context):
     # CORS preflight
@@ -103,93 +156,65 @@ def lambda_handler(event, context):
     nombre = body.get("nombre")
     estado = body.get("estado")  # Filtro por estado
     
-    # Paginación - si hay filtros, ignorar size y traer TODOS
+    # Paginación por token (también con filtros)
     size = _safe_int(body.get("size", body.get("limit", 10)), 10)
     if size <= 0 or size > 1000:
         size = 10
-    
-    # Si hay filtros activos, traer TODOS los items que coincidan
-    traer_todos = bool(estado or categoria or nombre)
 
-    # Paginación por token (solo si NO hay filtros)
     next_token_in = body.get("next_token")
-    lek = _decode_token(next_token_in) if not traer_todos else None
+    lek = _decode_token(next_token_in)
+    if next_token_in and lek is None:
+        return _resp(400, {"error": "next_token inválido"})
+
+    # Selección de atributos (p. ej. ["estado", "costo", "created_at"])
+    fields = body.get("fields")
+    if not _validar_fields(fields):
+        return _resp(400, {"error": f"fields debe ser una lista de hasta {MAX_FIELDS} nombres de atributo"})
 
     ddb = boto3.resource("dynamodb")
     table = ddb.Table(TABLE_PEDIDOS)
 
-    # Si hay filtros, obtener TODOS los items y filtrar en memoria
-    filtered_items = []
-    query_lek = lek
-    queries_done = 0
-    
+    # Estado activo -> key condition sobre el GSI disperso (más recientes primero).
+    # Estados terminales ya no están en el índice: se filtran en la partición del local.
+    usa_indice = bool(estado) and estado not in ESTADOS_TERMINALES
+    if usa_indice:
+        qargs = {
+            "IndexName": PEDIDOS_ESTADO_INDEX,
+            "KeyConditionExpression": Key("local_estado").eq(f"{local_id}#{estado}"),
+            "ScanIndexForward": False
+        }
+    else:
+        qargs = {
+            "KeyConditionExpression": Key("local_id").eq(local_id),
+            "ScanIndexForward": False
+        }
+        if estado:
+            qargs["FilterExpression"] = Attr("estado").eq(estado)
+
+    claves = _claves_consulta(usa_indice)
+    if fields:
+        # Claves para el next_token, created_at para ordenar y productos si se filtra por ellos
+        requeridos = [*claves, "created_at", *(["productos"] if categoria or nombre else [])]
+        qargs.update(_projection(fields, requeridos))
+
     try:
-        # Continuar consultando hasta obtener TODOS los items (si hay filtros) o hasta size (sin filtros)
-        while True:
-            qargs = {
-                "KeyConditionExpression": Key("local_id").eq(local_id),
-                "ScanIndexForward": False  # Más recientes primero
-            }
-            
-            # Si NO hay filtros, usar paginación normal
-            if not traer_todos:
-                qargs["Limit"] = size
-            
-            if query_lek:
-                qargs["ExclusiveStartKey"] = query_lek
-            
-            response = table.query(**qargs)
-            page_items = response.get("Items", [])
-            query_lek = response.get("LastEvaluatedKey")
-            queries_done += 1
-            
-            # Aplicar filtros a los items de esta página
-            for item in page_items:
-                # Filtrar por estado si se especificó
-                if estado and not _matches_estado(item.get("estado"), estado):
-                    continue
-                
-                # Filtrar productos dentro del pedido si se especificaron filtros de producto
-                if categoria or nombre:
-                    productos = item.get("productos", [])
-                    productos_filtrados = _filter_productos(productos, categoria, nombre)
-                    
-                    # Solo incluir el pedido si tiene productos que coinciden con los filtros
-                    if productos_filtrados:
-                        item_copy = item.copy()
-                        item_copy["productos"] = productos_filtrados
-                        filtered_items.append(item_copy)
-                else:
-                    # Sin filtros de producto, incluir el pedido completo
-                    filtered_items.append(item)
-                
-                # Si NO hay filtros y ya tenemos suficientes, parar
-                if not traer_todos and len(filtered_items) >= size:
-                    break
-            
-            # Si no hay más items en DynamoDB, parar
-            if not query_lek:
-                break
-            
-            # Si NO hay filtros y ya tenemos suficientes items, parar
-            if not traer_todos and len(filtered_items) >= size:
-                break
-        
-        print(f"Query completado: {len(filtered_items)} pedidos encontrados después de {queries_done} query(s). Filtros activos: {traer_todos}")
-        
+        items, lek_out, queries_done = _consultar(
+            table, qargs, claves, size, lek, categoria, nombre
+        )
+        print(f"Query completado: {len(items)} pedidos encontrados después de {queries_done} query(s). Índice: {usa_indice}")
+
     except ClientError as e:
+        if e.response["Error"]["Code"] == "ValidationException" and lek:
+            return _resp(400, {"error": "next_token inválido para estos filtros"})
         print(f"Error query pedidos: {e}")
         return _resp(500, {"error": "Error consultando pedidos del restaurante"})
-    
-    items = filtered_items
-    # Si hay filtros, no hay next_token (se trajeron todos)
-    lek_out = None if traer_todos else query_lek
 
-    # Ordenar por fecha (created_at) descendente
+    # Ordenar por fecha (created_at) descendente dentro de la página
     items.sort(key=lambda x: x.get("created_at", ""), reverse=True)
 
     next_token_out = _encode_token(lek_out)
-    items = _convert_decimal(items)
+    if fields:
+        items = _recortar(items, fields)
 
     resp = {
         "pedidos": items,
@@ -198,4 +223,15 @@ def lambda_handler(event, context):
         "local_id": local_id
     }
 
-    return _resp(200, resp)
+    # Total opcional desde los contadores por local (pedidos#<estado>).
+    # Los filtros por producto no se agregan, así que ahí no hay total.
+    if body.get("include_total"):
+        total = None
+        if not (categoria or nombre):
+            try:
+                total = leer_total("pedidos", local_id, estado)
+            except ClientError as e:
+                print(f"Error leyendo contadores: {e}")
+        resp["totalElements"] = total
+
+    return _resp(200, resp, event)
@@ -0,0 +1,114 @@
+import json
+from event_helper import EventPublisher, response
+from empleado_helper import validar_empleado
+
+# transicion -> (Source, DetailType), los mismos que publican los triggers individuales
+TRANSICIONES = {
+    'en_preparacion': ('200millas.cocina', 'EnPreparacion'),
+    'cocina_completa': ('200millas.cocina', 'CocinaCompleta'),
+    'empaquetado': ('200millas.cocina', 'Empaquetado'),
+    'pedido_en_camino': ('200millas.delivery', 'PedidoEnCamino'),
+    'entrega_delivery': ('200millas.delivery', 'EntregaDelivery'),
+}
+
+MAX_TRANSICIONES = 100
+
+def _validar_item(i, it):
+    if not isinstance(it, dict):
+        return f'transiciones[{i}] debe ser objeto'
+    if not isinstance(it.get('order_id'), str) or not it['order_id'].strip():
+        return f'transiciones[{i}].order_id es requerido'
+    if it.get('transicion') not in TRANSICIONES:
+        return f"transiciones[{i}].transicion debe ser una de: {', '.join(TRANSICIONES)}"
+    return None
+
+def handler(event, context):
+    """
+    Trigger de varias transiciones en una sola llamada
+    POST /empleados/transiciones
+    Body: {
+        "local_id": "...", "dni": "...",
+        "transiciones": [{ "order_id": "...", "transicion": "cocina_completa" }, ...]
+    }
+    Valida al empleado una vez y publica los eventos en lotes de PutEvents.
+    Responde 200 si todo se publicó, 207 con el resultado por pedido si no.
+    """
+    try:
+        body = json.loads(event.get('body') or '{}')
+        local_id = body.get('local_id')
+        dni = body.get('dni')
+        transiciones = body.get('transiciones')
+
+        if not local_id or not dni:
+            return response(400, {
+                'error': 'local_id y dni son requeridos'
+            })
+        if not isinstance(transiciones, list) or not transiciones:
+            return response(400, {
+                'error': 'transiciones debe ser un array con al menos un item'
+            })
+        if len(transiciones) > MAX_TRANSICIONES:
+            return response(400, {
+                'error': f'Máximo {MAX_TRANSICIONES} transiciones por llamada'
+            })
+
+        # Validar que el empleado existe (una sola lectura para todo el lote)
+        es_valido, empleado, error = validar_empleado(local_id, dni)
+
+        if not es_valido:
+            return response(403, {
+                'error': f'Empleado no autorizado: {error}'
+            })
+
+        resultados = []
+        publicados = set()
+        with EventPublisher() as publisher:
+            for i, it in enumerate(transiciones):
+                error = _validar_item(i, it)
+                if error:
+                    datos = it if isinstance(it, dict) else {}
+                    resultados.append({
+                        'order_id': datos.get('order_id'),
+                        'transicion': datos.get('transicion'),
+                        'ok': False,
+                        'error': error
+                    })
+                    continue
+
+                order_id, transicion = it['order_id'], it['transicion']
+                resultados.append({'order_id': order_id, 'transicion': transicion, 'ok': True})
+                # Un reintento del tablet puede repetir pares: se publican una vez
+                if (order_id, transicion) in publicados:
+                    continue
+                publicados.add((order_id, transicion))
+
+                source, detail_type = TRANSICIONES[transicion]
+                publisher.add(source, detail_type, {
+                    'order_id': order_id,
+                    'local_id': local_id,
+                    'empleado_dni': dni,
+                    'empleado_nombre': empleado.get('nombre', ''),
+                    'status': 'ACEPTADO'
+                })
+
+        # Marcar los pares cuyos eventos no se pudieron publicar
+        tipos = {detail_type: transicion for transicion, (_, detail_type) in TRANSICIONES.items()}
+        fallidos = set()
+        for entry in publisher.failed:
+            fallidos.add((json.loads(entry['Detail']).get('order_id'), tipos.get(entry['DetailType'])))
+        for r in resultados:
+            if r['ok'] and (r['order_id'], r['transicion']) in fallidos:
+                r['ok'] = False
+                r['error'] = 'Failed to publish event'
+
+        ok = sum(1 for r in resultados if r['ok'])
+        return response(200 if ok == len(resultados) else 207, {
+            'message': f'{ok} de {len(resultados)} transiciones publicadas',
+            'empleado': empleado.get('nombre', dni),
+            'resultados': resultados
+        })
+
+    except Exception as e:
+        return response(500, {
+            'error': str(e)
+        })
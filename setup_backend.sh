@@ -50,6 +50,10 @@ check_env() {
   : "${TABLE_PEDIDOS:?Falta TABLE_PEDIDOS en .env}"
   : "${TABLE_HISTORIAL_ESTADOS:?Falta TABLE_HISTORIAL_ESTADOS en .env}"
   : "${TABLE_TOKENS_USUARIOS:?Falta TABLE_TOKENS_USUARIOS en .env}"
+  : "${TABLE_CONTADORES:?Falta TABLE_CONTADORES en .env}"
+  : "${TABLE_BUSQUEDA_PRODUCTOS:?Falta TABLE_BUSQUEDA_PRODUCTOS en .env}"
+  : "${TABLE_IDEMPOTENCIA:?Falta TABLE_IDEMPOTENCIA en .env}"
+  : "${TABLE_CONEXIONES_FEED:?Falta TABLE_CONEXIONES_FEED en .env}"
   : "${S3_BUCKET_NAME:?Falta S3_BUCKET_NAME en .env}"
 
   export AWS_REGION="${AWS_REGION:-us-east-1}"
@@ -181,11 +185,24 @@ create_dynamodb_tables() {
     --billing-mode PAY_PER_REQUEST \
     --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_USUARIOS} ya existe"
   
-  # Tabla Empleados
+  # Tabla Empleados (con GSI by_role)
   aws dynamodb create-table \
     --table-name "${TABLE_EMPLEADOS}" \
-    --attribute-definitions AttributeName=local_id,AttributeType=S AttributeName=dni,AttributeType=S \
+    --attribute-definitions \
+      AttributeName=local_id,AttributeType=S \
+      AttributeName=dni,AttributeType=S \
+      AttributeName=role,AttributeType=S \
     --key-schema AttributeName=local_id,KeyType=HASH AttributeName=dni,KeyType=RANGE \
+    --global-secondary-indexes \
+      "[{
+        \"IndexName\": \"by_role\",
+        \"KeySchema\": [
+          {\"AttributeName\": \"role\", \"KeyType\": \"HASH\"},
+          {\"AttributeName\": \"local_id\", \"KeyType\": \"RANGE\"}
+        ],
+        \"Projection\": {\"ProjectionType\": \"ALL\"}
+      }]" \
+    --stream-specification StreamEnabled=true,StreamViewType=NEW_AND_OLD_IMAGES \
     --billing-mode PAY_PER_REQUEST \
     --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_EMPLEADOS} ya existe"
   
@@ -197,15 +214,29 @@ create_dynamodb_tables() {
     --billing-mode PAY_PER_REQUEST \
     --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_LOCALES} ya existe"
   
-  # Tabla Productos
+  # Tabla Productos (con GSI by_local_categoria)
   aws dynamodb create-table \
     --table-name "${TABLE_PRODUCTOS}" \
-    --attribute-definitions AttributeName=local_id,AttributeType=S AttributeName=producto_id,AttributeType=S \
+    --attribute-definitions \
+      AttributeName=local_id,AttributeType=S \
+      AttributeName=producto_id,AttributeType=S \
+      AttributeName=local_categoria,AttributeType=S \
+      AttributeName=precio,AttributeType=N \
     --key-schema AttributeName=local_id,KeyType=HASH AttributeName=producto_id,KeyType=RANGE \
+    --global-secondary-indexes \
+      "[{
+        \"IndexName\": \"by_local_categoria\",
+        \"KeySchema\": [
+          {\"AttributeName\": \"local_categoria\", \"KeyType\": \"HASH\"},
+          {\"AttributeName\": \"precio\", \"KeyType\": \"RANGE\"}
+        ],
+        \"Projection\": {\"ProjectionType\": \"ALL\"}
+      }]" \
+    --stream-specification StreamEnabled=true,StreamViewType=NEW_AND_OLD_IMAGES \
     --billing-mode PAY_PER_REQUEST \
     --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_PRODUCTOS} ya existe"
   
-  # Tabla Pedidos (con GSI by_usuario_v2)
+  # Tabla Pedidos (con GSI by_usuario_v2 y by_local_estado)
   aws dynamodb create-table \
     --table-name "${TABLE_PEDIDOS}" \
     --attribute-definitions \
@@ -213,6 +244,7 @@ create_dynamodb_tables() {
       AttributeName=pedido_id,AttributeType=S \
       AttributeName=correo,AttributeType=S \
       AttributeName=created_at,AttributeType=S \
+      AttributeName=local_estado,AttributeType=S \
     --key-schema AttributeName=local_id,KeyType=HASH AttributeName=pedido_id,KeyType=RANGE \
     --global-secondary-indexes \
       "[{
@@ -223,7 +255,17 @@ create_dynamodb_tables() {
         ],
         \"Projection\": {\"ProjectionType\": \"ALL\"},
         \"ProvisionedThroughput\": {\"ReadCapacityUnits\": 5, \"WriteCapacityUnits\": 5}
+      },
+      {
+        \"IndexName\": \"by_local_estado\",
+        \"KeySchema\": [
+          {\"AttributeName\": \"local_estado\", \"KeyType\": \"HASH\"},
+          {\"AttributeName\": \"created_at\", \"KeyType\": \"RANGE\"}
+        ],
+        \"Projection\": {\"ProjectionType\": \"ALL\"},
+        \"ProvisionedThroughput\": {\"ReadCapacityUnits\": 5, \"WriteCapacityUnits\": 5}
       }]" \
+    --stream-specification StreamEnabled=true,StreamViewType=NEW_AND_OLD_IMAGES \
     --billing-mode PROVISIONED \
     --provisioned-throughput ReadCapacityUnits=5,WriteCapacityUnits=5 \
     --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_PEDIDOS} ya existe"
@@ -243,6 +285,63 @@ create_dynamodb_tables() {
     --key-schema AttributeName=token,KeyType=HASH \
     --billing-mode PAY_PER_REQUEST \
     --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_TOKENS_USUARIOS} ya existe"
+  # TTL para los items de revocación de tokens firmados (__revocado__#...)
+  aws dynamodb wait table-exists --table-name "${TABLE_TOKENS_USUARIOS}" --region "${AWS_REGION}"
+  aws dynamodb update-time-to-live \
+    --table-name "${TABLE_TOKENS_USUARIOS}" \
+    --time-to-live-specification Enabled=true,AttributeName=expira \
+    --region "${AWS_REGION}" >/dev/null 2>&1 || echo "   TTL de ${TABLE_TOKENS_USUARIOS} ya habilitado"
+  
+  # Tabla Contadores (un item por local, mantenido desde los streams)
+  aws dynamodb create-table \
+    --table-name "${TABLE_CONTADORES}" \
+    --attribute-definitions AttributeName=local_id,AttributeType=S \
+    --key-schema AttributeName=local_id,KeyType=HASH \
+    --billing-mode PAY_PER_REQUEST \
+    --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_CONTADORES} ya existe"
+  
+  # Tabla Búsqueda Productos (índice invertido por nombre)
+  aws dynamodb create-table \
+    --table-name "${TABLE_BUSQUEDA_PRODUCTOS}" \
+    --attribute-definitions AttributeName=clave,AttributeType=S AttributeName=producto_id,AttributeType=S \
+    --key-schema AttributeName=clave,KeyType=HASH AttributeName=producto_id,KeyType=RANGE \
+    --billing-mode PAY_PER_REQUEST \
+    --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_BUSQUEDA_PRODUCTOS} ya existe"
+  
+  # Tabla Idempotencia (Idempotency-Key de /pedido/create, con TTL)
+  aws dynamodb create-table \
+    --table-name "${TABLE_IDEMPOTENCIA}" \
+    --attribute-definitions AttributeName=clave,AttributeType=S \
+    --key-schema AttributeName=clave,KeyType=HASH \
+    --billing-mode PAY_PER_REQUEST \
+    --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_IDEMPOTENCIA} ya existe"
+  aws dynamodb wait table-exists --table-name "${TABLE_IDEMPOTENCIA}" --region "${AWS_REGION}"
+  aws dynamodb update-time-to-live \
+    --table-name "${TABLE_IDEMPOTENCIA}" \
+    --time-to-live-specification Enabled=true,AttributeName=expira \
+    --region "${AWS_REGION}" >/dev/null 2>&1 || echo "   TTL de ${TABLE_IDEMPOTENCIA} ya habilitado"
+  
+  # Tabla Conexiones Feed (WebSocket de pantallas de cocina, GSI by_local y TTL)
+  aws dynamodb create-table \
+    --table-name "${TABLE_CONEXIONES_FEED}" \
+    --attribute-definitions AttributeName=connection_id,AttributeType=S AttributeName=local_id,AttributeType=S \
+    --key-schema AttributeName=connection_id,KeyType=HASH \
+    --global-secondary-indexes \
+      "[{
+        \"IndexName\": \"by_local\",
+        \"KeySchema\": [
+          {\"AttributeName\": \"local_id\", \"KeyType\": \"HASH\"},
+          {\"AttributeName\": \"connection_id\", \"KeyType\": \"RANGE\"}
+        ],
+        \"Projection\": {\"ProjectionType\": \"KEYS_ONLY\"}
+      }]" \
+    --billing-mode PAY_PER_REQUEST \
+    --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_CONEXIONES_FEED} ya existe"
+  aws dynamodb wait table-exists --table-name "${TABLE_CONEXIONES_FEED}" --region "${AWS_REGION}"
+  aws dynamodb update-time-to-live \
+    --table-name "${TABLE_CONEXIONES_FEED}" \
+    --time-to-live-specification Enabled=true,AttributeName=expira \
+    --region "${AWS_REGION}" >/dev/null 2>&1 || echo "   TTL de ${TABLE_CONEXIONES_FEED} ya habilitado"
   
   echo -e "${GREEN}✅ Tablas DynamoDB creadas${NC}"
   
@@ -254,6 +353,54 @@ create_dynamodb_tables() {
   create_gsi_if_needed
 }
 
+export_stream_arns() {
+  echo -e "${BLUE}🔍 Verificando DynamoDB Streams para contadores...${NC}"
+  
+  local pares=(
+    "STREAM_ARN_EMPLEADOS:${TABLE_EMPLEADOS}"
+    "STREAM_ARN_PRODUCTOS:${TABLE_PRODUCTOS}"
+    "STREAM_ARN_PEDIDOS:${TABLE_PEDIDOS}"
+  )
+  
+  for par in "${pares[@]}"; do
+    local var="${par%%:*}"
+    local table_name="${par#*:}"
+    local arn=$(aws dynamodb describe-table \
+      --table-name "${table_name}" \
+      --region "${AWS_REGION}" \
+      --query "Table.LatestStreamArn" \
+      --output text 2>/dev/null || echo "None")
+    
+    # Habilitar el stream en tablas creadas antes de los contadores
+    if [[ -z "$arn" || "$arn" == "None" ]]; then
+      echo -e "${YELLOW}   📝 Habilitando stream en ${table_name}...${NC}"
+      arn=$(aws dynamodb update-table \
+        --table-name "${table_name}" \
+        --stream-specification StreamEnabled=true,StreamViewType=NEW_AND_OLD_IMAGES \
+        --region "${AWS_REGION}" \
+        --query "TableDescription.LatestStreamArn" \
+        --output text)
+    fi
+    
+    export "${var}=${arn}"
+    echo -e "${GREEN}   ✅ ${var}=${arn}${NC}"
+  done
+}
+
+reconcile_counters() {
+  local LAMBDA_NAME="service-contadores-dev-ReconciliarContadores"
+  
+  echo -e "${BLUE}🔢 Reconstruyendo contadores por local...${NC}"
+  if aws lambda invoke \
+    --function-name "${LAMBDA_NAME}" \
+    --region "${AWS_REGION}" \
+    /dev/null >/dev/null 2>&1; then
+    echo -e "${GREEN}   ✅ Contadores reconciliados${NC}"
+  else
+    echo -e "${YELLOW}   ⚠️  No se pudo invocar ${LAMBDA_NAME}${NC}"
+  fi
+}
+
 deploy_infrastructure() {
   echo -e "\n${BLUE}🏗️  Creando recursos de infraestructura (DynamoDB + S3)${NC}"
   
@@ -283,6 +430,12 @@ deploy_infrastructure() {
     echo -e "${YELLOW}ℹ️  No se encontró DataPoblator.py. Saltando población de datos.${NC}"
   fi
 
+  # 6) Indexar nombres de productos cargados
+  if [[ -f "crear_indice_busqueda_productos.py" ]]; then
+    echo -e "${BLUE}🔎 Indexando nombres de productos...${NC}"
+    python3 crear_indice_busqueda_productos.py
+  fi
+
   echo -e "${GREEN}✅ Infraestructura lista${NC}"
 }
 
@@ -357,6 +510,7 @@ cleanup_failed_stacks() {
     "service-products-dev"
     "service-clientes-dev"
     "servicio-empleados-dev"
+    "service-contadores-dev"
     "service-orders-200-millas-dev"
     "millas-dependencias-dev"
   )
@@ -461,10 +615,14 @@ deploy_services() {
   prepare_dependencies
   
   # 2) Desplegar servicios principales usando serverless-compose
+  export_stream_arns
   echo -e "${YELLOW}📦 Desplegando servicios principales (users, products, clientes)...${NC}"
   sls deploy
   echo -e "${GREEN}✅ Servicios principales desplegados${NC}"
   
+  # Los streams arrancan en LATEST: reconstruir lo cargado antes del despliegue
+  reconcile_counters
+  
   # 3) Desplegar Step Functions
   if [[ -d "stepFunction" ]]; then
     echo -e "${YELLOW}⚙️  Desplegando Step Functions...${NC}"
@@ -578,6 +736,10 @@ remove_infrastructure() {
   aws dynamodb delete-table --table-name "${TABLE_PEDIDOS}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_PEDIDOS} no existe"
   aws dynamodb delete-table --table-name "${TABLE_HISTORIAL_ESTADOS}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_HISTORIAL_ESTADOS} no existe"
   aws dynamodb delete-table --table-name "${TABLE_TOKENS_USUARIOS}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_TOKENS_USUARIOS} no existe"
+  aws dynamodb delete-table --table-name "${TABLE_CONTADORES}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_CONTADORES} no existe"
+  aws dynamodb delete-table --table-name "${TABLE_BUSQUEDA_PRODUCTOS}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_BUSQUEDA_PRODUCTOS} no existe"
+  aws dynamodb delete-table --table-name "${TABLE_IDEMPOTENCIA}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_IDEMPOTENCIA} no existe"
+  aws dynamodb delete-table --table-name "${TABLE_CONEXIONES_FEED}" --region "${AWS_REGION}" 2>/dev/null || echo "   Tabla ${TABLE_CONEXIONES_FEED} no existe"
   
   # 2) Eliminar bucket de imágenes
   if [[ -n "${S3_BUCKET_NAME:-}" ]]; then
@@ -0,0 +1,163 @@
+import json
+import os
+import sys
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pop_and_dispatch import iniciar_ejecucion, DISPATCH_MAX_WORKERS
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Consumidor por event source mapping de los mensajes de despacho de
+# pop_and_dispatch ({"id_pedido", "estado"} o "id,estado"): la alternativa a
+# llamar a POST /pedidos/pop. Cada mensaje se despacha igual que allí y la
+# respuesta lleva batchItemFailures, así que SQS solo reintenta los mensajes
+# que fallaron (ReportBatchItemFailures).
+#
+# No se conecta a Cola_Cocina / Cola_Delivery: ahí el Step Function encola
+# los pedidos para cocina y delivery ({"order_id", "action": "COCINAR" |
+# "DELIVERY" | ..._RETRY, "details"}), que consumen sus pantallas y cierran
+# con un evento (cambiar_estado). Ver serverless.yml.
+ACCIONES_WORKFLOW = {"COCINAR", "COCINAR_RETRY", "DELIVERY", "DELIVERY_RETRY"}
+
+
+def _cola(record):
+    """Nombre de la cola a partir del eventSourceARN (arn:aws:sqs:region:cuenta:Cola_Cocina)."""
+    return (record.get("eventSourceARN") or "").rsplit(":", 1)[-1]
+
+
+def _clave_pedido(body_str):
+    """order_id / id_pedido del mensaje para deduplicar, o None si no se reconoce."""
+    try:
+        data = json.loads(body_str)
+    except Exception:
+        data = None
+    if isinstance(data, dict):
+        return data.get("order_id") or data.get("id_pedido")
+    for sep in [",", "|", ":", ";"]:
+        if data is None and sep in body_str:
+            return body_str.split(sep, 1)[0].strip() or None
+    return None
+
+
+def _es_del_workflow(body_str):
+    try:
+        data = json.loads(body_str)
+    except Exception:
+        return False
+    return isinstance(data, dict) and data.get("action") in ACCIONES_WORKFLOW
+
+
+def _deduplicar(records):
+    """
+    Un mensaje por (cola, pedido) dentro del lote: el más reciente según
+    SentTimestamp. Los mensajes sin pedido reconocible se procesan todos.
+
+    Retorna:
+        (a_procesar, duplicados)
+    """
+    elegidos, sin_clave, duplicados = {}, [], []
+    for r in records:
+        pedido = _clave_pedido(r.get("body", ""))
+        if not pedido:
+            sin_clave.append(r)
+            continue
+        clave = (_cola(r), pedido)
+        actual = elegidos.get(clave)
+        enviado = int(r.get("attributes", {}).get("SentTimestamp", 0))
+        if actual is None:
+            elegidos[clave] = r
+        elif enviado >= int(actual.get("attributes", {}).get("SentTimestamp", 0)):
+            duplicados.append(actual)
+            elegidos[clave] = r
+        else:
+            duplicados.append(r)
+    return list(elegidos.values()) + sin_clave, duplicados
+
+
+def _procesar(record, iniciar):
+    message_id = record.get("messageId")
+    ok, resultado = iniciar(message_id, record.get("body", ""))
+    resultado["cola"] = _cola(record)
+    return ok, resultado
+
+
+def handler(event, context, iniciar=None):
+    """
+    Evento SQS (hasta COLA_BATCH_SIZE mensajes, ver serverless.yml).
+    Retorna {"batchItemFailures": [{"itemIdentifier": messageId}, ...]}.
+    """
+    iniciar = iniciar or iniciar_ejecucion
+    records = event.get("Records", [])
+    if not records:
+        return {"batchItemFailures": []}
+
+    # Un mensaje del workflow aquí es un mapping mal conectado: no se borra
+    # (se perdería el pedido de la pantalla), vuelve a la cola como fallido
+    ajenos, propios = [], []
+    for r in records:
+        (ajenos if _es_del_workflow(r.get("body", "")) else propios).append(r)
+    for r in ajenos:
+        logger.error("Mensaje del workflow en %s (messageId=%s): no se consume aquí",
+                     _cola(r), r.get("messageId"))
+
+    a_procesar, duplicados = _deduplicar(propios)
+    resultados = []
+    if a_procesar:
+        with ThreadPoolExecutor(max_workers=min(DISPATCH_MAX_WORKERS, len(a_procesar))) as pool:
+            resultados = list(pool.map(lambda r: _procesar(r, iniciar), a_procesar))
+
+    fallidos = [r["messageId"] for ok, r in resultados if not ok]
+    logger.info(
+        "Lote de %d mensaje(s): %d despachado(s), %d duplicado(s), %d fallido(s), %d del workflow",
+        len(records), len(resultados) - len(fallidos), len(duplicados), len(fallidos), len(ajenos)
+    )
+    fallidos += [r.get("messageId") for r in ajenos]
+    return {"batchItemFailures": [{"itemIdentifier": m} for m in fallidos]}
+
+
+# ---------- prueba local ----------
+def _evento_sintetico(n, duplicados=0, invalidos=0, cola="Cola_Despacho"):
+    """Evento SQS con n mensajes de pop, algunos repetidos y algunos inválidos."""
+    records = []
+    for i in range(n):
+        pedido = f"pedido-{i % max(n - duplicados, 1)}"
+        body = "sin separador" if i < invalidos else json.dumps({"id_pedido": pedido, "estado": "procesando"})
+        records.append({
+            "messageId": f"msg-{i}",
+            "receiptHandle": f"rh-{i}",
+            "body": body,
+            "attributes": {"SentTimestamp": str(1700000000000 + i)},
+            "eventSource": "aws:sqs",
+            "eventSourceARN": f"arn:aws:sqs:us-east-1:000000000000:{cola}"
+        })
+    return {"Records": records}
+
+
+def _iniciar_consola(message_id, body_str):
+    """Sustituto de start_execution: valida el mensaje e imprime lo que se iniciaría."""
+    from pop_and_dispatch import _parse_sqs_body
+    try:
+        id_pedido, estado = _parse_sqs_body(body_str)
+    except ValueError as e:
+        return False, {"messageId": message_id, "error": str(e)}
+    print(f"  start_execution {id_pedido} -> {estado}")
+    return True, {"messageId": message_id, "id_pedido": id_pedido, "estado": estado}
+
+
+if __name__ == "__main__":
+    # Alimenta el consumidor con eventos SQS sintéticos o guardados, sin AWS:
+    #   AWS_DEFAULT_REGION=us-east-1 python consumir_colas.py 10 [duplicados] [invalidos]
+    #   python consumir_colas.py evento.json
+    if len(sys.argv) < 2:
+        print("Uso: python consumir_colas.py <n_mensajes> [duplicados] [invalidos] | <evento.json>")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO)
+    if os.path.isfile(sys.argv[1]):
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            evento = json.load(f)
+    else:
+        extra = [int(a) for a in sys.argv[2:4]]
+        evento = _evento_sintetico(int(sys.argv[1]), *extra)
+    print(json.dumps(handler(evento, None, iniciar=_iniciar_consola), indent=2))
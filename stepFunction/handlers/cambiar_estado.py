@@ -1,22 +1,12 @@
 import json
-import os
 import boto3
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal
+from botocore.exceptions import ClientError
+from handlers.json_helper import dumps
+from handlers.transiciones import reclamar_token, liberar_token, TransicionInvalida
 
-dynamodb = boto3.resource('dynamodb')
 stepfunctions = boto3.client('stepfunctions')
-TABLE_HISTORIAL_ESTADOS = os.environ['TABLE_HISTORIAL_ESTADOS']
-
-def decimal_to_number(obj):
-    """Convert Decimal objects to int or float for JSON serialization"""
-    if isinstance(obj, Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    elif isinstance(obj, dict):
-        return {k: decimal_to_number(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [decimal_to_number(i) for i in obj]
-    return obj
+# La tarea ya terminó (timeout/fallido): el token no se libera
+ERRORES_TOKEN_MUERTO = {'TaskTimedOut', 'TaskDoesNotExist', 'InvalidToken'}
 
 def handler(event, context):
     print("=" * 60)
@@ -40,32 +30,19 @@ def handler(event, context):
             'body': json.dumps({'error': 'No order_id in event'})
         }
     
-    # Map Event Type to Expected Status in DB to find the token
-    # We need to find the LATEST token for this order.
-    # The table has (id_pedido, createdAt).
-    
-    table = dynamodb.Table(TABLE_HISTORIAL_ESTADOS)
-    
-    # Query all history for this order
-    response = table.query(
-        KeyConditionExpression=Key('pedido_id').eq(order_id),
-        ScanIndexForward=False, # Descending order (newest first)
-        Limit=1
-    )
-    
-    items = response.get('Items', [])
-    if not items:
-        print(f"No history found for order {order_id}")
-        return
+    # Reclamar el token del registro que espera este evento (condicional):
+    # un doble clic, una reentrega o un evento viejo no avanzan otra tarea.
+    try:
+        latest_item = reclamar_token(order_id, detail_type)
+    except TransicionInvalida as e:
+        print(f"⚠️ Evento ignorado: {e}")
+        return {
+            'statusCode': 409,
+            'body': json.dumps({'error': str(e), 'order_id': order_id})
+        }
     
-    latest_item = items[0]
-    task_token = latest_item.get('taskToken')
+    task_token = latest_item['taskToken']
     current_estado = latest_item.get('estado')
-    
-    if not task_token:
-        print(f"No task token found in latest state ({current_estado}) for order {order_id}")
-        return
-    
     print(f"Found token for order {order_id} in estado {current_estado}. Triggering SF...")
     
     # Retrieve stored input/details to preserve context (like retry_count and local_id)
@@ -78,9 +55,9 @@ def handler(event, context):
         "order_id": order_id,
         "event": detail_type,
         "status": detail.get('status', 'ACEPTADO'), # Default to Accepted if not specified
-        "retry_count": decimal_to_number(retry_count), # Convert Decimal to number
+        "retry_count": retry_count,
         "empleado_id": detail.get('empleado_id', 'UNKNOWN'),
-        "details": decimal_to_number(detail) # Convert any Decimals in details
+        "details": detail
     }
     
     # Add local_id if available
@@ -89,18 +66,31 @@ def handler(event, context):
         print(f"📍 Passing local_id: {local_id}")
     
     try:
-        print(f"📤 Sending task success with payload: {json.dumps(output_payload, indent=2)}")
+        print(f"📤 Sending task success with payload: {dumps(output_payload)}")
         stepfunctions.send_task_success(
             taskToken=task_token,
-            output=json.dumps(output_payload)
+            output=dumps(output_payload)  # Decimal -> número al serializar
         )
         print("✅ Successfully sent task success to Step Function")
         return {
             'statusCode': 200,
             'body': json.dumps({'message': 'Task success sent', 'order_id': order_id})
         }
+    except ClientError as e:
+        print(f"❌ Error sending task success: {e}")
+        if e.response['Error']['Code'] in ERRORES_TOKEN_MUERTO:
+            return {
+                'statusCode': 410,
+                'body': json.dumps({'error': str(e), 'order_id': order_id})
+            }
+        liberar_token(order_id, latest_item['estado_id'], detail_type)
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e), 'order_id': order_id})
+        }
     except Exception as e:
         print(f"❌ Error sending task success: {e}")
+        liberar_token(order_id, latest_item['estado_id'], detail_type)
         import traceback
         traceback.print_exc()
         return {
@@ -0,0 +1,81 @@
+import os
+import gzip
+import json
+import base64
+from decimal import Decimal
+from boto3.dynamodb.types import Binary
+
+try:
+    import orjson
+except ImportError:  # sin orjson en la capa: json estándar
+    orjson = None
+
+# Serialización de datos tal como los devuelve DynamoDB (Decimal, sets,
+# Binary) en una sola pasada: el hook default convierte cada valor al
+# escribirlo, sin copiar antes el árbol con _convert_decimal.
+# Respuestas por debajo de este tamaño no se comprimen
+JSON_GZIP_MIN_BYTES = int(os.environ.get("JSON_GZIP_MIN_BYTES", "1024"))
+# Enteros por encima de 2^53 pierden precisión en JavaScript: se envían como float
+_MAX_ENTERO_SEGURO = 2 ** 53
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Methods": "OPTIONS,POST"
+}
+
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        # Magnitud primero: obj % 1 lanza InvalidOperation con exponentes grandes (1E+30)
+        if abs(obj) < _MAX_ENTERO_SEGURO and obj == obj.to_integral_value():
+            return int(obj)
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Binary):
+        obj = obj.value
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode("ascii")
+    return str(obj)
+
+
+def dumps_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def dumps(obj) -> str:
+    return dumps_bytes(obj).decode("utf-8")
+
+
+def acepta_gzip(event) -> bool:
+    """True si Accept-Encoding incluye gzip (sin q=0)."""
+    headers = (event or {}).get("headers") or {}
+    valor = next((v for k, v in headers.items() if k.lower() == "accept-encoding"), "") or ""
+    for parte in valor.split(","):
+        nombre, _, params = parte.strip().partition(";")
+        if nombre.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "").lower() not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+
+def respuesta(code, body=None, headers=None, event=None):
+    """
+    Respuesta de API Gateway con JSON y cabeceras estándar (CORS).
+    Si se pasa el event y el cliente acepta gzip, los cuerpos de al menos
+    JSON_GZIP_MIN_BYTES se envían comprimidos (isBase64Encoded).
+    """
+    data = dumps_bytes(body if body is not None else {})
+    out_headers = {"Content-Type": "application/json", **CORS_HEADERS, **(headers or {})}
+    if event is not None and len(data) >= JSON_GZIP_MIN_BYTES and acepta_gzip(event):
+        out_headers["Content-Encoding"] = "gzip"
+        out_headers["Vary"] = "Accept-Encoding"
+        return {
+            "statusCode": code,
+            "headers": out_headers,
+            "body": base64.b64encode(gzip.compress(data, compresslevel=5)).decode("ascii"),
+            "isBase64Encoded": True
+        }
+    return {"statusCode": code, "headers": out_headers, "body": data.decode("utf-8")}
@@ -0,0 +1,20 @@
+# Atributo local_estado = "<local_id>#<estado>" del GSI disperso by_local_estado
+# (servicio-empleados/pedidos_restaurante). Solo lo llevan los pedidos activos:
+# al llegar a un estado terminal se elimina y el pedido sale del índice.
+# Cada cambio suma 1 a estado_version (ETag de clientes/estado_pedido).
+ESTADOS_TERMINALES = {'entrega_delivery', 'recibido', 'fallido'}
+
+def local_estado(local_id, estado):
+    return f"{local_id}#{estado}"
+
+def estado_update_args(local_id, nuevo_estado):
+    """UpdateExpression para cambiar estado manteniendo local_estado"""
+    if nuevo_estado in ESTADOS_TERMINALES:
+        return {
+            'UpdateExpression': 'SET estado = :estado REMOVE local_estado ADD estado_version :uno',
+            'ExpressionAttributeValues': {':estado': nuevo_estado, ':uno': 1}
+        }
+    return {
+        'UpdateExpression': 'SET estado = :estado, local_estado = :le ADD estado_version :uno',
+        'ExpressionAttributeValues': {':estado': nuevo_estado, ':le': local_estado(local_id, nuevo_estado), ':uno': 1}
+    }
@@ -1,31 +1,52 @@
 import json
 import os
 import boto3
-from datetime import datetime
-from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from handlers.event_helper import EventPublisher
+from handlers.transiciones import aplicar_transicion, TransicionInvalida
 
 dynamodb = boto3.resource('dynamodb')
-events = boto3.client('events')
-TABLE_HISTORIAL_ESTADOS = os.environ['TABLE_HISTORIAL_ESTADOS']
-TABLE_PEDIDOS = os.environ.get('TABLE_PEDIDOS')
-EVENT_BUS_NAME = os.environ.get('EVENT_BUS_NAME', 'default')
+TABLE_PEDIDOS = os.environ.get('TABLE_PEDIDOS', '')
+PRODUCTS_TABLE = os.environ.get('PRODUCTS_TABLE', '')
 
-def update_pedido_estado(pedido_id, local_id, nuevo_estado):
-    """Updates the estado field in the Pedidos table"""
-    if not TABLE_PEDIDOS:
-        return False
-    try:
-        table = dynamodb.Table(TABLE_PEDIDOS)
-        table.update_item(
-            Key={'local_id': local_id, 'pedido_id': pedido_id},
-            UpdateExpression='SET estado = :estado',
-            ExpressionAttributeValues={':estado': nuevo_estado}
-        )
-        print(f"✅ Updated pedido {pedido_id} estado to: {nuevo_estado}")
-        return True
-    except Exception as e:
-        print(f"❌ Error updating pedido estado: {e}")
-        return False
+def liberar_stock(local_id, order_id):
+    """
+    Devuelve el stock que pedido_create reservó (ADD stock :qty por línea).
+    Solo lo llama la ejecución que pasó el pedido a 'fallido', así que se
+    devuelve una vez. Los productos eliminados desde entonces se saltan.
+
+    Returns:
+        int: líneas devueltas
+    """
+    if not TABLE_PEDIDOS or not PRODUCTS_TABLE:
+        print("Warning: TABLE_PEDIDOS/PRODUCTS_TABLE not configured, stock not released")
+        return 0
+    pedido = dynamodb.Table(TABLE_PEDIDOS).get_item(
+        Key={'local_id': local_id, 'pedido_id': order_id},
+        ProjectionExpression='productos, stock_reservado',
+        ConsistentRead=True
+    ).get('Item')
+    # Pedidos creados antes de la reserva de stock no tienen nada que devolver
+    if not pedido or not pedido.get('stock_reservado'):
+        return 0
+
+    productos = dynamodb.Table(PRODUCTS_TABLE)
+    devueltas = 0
+    for linea in pedido.get('productos') or []:
+        try:
+            productos.update_item(
+                Key={'local_id': local_id, 'producto_id': linea['producto_id']},
+                UpdateExpression='ADD stock :qty',
+                ConditionExpression='attribute_exists(producto_id)',
+                ExpressionAttributeValues={':qty': linea['cantidad']}
+            )
+            devueltas += 1
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                print(f"Producto {linea['producto_id']} eliminado, stock no devuelto")
+            else:
+                print(f"Error devolviendo stock de {linea['producto_id']} ({order_id}): {e}")
+    return devueltas
 
 def handler(event, context):
     print(f"PedidoFallido Event: {json.dumps(event)}")
@@ -44,60 +65,45 @@ def handler(event, context):
     print(f"📍 local_id: {local_id}, order_id: {order_id}")
     print(f"❌ Error: {error_info}")
     
-    # Update Pedidos table to 'fallido'
-    update_pedido_estado(order_id, local_id, 'fallido')
-    
-    # Update previous state's hora_fin
-    table = dynamodb.Table(TABLE_HISTORIAL_ESTADOS)
-    response = table.query(
-        KeyConditionExpression=Key('pedido_id').eq(order_id),
-        ScanIndexForward=False,
-        Limit=1
-    )
-    if response.get('Items'):
-        prev_item = response['Items'][0]
-        table.update_item(
-            Key={'pedido_id': order_id, 'estado_id': prev_item['estado_id']},
-            UpdateExpression='SET hora_fin = :hf',
-            ExpressionAttributeValues={':hf': datetime.utcnow().isoformat()}
-        )
-    
-    # Save final failed state
-    timestamp = datetime.utcnow().isoformat()
-    item = {
-        'pedido_id': order_id,
-        'estado_id': timestamp,
-        'createdAt': timestamp,
-        'estado': 'fallido',
-        'hora_inicio': timestamp,
-        'hora_fin': timestamp,
-        'empleado': 'SYSTEM',
-        'details': {
-            'error': str(error_info),
-            'reason': 'Timeout o rechazo múltiple'
+    # Pedidos + historial en una sola transacción, condicionada al estado actual
+    try:
+        timestamp = aplicar_transicion(order_id, local_id, 'fallido', {
+            'empleado': 'SYSTEM',
+            'details': {
+                'error': str(error_info),
+                'reason': 'Timeout o rechazo múltiple'
+            }
+        }, final=True)
+    except TransicionInvalida as e:
+        # Ya terminó (recibido/fallido) o no existe: no se notifica de nuevo
+        print(f"⚠️ {e}")
+        return {
+            "status": "IGNORED",
+            "order_id": order_id,
+            "local_id": local_id,
+            "message": str(e)
         }
-    }
-    table.put_item(Item=item)
     
-    # Publish PedidoFallido event to EventBridge for notifications
+    # Devolver el stock reservado al crear el pedido
     try:
-        events.put_events(
-            Entries=[{
-                'Source': '200millas.pedidos',
-                'DetailType': 'PedidoFallido',
-                'Detail': json.dumps({
-                    'order_id': order_id,
-                    'local_id': local_id,
-                    'timestamp': timestamp,
-                    'error': str(error_info),
-                    'message': 'Tu pedido no pudo ser procesado. Por favor contacta con el restaurante.'
-                }),
-                'EventBusName': EVENT_BUS_NAME
-            }]
-        )
+        lineas = liberar_stock(local_id, order_id)
+        print(f"📦 Stock devuelto: {lineas} línea(s)")
+    except ClientError as e:
+        print(f"Error devolviendo stock del pedido {order_id}: {e}")
+    
+    # Publish PedidoFallido event to EventBridge for notifications
+    with EventPublisher() as publisher:
+        publisher.add('200millas.pedidos', 'PedidoFallido', {
+            'order_id': order_id,
+            'local_id': local_id,
+            'timestamp': timestamp,
+            'error': str(error_info),
+            'message': 'Tu pedido no pudo ser procesado. Por favor contacta con el restaurante.'
+        })
+    if publisher.failed:
+        print(f"Error publishing PedidoFallido event for order {order_id}")
+    else:
         print(f"📧 Published PedidoFallido event for order {order_id}")
-    except Exception as e:
-        print(f"Error publishing event: {e}")
     
     return {
         "status": "FAILED",
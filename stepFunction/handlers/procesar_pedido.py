@@ -2,32 +2,11 @@ import json
 import os
 import boto3
 import uuid
-from datetime import datetime
+from handlers.transiciones import aplicar_transicion
 
-dynamodb = boto3.resource('dynamodb')
 sqs = boto3.client('sqs')
-TABLE_HISTORIAL_ESTADOS = os.environ['TABLE_HISTORIAL_ESTADOS']
-TABLE_PEDIDOS = os.environ.get('TABLE_PEDIDOS')
 QUEUE_COCINA_URL = os.environ['QUEUE_COCINA_URL']
 
-def update_pedido_estado(pedido_id, local_id, nuevo_estado):
-    """Updates the estado field in the Pedidos table"""
-    if not TABLE_PEDIDOS:
-        print("Warning: TABLE_PEDIDOS not configured")
-        return False
-    try:
-        table = dynamodb.Table(TABLE_PEDIDOS)
-        table.update_item(
-            Key={'local_id': local_id, 'pedido_id': pedido_id},
-            UpdateExpression='SET estado = :estado',
-            ExpressionAttributeValues={':estado': nuevo_estado}
-        )
-        print(f"✅ Updated pedido {pedido_id} estado to: {nuevo_estado}")
-        return True
-    except Exception as e:
-        print(f"❌ Error updating pedido estado: {e}")
-        return False
-
 def handler(event, context):
     print(f"ProcesarPedido Event: {json.dumps(event)}")
     
@@ -43,10 +22,19 @@ def handler(event, context):
     empleado_id = input_data.get('detail', {}).get('empleado_id') or input_data.get('empleado_id', 'SYSTEM')
     local_id = input_data.get('local_id', 'UNKNOWN')
     
-    # 0. Update Pedidos table
-    update_pedido_estado(order_id, local_id, 'procesando')
-    
-    # 1. Enqueue to SQS Cocina
+    # Ensure local_id is in details for next steps
+    details_with_local = dict(input_data)
+    if 'local_id' not in details_with_local:
+        details_with_local['local_id'] = local_id
+
+    # 1. Pedidos + historial (token) en una sola transacción
+    aplicar_transicion(order_id, local_id, 'procesando', {
+        'taskToken': task_token,
+        'empleado': empleado_id,
+        'details': details_with_local
+    })
+
+    # 2. Enqueue to SQS Cocina (solo si la transición se aplicó)
     message_body = {
         "order_id": order_id,
         "action": "COCINAR",
@@ -57,27 +45,6 @@ def handler(event, context):
         MessageBody=json.dumps(message_body)
     )
     
-    # 2. Save Token and Status to DynamoDB
-    table = dynamodb.Table(TABLE_HISTORIAL_ESTADOS)
-    timestamp = datetime.utcnow().isoformat()
-    
-    # Ensure local_id is in details for next steps
-    details_with_local = dict(input_data)
-    if 'local_id' not in details_with_local:
-        details_with_local['local_id'] = local_id
-    
-    item = {
-        'pedido_id': order_id,
-        'estado_id': timestamp,
-        'createdAt': timestamp,
-        'estado': 'procesando',
-        'taskToken': task_token,
-        'hora_inicio': timestamp,
-        'empleado': empleado_id,
-        'details': details_with_local
-    }
-    table.put_item(Item=item)
-    
     return {
         "status": "EN_COLA_COCINA",
         "order_id": order_id,
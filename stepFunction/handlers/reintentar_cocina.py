@@ -1,11 +1,9 @@
 import json
 import os
 import boto3
-from datetime import datetime
+from handlers.transiciones import aplicar_transicion
 
-dynamodb = boto3.resource('dynamodb')
 sqs = boto3.client('sqs')
-TABLE_HISTORIAL_ESTADOS = os.environ['TABLE_HISTORIAL_ESTADOS']
 QUEUE_COCINA_URL = os.environ['QUEUE_COCINA_URL']
 
 def handler(event, context):
@@ -16,6 +14,20 @@ def handler(event, context):
     order_id = input_data.get('order_id')
     retry_count = input_data.get('retry_count', 0) + 1
     
+    # Get local_id from multiple possible locations
+    local_id = (
+        input_data.get('local_id') or
+        input_data.get('details', {}).get('local_id') or
+        'UNKNOWN'
+    )
+    
+    # Rechazo de cocina: el pedido vuelve a 'procesando' (Pedidos + historial
+    # en una sola transacción, condicionada al estado actual)
+    aplicar_transicion(order_id, local_id, 'procesando', {
+        'empleado': 'SYSTEM_RETRY',
+        'details': f"Reintento {retry_count} - Re-encolando para cocina"
+    })
+    
     # Re-enqueue to SQS Cocina
     message_body = {
         "order_id": order_id,
@@ -28,21 +40,6 @@ def handler(event, context):
         MessageBody=json.dumps(message_body)
     )
     
-    # Log retry
-    table = dynamodb.Table(TABLE_HISTORIAL_ESTADOS)
-    timestamp = datetime.utcnow().isoformat()
-    
-    item = {
-        'pedido_id': order_id,
-        'estado_id': timestamp,
-        'createdAt': timestamp,
-        'estado': 'procesando',
-        'hora_inicio': timestamp,
-        'empleado': 'SYSTEM_RETRY',
-        'details': f"Reintento {retry_count} - Re-encolando para cocina"
-    }
-    table.put_item(Item=item)
-    
     return {
         "order_id": order_id,
         "retry_count": retry_count,
@@ -1,11 +1,9 @@
 import json
 import os
 import boto3
-from datetime import datetime
+from handlers.transiciones import aplicar_transicion
 
-dynamodb = boto3.resource('dynamodb')
 sqs = boto3.client('sqs')
-TABLE_HISTORIAL_ESTADOS = os.environ['TABLE_HISTORIAL_ESTADOS']
 QUEUE_DELIVERY_URL = os.environ['QUEUE_DELIVERY_URL']
 
 def handler(event, context):
@@ -15,6 +13,20 @@ def handler(event, context):
     order_id = input_data.get('order_id')
     retry_count = input_data.get('retry_count', 0) + 1
     
+    # Get local_id from multiple possible locations
+    local_id = (
+        input_data.get('local_id') or
+        input_data.get('details', {}).get('local_id') or
+        'UNKNOWN'
+    )
+    
+    # Rechazo de delivery: el pedido vuelve a 'empaquetando' (Pedidos +
+    # historial en una sola transacción, condicionada al estado actual)
+    aplicar_transicion(order_id, local_id, 'empaquetando', {
+        'empleado': 'SYSTEM_RETRY',
+        'details': f"Reintento {retry_count} - Re-encolando para delivery"
+    })
+    
     # Re-enqueue to SQS Delivery
     message_body = {
         "order_id": order_id,
@@ -27,20 +39,6 @@ def handler(event, context):
         MessageBody=json.dumps(message_body)
     )
     
-    table = dynamodb.Table(TABLE_HISTORIAL_ESTADOS)
-    timestamp = datetime.utcnow().isoformat()
-    
-    item = {
-        'pedido_id': order_id,
-        'estado_id': timestamp,
-        'createdAt': timestamp,
-        'estado': 'enviando',
-        'hora_inicio': timestamp,
-        'empleado': 'SYSTEM_RETRY',
-        'details': f"Reintento {retry_count} - Re-encolando para delivery"
-    }
-    table.put_item(Item=item)
-    
     return {
         "order_id": order_id,
         "retry_count": retry_count,
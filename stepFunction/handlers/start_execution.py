@@ -1,23 +1,71 @@
 import json
 import os
+import re
 import boto3
 import uuid
+from botocore.exceptions import ClientError
 
 stepfunctions = boto3.client('stepfunctions')
-STATE_MACHINE_ARN = os.environ['STATE_MACHINE_ARN']
+# pop_and_dispatch importa este módulo; la prueba local de consumir_colas corre sin él
+STATE_MACHINE_ARN = os.environ.get('STATE_MACHINE_ARN', '')
+
+# Nombres de ejecución: 1-80 caracteres de [A-Za-z0-9-_]
+MAX_LARGO_NOMBRE = 80
+
+def execution_name(order_id, intento=1):
+    """
+    Nombre determinista por pedido e intento: una entrega repetida de
+    CrearPedido cae sobre la misma ejecución en lugar de iniciar otra.
+    """
+    seguro = re.sub(r'[^A-Za-z0-9_-]', '_', str(order_id))
+    sufijo = f"-{intento}"
+    return f"Order-{seguro}"[:MAX_LARGO_NOMBRE - len(sufijo)] + sufijo
+
+def execution_arn(name):
+    # arn:aws:states:<region>:<cuenta>:stateMachine:<sm> -> ...:execution:<sm>:<name>
+    return f"{STATE_MACHINE_ARN.replace(':stateMachine:', ':execution:', 1)}:{name}"
+
+def _ya_existe(arn):
+    """describe_execution previo: True si la ejecución ya se inició (en curso o terminada)."""
+    try:
+        stepfunctions.describe_execution(executionArn=arn)
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ExecutionDoesNotExist':
+            return False
+        raise
 
 def handler(event, context):
     print(f"StartExecution Event: {json.dumps(event)}")
-    
+
     # Event detail contains the order info
     detail = event.get('detail', {})
-    order_id = detail.get('order_id', str(uuid.uuid4()))
-    
+    # pedido_create publica pedido_id; trigger_event puede mandar order_id.
+    # Sin ninguno, el id del evento de EventBridge (igual en las reentregas).
+    order_id = (
+        detail.get('order_id') or
+        detail.get('pedido_id') or
+        event.get('id') or
+        str(uuid.uuid4())
+    )
+    try:
+        intento = int(detail.get('intento', 1))
+    except (TypeError, ValueError):
+        intento = 1
+    name = execution_name(order_id, intento)
+    arn = execution_arn(name)
+
     # Start SF Execution
     try:
+        if _ya_existe(arn):
+            print(f"Execution already exists, skipping duplicate: {arn}")
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"executionArn": arn, "duplicate": True})
+            }
         response = stepfunctions.start_execution(
             stateMachineArn=STATE_MACHINE_ARN,
-            name=f"Order-{order_id}-{uuid.uuid4().hex[:4]}",
+            name=name,
             input=json.dumps(detail)
         )
         print(f"Started execution: {response['executionArn']}")
@@ -25,6 +73,19 @@ def handler(event, context):
             "statusCode": 200,
             "body": json.dumps({"executionArn": response['executionArn']})
         }
+    except ClientError as e:
+        # Otra entrega del mismo evento ganó la carrera entre describe y start
+        if e.response['Error']['Code'] == 'ExecutionAlreadyExists':
+            print(f"Execution already exists, skipping duplicate: {arn}")
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"executionArn": arn, "duplicate": True})
+            }
+        print(f"Error starting execution: {e}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)})
+        }
     except Exception as e:
         print(f"Error starting execution: {e}")
         return {
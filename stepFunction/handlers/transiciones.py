@@ -0,0 +1,255 @@
+import os
+import time
+from datetime import datetime
+import boto3
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+from botocore.exceptions import ClientError
+from handlers.pedido_estado import estado_update_args
+
+# Motor de transiciones de estado de un pedido. Una transición declarada
+# (estados de origen -> estado nuevo) se aplica en un solo TransactWriteItems:
+#   - Update de Pedidos condicionado a que el estado actual sea un origen válido
+#   - Update de hora_fin del registro anterior del historial
+#   - Put del nuevo registro del historial
+# Si el pedido no existe o ya está en otro estado (transición fuera de orden,
+# dos clics del mismo empleado), no se escribe nada y se lanza TransicionInvalida.
+# Del lado de los eventos, reclamar_token marca el taskToken del historial como
+# usado con un update condicional antes de enviar send_task_success.
+TABLE_HISTORIAL_ESTADOS = os.environ.get('TABLE_HISTORIAL_ESTADOS', '')
+TABLE_PEDIDOS = os.environ.get('TABLE_PEDIDOS', '')
+MAX_INTENTOS_TRANSACCION = 3
+
+# estado nuevo -> estados desde los que se puede llegar
+TRANSICIONES = {
+    # pedido_create ya guarda 'procesando'; procesarPedido lo confirma.
+    # Un rechazo de cocina lo devuelve a 'procesando' (ReintentarCocina)
+    'procesando': {'procesando', 'en_preparacion'},
+    'en_preparacion': {'procesando', 'en_preparacion'},
+    'cocina_completa': {'en_preparacion'},
+    # Un rechazo de delivery lo devuelve a 'empaquetando' (ReintentarDelivery)
+    'empaquetando': {'cocina_completa', 'empaquetando', 'pedido_en_camino'},
+    'pedido_en_camino': {'empaquetando', 'pedido_en_camino'},
+    'entrega_delivery': {'pedido_en_camino'},
+    'recibido': {'entrega_delivery'},
+    # Timeout o rechazos en cualquier paso que no haya terminado
+    'fallido': {'procesando', 'en_preparacion', 'cocina_completa', 'empaquetando',
+                'pedido_en_camino', 'entrega_delivery'},
+}
+
+# detail-type del evento de un empleado/cliente -> estado del historial que
+# espera ese evento (el registro que guardó el taskToken)
+EVENTO_ESTADO = {
+    'EnPreparacion': 'procesando',
+    'CocinaCompleta': 'en_preparacion',
+    'Empaquetado': 'cocina_completa',
+    'PedidoEnCamino': 'empaquetando',
+    'EntregaDelivery': 'pedido_en_camino',
+    'ConfirmarPedidoCliente': 'entrega_delivery',
+}
+
+dynamodb = boto3.resource('dynamodb')
+ddb_client = boto3.client('dynamodb')
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+class TransicionInvalida(Exception):
+    """La transición no está declarada o el pedido no está en un estado de origen."""
+
+    def __init__(self, mensaje, estado_actual=None):
+        super().__init__(mensaje)
+        self.estado_actual = estado_actual
+
+
+def _tipado(valores):
+    return {k: _serializer.serialize(v) for k, v in valores.items()}
+
+
+def _registro_anterior(order_id):
+    response = dynamodb.Table(TABLE_HISTORIAL_ESTADOS).query(
+        KeyConditionExpression=Key('pedido_id').eq(order_id),
+        ScanIndexForward=False,
+        Limit=1,
+        ProjectionExpression='pedido_id, estado_id'
+    )
+    items = response.get('Items', [])
+    return items[0] if items else None
+
+
+def _accion_pedido(order_id, local_id, nuevo_estado, origenes):
+    args = estado_update_args(local_id, nuevo_estado)
+    valores = dict(args['ExpressionAttributeValues'])
+    marcadores = []
+    for i, estado in enumerate(sorted(origenes)):
+        valores[f':o{i}'] = estado
+        marcadores.append(f':o{i}')
+    return {
+        'Update': {
+            'TableName': TABLE_PEDIDOS,
+            'Key': _tipado({'local_id': local_id, 'pedido_id': order_id}),
+            'UpdateExpression': args['UpdateExpression'],
+            'ConditionExpression': f"estado IN ({', '.join(marcadores)})",
+            'ExpressionAttributeValues': _tipado(valores),
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }
+    }
+
+
+def _rechazo(e, order_id, nuevo_estado, hay_pedido):
+    """TransicionInvalida a partir de las CancellationReasons, o None si no fue una condición."""
+    razones = e.response.get('CancellationReasons') or []
+    if not hay_pedido or not razones or razones[0].get('Code') != 'ConditionalCheckFailed':
+        return None
+    item = razones[0].get('Item')
+    if not item:
+        return TransicionInvalida(f"Pedido {order_id} no existe")
+    estado_actual = _deserializer.deserialize(item['estado']) if 'estado' in item else None
+    return TransicionInvalida(
+        f"Pedido {order_id}: transición {estado_actual} -> {nuevo_estado} no permitida",
+        estado_actual
+    )
+
+
+def aplicar_transicion(order_id, local_id, nuevo_estado, registro, final=False):
+    """
+    Aplica la transición a nuevo_estado y agrega el registro al historial.
+
+    Args:
+        registro: atributos del nuevo item del historial (empleado, taskToken,
+                  details, ...). pedido_id, estado_id, createdAt, estado y
+                  hora_inicio se completan aquí.
+        final: el estado no espera a nadie más (recibido/fallido): hora_fin = hora_inicio
+
+    Returns:
+        str: estado_id (timestamp) del registro creado
+
+    Raises:
+        TransicionInvalida: transición no declarada, pedido inexistente o en otro estado
+    """
+    origenes = TRANSICIONES.get(nuevo_estado)
+    if origenes is None:
+        raise TransicionInvalida(f"Estado desconocido: {nuevo_estado}")
+    if not order_id:
+        raise TransicionInvalida("order_id es requerido")
+
+    anterior = _registro_anterior(order_id)
+    for intento in range(MAX_INTENTOS_TRANSACCION):
+        timestamp = datetime.utcnow().isoformat()
+        item = {
+            **registro,
+            'pedido_id': order_id,
+            'estado_id': timestamp,
+            'createdAt': timestamp,
+            'estado': nuevo_estado,
+            'hora_inicio': timestamp
+        }
+        if final:
+            item['hora_fin'] = timestamp
+        acciones = []
+        if TABLE_PEDIDOS:
+            acciones.append(_accion_pedido(order_id, local_id, nuevo_estado, origenes))
+        else:
+            print("Warning: TABLE_PEDIDOS not configured")
+        if anterior:
+            acciones.append({
+                'Update': {
+                    'TableName': TABLE_HISTORIAL_ESTADOS,
+                    'Key': _tipado({'pedido_id': order_id, 'estado_id': anterior['estado_id']}),
+                    'UpdateExpression': 'SET hora_fin = :hf',
+                    'ConditionExpression': 'attribute_exists(pedido_id)',
+                    'ExpressionAttributeValues': _tipado({':hf': timestamp})
+                }
+            })
+        acciones.append({
+            'Put': {
+                'TableName': TABLE_HISTORIAL_ESTADOS,
+                'Item': _tipado(item),
+                'ConditionExpression': 'attribute_not_exists(pedido_id)'
+            }
+        })
+
+        try:
+            ddb_client.transact_write_items(TransactItems=acciones)
+            print(f"✅ Pedido {order_id}: {nuevo_estado} (1 transacción, {len(acciones)} escrituras)")
+            return timestamp
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            rechazo = _rechazo(e, order_id, nuevo_estado, bool(TABLE_PEDIDOS))
+            if rechazo:
+                raise rechazo
+            codigos = [r.get('Code') for r in e.response.get('CancellationReasons') or []]
+            if 'TransactionConflict' not in codigos or intento == MAX_INTENTOS_TRANSACCION - 1:
+                raise
+            # Otra escritura sobre el mismo pedido en curso: reintentar
+            time.sleep(0.05 * (2 ** intento))
+
+
+def reclamar_token(order_id, detail_type):
+    """
+    Toma el taskToken del último registro del historial para el evento detail_type.
+
+    El registro tiene que estar en el estado que ese evento completa
+    (EVENTO_ESTADO) y su token no puede haberse usado: el update condicional
+    guarda token_evento una sola vez, así que un doble clic, una reentrega de
+    EventBridge o un evento viejo no avanzan la tarea que esté esperando.
+
+    Returns:
+        dict: registro del historial con taskToken y token_evento
+
+    Raises:
+        TransicionInvalida: evento desconocido, sin historial, estado distinto
+                            o token ya usado
+    """
+    esperado = EVENTO_ESTADO.get(detail_type)
+    if esperado is None:
+        raise TransicionInvalida(f"Evento desconocido: {detail_type}")
+
+    table = dynamodb.Table(TABLE_HISTORIAL_ESTADOS)
+    items = table.query(
+        KeyConditionExpression=Key('pedido_id').eq(order_id),
+        ScanIndexForward=False,
+        Limit=1
+    ).get('Items', [])
+    if not items:
+        raise TransicionInvalida(f"Pedido {order_id} sin historial")
+    ultimo = items[0]
+    if ultimo.get('estado') != esperado:
+        raise TransicionInvalida(
+            f"Pedido {order_id}: {detail_type} espera {esperado}, estado actual {ultimo.get('estado')}",
+            ultimo.get('estado')
+        )
+
+    try:
+        response = table.update_item(
+            Key={'pedido_id': order_id, 'estado_id': ultimo['estado_id']},
+            UpdateExpression='SET token_evento = :ev, token_usado_en = :ts',
+            ConditionExpression='estado = :estado AND attribute_exists(taskToken) AND attribute_not_exists(token_evento)',
+            ExpressionAttributeValues={
+                ':ev': detail_type,
+                ':ts': datetime.utcnow().isoformat(),
+                ':estado': esperado
+            },
+            ReturnValues='ALL_NEW'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        raise TransicionInvalida(
+            f"Pedido {order_id}: el token de {esperado} no existe o ya se usó", esperado
+        )
+    return response['Attributes']
+
+
+def liberar_token(order_id, estado_id, detail_type):
+    """Deshace reclamar_token si send_task_success falló por un error transitorio."""
+    try:
+        dynamodb.Table(TABLE_HISTORIAL_ESTADOS).update_item(
+            Key={'pedido_id': order_id, 'estado_id': estado_id},
+            UpdateExpression='REMOVE token_evento, token_usado_en',
+            ConditionExpression='token_evento = :ev',
+            ExpressionAttributeValues={':ev': detail_type}
+        )
+    except ClientError as e:
+        print(f"Error liberando token de {order_id}/{estado_id}: {e}")
@@ -1,10 +1,6 @@
 import json
-import os
-import boto3
 from datetime import datetime
-
-events = boto3.client('events')
-EVENT_BUS_NAME = os.environ.get('EVENT_BUS_NAME', 'default')
+from handlers.event_helper import EventPublisher
 
 def handler(event, context):
     print(f"TriggerEvent: {json.dumps(event)}")
@@ -24,21 +20,16 @@ def handler(event, context):
     # Add timestamp
     detail['at'] = datetime.utcnow().isoformat()
     
-    response = events.put_events(
-        Entries=[
-            {
-                'Source': source,
-                'DetailType': event_type,
-                'Detail': json.dumps(detail),
-                'EventBusName': EVENT_BUS_NAME
-            }
-        ]
-    )
+    with EventPublisher() as publisher:
+        if not publisher.add(source, event_type, detail):
+            return {"statusCode": 413, "body": "Event exceeds the 256 KB limit"}
+    
+    if publisher.failed:
+        return {"statusCode": 502, "body": json.dumps({"message": "Event not published"})}
     
     return {
         "statusCode": 200,
         "body": json.dumps({
-            "message": "Event published",
-            "response": response
+            "message": "Event published"
         })
     }
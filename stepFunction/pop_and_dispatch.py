@@ -1,16 +1,28 @@
 import json
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from handlers.start_execution import execution_name, execution_arn
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-sqs = boto3.client("sqs")
-sf = boto3.client("stepfunctions")
+# consumir_colas.py importa este módulo sin QUEUE_URL (no hace pop)
+QUEUE_URL = os.environ.get("QUEUE_URL", "")
+STATE_MACHINE_ARN = os.environ.get("STATE_MACHINE_ARN", "")
+# Hilos para start_execution en paralelo (uno por mensaje de un lote de 10)
+DISPATCH_MAX_WORKERS = int(os.environ.get("DISPATCH_MAX_WORKERS", "10"))
+# Visibilidad que se asigna a los mensajes que fallaron (vuelven a la cola)
+DISPATCH_RETRY_VISIBILITY_SECONDS = int(os.environ.get("DISPATCH_RETRY_VISIBILITY_SECONDS", "5"))
+# Margen que se deja sin usar del tiempo restante del Lambda al drenar lotes
+DISPATCH_MARGEN_MS = int(os.environ.get("DISPATCH_MARGEN_MS", "3000"))
+MAX_LOTES = 100
 
-QUEUE_URL = os.environ["QUEUE_URL"]
-STATE_MACHINE_ARN = os.environ["STATE_MACHINE_ARN"]
+sqs = boto3.client("sqs")
+sf = boto3.client("stepfunctions", config=Config(max_pool_connections=DISPATCH_MAX_WORKERS))
 
 def _parse_http_body(event):
     body = event.get("body", "") or ""
@@ -33,86 +45,186 @@ def _parse_sqs_body(body_str):
     """
     try:
         data = json.loads(body_str)
-        if isinstance(data, dict) and "estado" in data:
-            return str(data.get("id_pedido", "")), str(data["estado"])
     except Exception:
-        pass
+        data = None
+    if isinstance(data, dict) and "estado" in data:
+        return str(data.get("id_pedido", "")), str(data["estado"])
+    # Un JSON sin "estado" no se parte como texto (sus comas no separan campos)
     for sep in [",", "|", ":", ";"]:
-        if sep in body_str:
+        if data is None and sep in body_str:
             left, right = [s.strip() for s in body_str.split(sep, 1)]
             if right:
                 return left, right
     raise ValueError("Mensaje SQS inválido. Se espera {'id_pedido','estado'} o 'id,estado'.")
 
+def iniciar_ejecucion(message_id, body_str):
+    """
+    Inicia la ejecución de un mensaje de la cola (usado también por
+    consumir_colas). El nombre es determinista por pedido y estado: una
+    reentrega del mismo mensaje (o un duplicado) cae sobre la ejecución ya
+    iniciada y se da por despachada. Retorna (ok, resultado).
+    """
+    try:
+        id_pedido, estado = _parse_sqs_body(body_str)
+        name = execution_name(f"{id_pedido or message_id}-{estado}")
+        resultado = {"messageId": message_id, "id_pedido": id_pedido, "estado": estado}
+
+        # Invocar Step Functions con SOLO el string 'estado' como input
+        # (input debe ser JSON, por eso lo serializamos)
+        try:
+            resp = sf.start_execution(
+                stateMachineArn=STATE_MACHINE_ARN,
+                name=name,
+                input=json.dumps(estado)
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ExecutionAlreadyExists":
+                raise
+            logger.info("Ejecución %s ya existe, messageId=%s duplicado", name, message_id)
+            return True, {**resultado, "executionArn": execution_arn(name), "duplicate": True}
+        return True, {**resultado, "executionArn": resp.get("executionArn")}
+    except Exception as e:
+        logger.exception("Error con messageId=%s: %s", message_id, e)
+        return False, {"messageId": message_id, "error": str(e)}
+
+def _iniciar(m):
+    return iniciar_ejecucion(m.get("MessageId"), m.get("Body", ""))
+
+def _borrar(mensajes):
+    """DeleteMessageBatch de los mensajes despachados. Retorna los messageId que no se borraron."""
+    if not mensajes:
+        return []
+    resp = sqs.delete_message_batch(
+        QueueUrl=QUEUE_URL,
+        Entries=[{"Id": str(i), "ReceiptHandle": m["ReceiptHandle"]} for i, m in enumerate(mensajes)]
+    )
+    fallidos = []
+    for f in resp.get("Failed", []):
+        m = mensajes[int(f["Id"])]
+        logger.error("No se pudo borrar messageId=%s: %s", m.get("MessageId"), f.get("Message"))
+        fallidos.append(m.get("MessageId"))
+    return fallidos
+
+def _devolver(mensajes):
+    """ChangeMessageVisibilityBatch: los mensajes fallidos vuelven a la cola."""
+    if not mensajes:
+        return
+    try:
+        resp = sqs.change_message_visibility_batch(
+            QueueUrl=QUEUE_URL,
+            Entries=[
+                {"Id": str(i), "ReceiptHandle": m["ReceiptHandle"],
+                 "VisibilityTimeout": DISPATCH_RETRY_VISIBILITY_SECONDS}
+                for i, m in enumerate(mensajes)
+            ]
+        )
+        for f in resp.get("Failed", []):
+            # Si no se pudo, el mensaje reaparece al vencer su visibility_timeout
+            logger.warning("No se pudo devolver messageId=%s: %s",
+                           mensajes[int(f["Id"])].get("MessageId"), f.get("Message"))
+    except Exception as e:
+        logger.exception("Error devolviendo mensajes a la cola: %s", e)
+
+def despachar_lote(messages, pool):
+    """
+    Inicia las ejecuciones del lote en paralelo, borra los exitosos con un solo
+    DeleteMessageBatch y devuelve los fallidos a la cola.
+
+    Retorna:
+        (executions, failures)
+    """
+    resultados = list(pool.map(_iniciar, messages))
+    ok = [m for m, (exito, _) in zip(messages, resultados) if exito]
+    ko = [m for m, (exito, _) in zip(messages, resultados) if not exito]
+    executions = [r for exito, r in resultados if exito]
+    failures = [r for exito, r in resultados if not exito]
+
+    # Borrar de la cola SOLO los mensajes cuya invocación fue OK
+    try:
+        no_borrados = set(_borrar(ok))
+    except Exception as e:
+        logger.exception("Error en DeleteMessageBatch: %s", e)
+        no_borrados = {m.get("MessageId") for m in ok}
+    for ex in executions:
+        if ex["messageId"] in no_borrados:
+            # La ejecución ya inició: el mensaje se volverá a entregar
+            ex["deleted"] = False
+    _devolver(ko)
+    return executions, failures
+
+def _restante_ms(context):
+    if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+        return float("inf")
+    return context.get_remaining_time_in_millis()
+
 def handler(event, context):
     """
     HTTP POST /pedidos/pop
     Body opcional:
-      { "max_messages": 5, "wait_seconds": 5, "visibility_timeout": 45 }
+      { "max_messages": 5, "wait_seconds": 5, "visibility_timeout": 45, "max_batches": 1 }
+    Con max_batches > 1 sigue recibiendo lotes hasta vaciar la cola, llegar a
+    max_batches o agotar el tiempo del Lambda (menos DISPATCH_MARGEN_MS).
     """
     try:
         req = _parse_http_body(event)
         max_messages = int(req.get("max_messages", 1))
         wait_seconds = int(req.get("wait_seconds", 5))
         visibility_timeout = int(req.get("visibility_timeout", 30))
+        max_batches = int(req.get("max_batches", 1))
 
         # límites seguros de SQS
         if max_messages < 1: max_messages = 1
         if max_messages > 10: max_messages = 10
         if wait_seconds < 0: wait_seconds = 0
         if wait_seconds > 20: wait_seconds = 20
+        if max_batches < 1: max_batches = 1
+        if max_batches > MAX_LOTES: max_batches = MAX_LOTES
 
-        # 1) Recibir mensajes (pop)
-        recv = sqs.receive_message(
-            QueueUrl=QUEUE_URL,
-            MaxNumberOfMessages=max_messages,
-            WaitTimeSeconds=wait_seconds,
-            VisibilityTimeout=visibility_timeout,
-            AttributeNames=["All"],
-            MessageAttributeNames=["All"],
-        )
+        popped = 0
+        batches = 0
+        executions = []
+        failures = []
 
-        messages = recv.get("Messages", [])
-        if not messages:
+        with ThreadPoolExecutor(max_workers=min(DISPATCH_MAX_WORKERS, max_messages)) as pool:
+            while batches < max_batches:
+                # Solo recibir si queda tiempo para la espera larga y el despacho
+                if batches and _restante_ms(context) < wait_seconds * 1000 + DISPATCH_MARGEN_MS:
+                    break
+
+                # 1) Recibir mensajes (pop)
+                recv = sqs.receive_message(
+                    QueueUrl=QUEUE_URL,
+                    MaxNumberOfMessages=max_messages,
+                    WaitTimeSeconds=wait_seconds,
+                    VisibilityTimeout=visibility_timeout,
+                    AttributeNames=["All"],
+                    MessageAttributeNames=["All"],
+                )
+                messages = recv.get("Messages", [])
+                if not messages:
+                    break
+                batches += 1
+                popped += len(messages)
+
+                # 2) Iniciar ejecuciones en paralelo y 3) borrar/devolver en lote
+                ok, ko = despachar_lote(messages, pool)
+                executions.extend(ok)
+                failures.extend(ko)
+
+        if not popped:
             return {
                 "statusCode": 200,
                 "headers": {"content-type": "application/json"},
                 "body": json.dumps({"popped": 0, "executions": [], "note": "No hay mensajes"}),
             }
 
-        executions = []
-        failures = []
-
-        for m in messages:
-            receipt = m["ReceiptHandle"]
-            body_str = m.get("Body", "")
-
-            try:
-                id_pedido, estado = _parse_sqs_body(body_str)
-
-                # 2) Invocar Step Functions con SOLO el string 'estado' como input
-                #    (input debe ser JSON, por eso lo serializamos)
-                input_json = json.dumps(estado)
-                resp = sf.start_execution(
-                    stateMachineArn=STATE_MACHINE_ARN,
-                    input=input_json
-                )
-                exec_arn = resp.get("executionArn")
-                executions.append({"messageId": m.get("MessageId"), "id_pedido": id_pedido, "estado": estado, "executionArn": exec_arn})
-
-                # 3) Borrar mensaje de la cola SOLO si la invocación fue OK
-                sqs.delete_message(QueueUrl=QUEUE_URL, ReceiptHandle=receipt)
-
-            except Exception as e:
-                logger.exception("Error con messageId=%s: %s", m.get("MessageId"), e)
-                failures.append({"messageId": m.get("MessageId"), "error": str(e)})
-
         status = 207 if failures else 200
         return {
             "statusCode": status,
             "headers": {"content-type": "application/json"},
             "body": json.dumps({
-                "popped": len(messages),
+                "popped": popped,
+                "batches": batches,
                 "executions": executions,
                 "failures": failures
             }),
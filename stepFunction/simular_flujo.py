@@ -0,0 +1,360 @@
+import os
+import re
+import sys
+import json
+import copy
+from datetime import datetime, timedelta
+
+# Simulación local de step_function_definition_v3.json (Standard) y de la
+# máquina Express step_function_transicion_express.json, sin AWS.
+# Interpreta los estados que usan las definiciones (Pass, Choice, Task,
+# Parallel, Fail) sobre tablas y colas en memoria. Las esperas humanas se
+# responden con un guion de eventos (ACEPTADO / RECHAZADO / TIMEOUT), igual que
+# lo haría cambiar_estado al recibir el evento de EventBridge.
+#
+#   python simular_flujo.py                 # todos los escenarios
+#   python simular_flujo.py rechazo_cocina  # uno
+#   python simular_flujo.py --render        # definiciones con ${VAR} reemplazadas desde el entorno
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+DEFINICION = os.path.join(DIR, "step_function_definition_v3.json")
+DEFINICION_TRANSICION = os.path.join(DIR, "step_function_transicion_express.json")
+
+VARIABLES = ["TABLE_PEDIDOS", "TABLE_HISTORIAL_ESTADOS", "QUEUE_COCINA_URL",
+             "QUEUE_DELIVERY_URL", "TRANSICION_STATE_MACHINE_ARN"]
+
+ESCENARIOS = {
+    "feliz": ["ACEPTADO"] * 6,
+    "rechazo_cocina": ["ACEPTADO", "RECHAZADO", "ACEPTADO", "ACEPTADO", "ACEPTADO", "ACEPTADO", "ACEPTADO"],
+    "rechazos_cocina": ["ACEPTADO", "RECHAZADO", "RECHAZADO", "RECHAZADO", "RECHAZADO"],
+    "rechazo_delivery": ["ACEPTADO"] * 4 + ["RECHAZADO", "ACEPTADO", "ACEPTADO"],
+    "timeout_empaque": ["ACEPTADO", "ACEPTADO", "ACEPTADO", "TIMEOUT"],
+    # Otro proceso ya cerró el pedido: la Express no escribe nada
+    "pedido_ya_fallido": [],
+}
+
+# Estado con el que pedido_create guarda el pedido (o el que tenga al empezar)
+ESTADO_INICIAL = {"pedido_ya_fallido": "fallido"}
+
+# Estado final esperado del pedido en cada escenario
+ESPERADO = {
+    "feliz": "recibido",
+    "rechazo_cocina": "recibido",
+    "rechazos_cocina": "fallido",
+    "rechazo_delivery": "recibido",
+    "timeout_empaque": "fallido",
+    "pedido_ya_fallido": "fallido",
+}
+
+
+def render(path, valores):
+    with open(path, "r", encoding="utf-8") as f:
+        texto = f.read()
+    return re.sub(r"\$\{(\w+)\}", lambda m: valores.get(m.group(1), m.group(0)), texto)
+
+
+class ErrorEstado(Exception):
+    def __init__(self, error, cause=""):
+        super().__init__(error)
+        self.error = error
+        self.cause = cause
+
+
+# ---------- JSONPath e intrínsecas (el subconjunto que usan las definiciones) ----------
+_FALTA = object()
+
+
+def _ruta(data, path, contexto):
+    if path.startswith("$$."):
+        data, path = contexto, path[1:]
+    if path == "$":
+        return data
+    actual = data
+    for nombre, indice in re.findall(r"\.(\w+)|\[(\d+)\]", path[1:]):
+        try:
+            actual = actual[nombre] if nombre else actual[int(indice)]
+        except (KeyError, IndexError, TypeError):
+            return _FALTA
+    return actual
+
+
+def _valor(data, path, contexto):
+    v = _ruta(data, path, contexto)
+    if v is _FALTA:
+        raise ErrorEstado("States.Runtime", f"La ruta {path} no existe")
+    return v
+
+
+def _intrinseca(expr, data, contexto):
+    nombre, args = re.match(r"(States\.\w+)\((.*)\)$", expr).groups()
+    valores = []
+    for a in re.findall(r"'[^']*'|[^,\s][^,]*", args):
+        a = a.strip()
+        valores.append(a[1:-1] if a.startswith("'") else
+                       _valor(data, a, contexto) if a.startswith("$") else json.loads(a))
+    if nombre == "States.Format":
+        plantilla, resto = valores[0], iter(valores[1:])
+        return re.sub(r"\{\}", lambda _: str(next(resto)), plantilla)
+    if nombre == "States.MathAdd":
+        return valores[0] + valores[1]
+    raise ErrorEstado("States.Runtime", f"Intrínseca no soportada: {nombre}")
+
+
+def _parametros(plantilla, data, contexto):
+    if isinstance(plantilla, dict):
+        out = {}
+        for k, v in plantilla.items():
+            if k.endswith(".$"):
+                out[k[:-2]] = (_intrinseca(v, data, contexto) if v.startswith("States.")
+                               else _valor(data, v, contexto))
+            else:
+                out[k] = _parametros(v, data, contexto)
+        return out
+    if isinstance(plantilla, list):
+        return [_parametros(v, data, contexto) for v in plantilla]
+    return plantilla
+
+
+def _con_resultado(data, resultado, result_path):
+    if result_path is None:
+        return data
+    if result_path == "$":
+        return resultado
+    data = copy.deepcopy(data)
+    actual, partes = data, result_path[2:].split(".")
+    for p in partes[:-1]:
+        actual = actual.setdefault(p, {})
+    actual[partes[-1]] = resultado
+    return data
+
+
+def _cumple(regla, data, contexto):
+    if "And" in regla:
+        return all(_cumple(r, data, contexto) for r in regla["And"])
+    if "Or" in regla:
+        return any(_cumple(r, data, contexto) for r in regla["Or"])
+    if "Not" in regla:
+        return not _cumple(regla["Not"], data, contexto)
+    v = _ruta(data, regla["Variable"], contexto)
+    if "IsPresent" in regla:
+        return (v is not _FALTA) == regla["IsPresent"]
+    if v is _FALTA:
+        return False
+    if "StringEquals" in regla:
+        return v == regla["StringEquals"]
+    if "NumericLessThanEquals" in regla:
+        return v <= regla["NumericLessThanEquals"]
+    raise ErrorEstado("States.Runtime", f"Regla no soportada: {regla}")
+
+
+# ---------- AWS en memoria ----------
+def _de_dynamo(av):
+    tipo, v = next(iter(av.items()))
+    if tipo == "M":
+        return {k: _de_dynamo(x) for k, x in v.items()}
+    return int(v) if tipo == "N" else v
+
+
+def _a_dynamo(v):
+    if isinstance(v, dict):
+        return {"M": {k: _a_dynamo(x) for k, x in v.items()}}
+    return {"N": str(v)} if isinstance(v, int) else {"S": v}
+
+
+class Mundo:
+    """Pedidos, historial y colas en memoria + reloj simulado."""
+
+    def __init__(self, definicion, transicion, guion, pedidos=None):
+        self.definicion = definicion
+        self.transicion = transicion
+        self.guion = list(guion)
+        self.pedidos = pedidos or {}
+        self.historial = []
+        self.colas = {}
+        self.traza = []
+        self.ahora = datetime(2025, 1, 1, 12, 0, 0)
+        self.ejecuciones_express = 0
+
+    def reloj(self):
+        self.ahora += timedelta(seconds=1)
+        return self.ahora.isoformat() + "Z"
+
+    # --- integraciones ---
+    def update_pedido(self, p):
+        key = (p["Key"]["local_id"]["S"], p["Key"]["pedido_id"]["S"])
+        valores = {k: _de_dynamo(v) for k, v in p["ExpressionAttributeValues"].items()}
+        condicion = re.match(r"estado IN \((.*)\)$", p.get("ConditionExpression", ""))
+        if condicion:
+            origenes = {valores[ref.strip()] for ref in condicion.group(1).split(",")}
+            if self.pedidos.get(key, {}).get("estado") not in origenes:
+                raise ErrorEstado("DynamoDB.ConditionalCheckFailedException", "The conditional request failed")
+        item = self.pedidos.setdefault(key, {"local_id": key[0], "pedido_id": key[1]})
+        expr = p["UpdateExpression"]
+        for nombre, ref in re.findall(r"(\w+) = (:\w+)", expr.split(" ADD ")[0].split(" REMOVE ")[0]):
+            item[nombre] = valores[ref]
+        for nombre in re.findall(r"REMOVE (\w+)", expr):
+            item.pop(nombre, None)
+        for nombre, ref in re.findall(r"ADD (\w+) (:\w+)", expr):
+            item[nombre] = item.get(nombre, 0) + valores[ref]
+        return {}
+
+    def update_historial(self, p):
+        estado_id = p["Key"]["estado_id"]["S"]
+        for it in self.historial:
+            if it["pedido_id"] == p["Key"]["pedido_id"]["S"] and it["estado_id"] == estado_id:
+                it["hora_fin"] = p["ExpressionAttributeValues"][":hf"]["S"]
+        return {}
+
+    def query_historial(self, p):
+        pedido = p["ExpressionAttributeValues"][":p"]["S"]
+        items = sorted((it for it in self.historial if it["pedido_id"] == pedido),
+                       key=lambda it: it["estado_id"], reverse=True)[:p.get("Limit", 100)]
+        return {"Items": [{k: _a_dynamo(v) for k, v in it.items()} for it in items]}
+
+    def put_historial(self, p):
+        self.historial.append({k: _de_dynamo(v) for k, v in p["Item"].items()})
+        return {}
+
+    def send_message(self, p):
+        self.colas.setdefault(p["QueueUrl"], []).append(p["MessageBody"])
+        return {"MessageId": f"m{sum(len(c) for c in self.colas.values())}"}
+
+    def transicion_express(self, p):
+        self.ejecuciones_express += 1
+        return ejecutar(self.transicion, p["Input"], self, nombre="Transicion")
+
+    def esperar_humano(self, p):
+        """startExecution.waitForTaskToken: corre la Express y responde como cambiar_estado."""
+        self.transicion_express(p)
+        respuesta = self.guion.pop(0) if self.guion else "TIMEOUT"
+        if respuesta == "TIMEOUT":
+            raise ErrorEstado("States.Timeout", "Sin respuesta en 900 s")
+        # cambiar_estado toma el token y los details del último registro del historial
+        ultimo = max((it for it in self.historial if it["pedido_id"] == p["Input"]["order_id"]),
+                     key=lambda it: it["estado_id"])
+        detalles = ultimo.get("details", {})
+        return {
+            "order_id": p["Input"]["order_id"],
+            "event": "Simulado",
+            "status": respuesta,
+            "retry_count": detalles.get("retry_count", 0),
+            "empleado_id": "EMP-SIM",
+            "details": {"status": respuesta},
+            "local_id": detalles.get("local_id")
+        }
+
+    def lambda_final(self, p):
+        """entregaCompleta / pedidoFallido: solo el cambio de estado del pedido."""
+        entrada = p["Payload"]["input"]
+        estado = "recibido" if p["FunctionName"].endswith("entregaCompleta") else "fallido"
+        self.update_pedido({
+            "Key": {"local_id": {"S": entrada["local_id"]}, "pedido_id": {"S": entrada["order_id"]}},
+            "UpdateExpression": "SET estado = :estado REMOVE local_estado ADD estado_version :uno",
+            "ExpressionAttributeValues": {":estado": {"S": estado}, ":uno": {"N": "1"}}
+        })
+        return {"StatusCode": 200, "Payload": {"order_id": entrada["order_id"], "estado": estado}}
+
+    def tarea(self, resource, p):
+        if resource == "arn:aws:states:::dynamodb:updateItem":
+            return (self.update_pedido if p["TableName"] == "TABLE_PEDIDOS" else self.update_historial)(p)
+        if resource == "arn:aws:states:::dynamodb:putItem":
+            return self.put_historial(p)
+        if resource == "arn:aws:states:::aws-sdk:dynamodb:query":
+            return self.query_historial(p)
+        if resource == "arn:aws:states:::sqs:sendMessage":
+            return self.send_message(p)
+        if resource == "arn:aws:states:::states:startExecution.waitForTaskToken":
+            return self.esperar_humano(p)
+        if resource == "arn:aws:states:::states:startExecution.sync:2":
+            return {"Status": "SUCCEEDED", "Output": json.dumps(self.transicion_express(p))}
+        if resource == "arn:aws:states:::lambda:invoke":
+            return self.lambda_final(p)
+        if resource == "arn:aws:states:::aws-sdk:sfn:sendTaskFailure":
+            return {}
+        raise ErrorEstado("States.Runtime", f"Recurso no simulado: {resource}")
+
+
+# ---------- intérprete ----------
+def ejecutar(definicion, entrada, mundo, nombre="Pedido"):
+    estados, actual, data = definicion["States"], definicion["StartAt"], entrada
+    while True:
+        st = estados[actual]
+        contexto = {"State": {"EnteredTime": mundo.reloj(), "Name": actual},
+                    "Execution": {"Id": f"sim:{nombre}"}, "Task": {"Token": f"token-{actual}"}}
+        if nombre == "Pedido":
+            mundo.traza.append(actual)
+        tipo = st["Type"]
+        try:
+            if tipo == "Fail":
+                if "ErrorPath" in st:
+                    raise ErrorEstado(_valor(data, st["ErrorPath"], contexto), _valor(data, st["CausePath"], contexto))
+                raise ErrorEstado(st["Error"], st.get("Cause", ""))
+            if tipo == "Succeed":
+                return data
+            if tipo == "Choice":
+                actual = next((r["Next"] for r in st["Choices"] if _cumple(r, data, contexto)), st.get("Default"))
+                if actual is None:
+                    raise ErrorEstado("States.NoChoiceMatched")
+                continue
+            if tipo == "Pass":
+                resultado = (st["Result"] if "Result" in st else
+                             _parametros(st["Parameters"], data, contexto) if "Parameters" in st else data)
+            elif tipo == "Task":
+                resultado = mundo.tarea(st["Resource"], _parametros(st.get("Parameters", {}), data, contexto))
+            elif tipo == "Parallel":
+                resultado = [ejecutar(rama, data, mundo, nombre=f"{nombre}/{actual}") for rama in st["Branches"]]
+            else:
+                raise ErrorEstado("States.Runtime", f"Tipo no soportado: {tipo}")
+            if "ResultSelector" in st:
+                resultado = _parametros(st["ResultSelector"], resultado, contexto)
+            data = _con_resultado(data, resultado, st.get("ResultPath", "$"))
+        except ErrorEstado as e:
+            catch = next((c for c in st.get("Catch", [])
+                          if "States.ALL" in c["ErrorEquals"] or e.error in c["ErrorEquals"]), None)
+            if catch is None:
+                raise
+            data = _con_resultado(data, {"Error": e.error, "Cause": e.cause}, catch.get("ResultPath", "$"))
+            actual = catch["Next"]
+            continue
+        if st.get("End"):
+            return data
+        actual = st["Next"]
+
+
+def simular(escenario):
+    valores = {v: v for v in VARIABLES}
+    definicion = json.loads(render(DEFINICION, valores))
+    transicion = json.loads(render(DEFINICION_TRANSICION, valores))
+    pedido = {"local_id": "LOCAL-1", "pedido_id": "pedido-1",
+              "estado": ESTADO_INICIAL.get(escenario, "procesando")}
+    mundo = Mundo(definicion, transicion, ESCENARIOS[escenario], {("LOCAL-1", "pedido-1"): pedido})
+    entrada = {"pedido_id": "pedido-1", "local_id": "LOCAL-1", "productos": [{"nombre": "Ceviche", "cantidad": 1}]}
+    ejecutar(definicion, entrada, mundo)
+    return mundo
+
+
+def main(argv):
+    if argv and argv[0] == "--render":
+        valores = {v: os.environ[v] for v in VARIABLES if os.environ.get(v)}
+        for path in (DEFINICION_TRANSICION, DEFINICION):
+            print(f"===== {os.path.basename(path)}")
+            print(render(path, valores))
+        return 0
+
+    fallos = 0
+    for escenario in (argv or ESCENARIOS):
+        mundo = simular(escenario)
+        pedido = mundo.pedidos[("LOCAL-1", "pedido-1")]
+        ok = pedido["estado"] == ESPERADO[escenario] and "local_estado" not in pedido
+        fallos += not ok
+        print(f"[{'OK' if ok else 'FALLA'}] {escenario}: estado={pedido['estado']} "
+              f"version={pedido['estado_version']} express={mundo.ejecuciones_express}")
+        print(f"    estados: {' -> '.join(mundo.traza)}")
+        print(f"    historial: {', '.join(it['estado'] for it in mundo.historial)}")
+        for url, mensajes in mundo.colas.items():
+            print(f"    {url}: {', '.join(m['action'] for m in mensajes)}")
+    return 1 if fallos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
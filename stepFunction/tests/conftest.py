@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.fixture
+def entorno():
+    return {
+        'TABLE_PEDIDOS': 'Pedidos',
+        'TABLE_HISTORIAL_ESTADOS': 'Historial',
+        'PRODUCTS_TABLE': 'Productos',
+        'QUEUE_COCINA_URL': 'https://sqs.us-east-1.amazonaws.com/123456789012/Cola_Cocina',
+        'QUEUE_DELIVERY_URL': 'https://sqs.us-east-1.amazonaws.com/123456789012/Cola_Delivery',
+        'STATE_MACHINE_ARN': 'arn:aws:states:us-east-1:123456789012:stateMachine:DoscientasMillas',
+    }
+
+
+@pytest.fixture
+def tablas(crear_tabla):
+    return crear_tabla('Pedidos', 'local_id', 'pedido_id'), crear_tabla('Historial', 'pedido_id', 'estado_id')
+
+
+@pytest.fixture
+def productos(crear_tabla):
+    return crear_tabla('Productos', 'local_id', 'producto_id')
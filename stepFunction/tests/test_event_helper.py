@@ -0,0 +1,67 @@
+from botocore.exceptions import ClientError
+
+
+class _Cliente:
+    """put_events que responde con la secuencia indicada (excepción o respuesta)."""
+
+    def __init__(self, *respuestas):
+        self.respuestas = list(respuestas)
+        self.llamadas = []
+
+    def put_events(self, Entries):
+        self.llamadas.append([e['DetailType'] for e in Entries])
+        respuesta = self.respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+
+def _error(code, status):
+    return ClientError({'Error': {'Code': code, 'Message': code},
+                        'ResponseMetadata': {'HTTPStatusCode': status}}, 'PutEvents')
+
+
+def _publicar(eh, cliente, *tipos):
+    with eh.EventPublisher(client=cliente) as publisher:
+        for tipo in tipos:
+            publisher.add('200millas.pruebas', tipo, {'n': 1})
+    return publisher
+
+
+def test_reintenta_throttling_y_5xx(importar, monkeypatch):
+    eh = importar('handlers.event_helper')
+    monkeypatch.setattr(eh.time, 'sleep', lambda s: None)
+    cliente = _Cliente(_error('ThrottlingException', 400), _error('ServiceUnavailable', 503),
+                       {'FailedEntryCount': 0, 'Entries': [{'EventId': '1'}]})
+
+    publisher = _publicar(eh, cliente, 'A')
+
+    assert publisher.failed == []
+    assert len(cliente.llamadas) == 3
+
+
+def test_error_permanente_no_se_reintenta(importar, monkeypatch):
+    eh = importar('handlers.event_helper')
+    monkeypatch.setattr(eh.time, 'sleep', lambda s: None)
+    cliente = _Cliente(_error('AccessDeniedException', 400))
+
+    publisher = _publicar(eh, cliente, 'A', 'B')
+
+    assert len(cliente.llamadas) == 1
+    assert [e['DetailType'] for e in publisher.failed] == ['A', 'B']
+
+
+def test_solo_reintenta_las_entradas_fallidas(importar, monkeypatch):
+    eh = importar('handlers.event_helper')
+    monkeypatch.setattr(eh.time, 'sleep', lambda s: None)
+    cliente = _Cliente(
+        {'FailedEntryCount': 2, 'Entries': [{'EventId': '1'},
+                                            {'ErrorCode': 'ThrottlingException'},
+                                            {'ErrorCode': 'MalformedDetail'}]},
+        {'FailedEntryCount': 0, 'Entries': [{'EventId': '2'}]}
+    )
+
+    publisher = _publicar(eh, cliente, 'A', 'B', 'C')
+
+    assert cliente.llamadas == [['A', 'B', 'C'], ['B']]
+    assert [e['DetailType'] for e in publisher.failed] == ['C']
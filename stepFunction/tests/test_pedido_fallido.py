@@ -0,0 +1,43 @@
+def _pedido(pedidos, estado, **extra):
+    pedidos.put_item(Item={
+        'local_id': 'L1', 'pedido_id': 'P1', 'estado': estado,
+        'productos': [{'producto_id': 'p01', 'cantidad': 2}, {'producto_id': 'p02', 'cantidad': 1},
+                      {'producto_id': 'borrado', 'cantidad': 1}],
+        **extra
+    })
+
+
+def _stock(productos, pid):
+    return productos.get_item(Key={'local_id': 'L1', 'producto_id': pid})['Item']['stock']
+
+
+def _evento():
+    return {'input': {'order_id': 'P1', 'local_id': 'L1', 'error': {'Error': 'States.Timeout'}}}
+
+
+def test_devuelve_el_stock_reservado_una_vez(importar, tablas, productos):
+    pedidos, _ = tablas
+    fallido = importar('handlers.pedido_fallido')
+    productos.put_item(Item={'local_id': 'L1', 'producto_id': 'p01', 'stock': 3})
+    productos.put_item(Item={'local_id': 'L1', 'producto_id': 'p02', 'stock': 0})
+    _pedido(pedidos, 'en_preparacion', stock_reservado=True)
+
+    assert fallido.handler(_evento(), None)['status'] == 'FAILED'
+    assert _stock(productos, 'p01') == 5
+    assert _stock(productos, 'p02') == 1
+    # El producto eliminado no se vuelve a crear
+    assert 'Item' not in productos.get_item(Key={'local_id': 'L1', 'producto_id': 'borrado'})
+
+    # Segunda invocación: el pedido ya está fallido, no se devuelve de nuevo
+    assert fallido.handler(_evento(), None)['status'] == 'IGNORED'
+    assert _stock(productos, 'p01') == 5
+
+
+def test_pedido_sin_reserva_no_toca_stock(importar, tablas, productos):
+    pedidos, _ = tablas
+    fallido = importar('handlers.pedido_fallido')
+    productos.put_item(Item={'local_id': 'L1', 'producto_id': 'p01', 'stock': 3})
+    _pedido(pedidos, 'procesando')
+
+    assert fallido.handler(_evento(), None)['status'] == 'FAILED'
+    assert _stock(productos, 'p01') == 3
@@ -0,0 +1,78 @@
+import json
+import os
+import boto3
+
+DEFINICION = json.dumps({'StartAt': 'Fin', 'States': {'Fin': {'Type': 'Succeed'}}})
+
+
+def _maquina():
+    boto3.client('stepfunctions').create_state_machine(
+        name='DoscientasMillas', definition=DEFINICION,
+        roleArn='arn:aws:iam::123456789012:role/LabRole'
+    )
+
+
+def _ejecuciones():
+    return boto3.client('stepfunctions').list_executions(
+        stateMachineArn=os.environ['STATE_MACHINE_ARN'])['executions']
+
+
+def test_reentrega_no_inicia_otra_ejecucion(importar):
+    pop = importar('pop_and_dispatch')
+    _maquina()
+    body = json.dumps({'id_pedido': 'P1', 'estado': 'procesando'})
+
+    ok, primera = pop.iniciar_ejecucion('m1', body)
+    # Mientras corre, el mismo nombre e input devuelven la misma ejecución
+    assert pop.iniciar_ejecucion('m1', body)[1]['executionArn'] == primera['executionArn']
+
+    # Ya terminada: ExecutionAlreadyExists cuenta como despachado
+    boto3.client('stepfunctions').stop_execution(executionArn=primera['executionArn'])
+    ok2, segunda = pop.iniciar_ejecucion('m1', body)
+
+    assert ok and ok2
+    assert segunda['duplicate'] is True
+    assert segunda['executionArn'] == primera['executionArn']
+    assert len(_ejecuciones()) == 1
+
+
+def test_otro_estado_es_otra_ejecucion(importar):
+    pop = importar('pop_and_dispatch')
+    _maquina()
+    pop.iniciar_ejecucion('m1', 'P1,procesando')
+    ok, resultado = pop.iniciar_ejecucion('m2', 'P1,empaquetando')
+    assert ok and 'duplicate' not in resultado
+    assert len(_ejecuciones()) == 2
+
+
+def test_error_distinto_falla_el_mensaje(importar):
+    pop = importar('pop_and_dispatch')
+    # Sin máquina de estados: StateMachineDoesNotExist
+    ok, resultado = pop.iniciar_ejecucion('m1', 'P1,procesando')
+    assert ok is False and resultado['messageId'] == 'm1'
+
+
+
+def test_consumir_colas_confirma_duplicados(importar):
+    consumir = importar('consumir_colas')
+    _maquina()
+    record = {'messageId': 'm1', 'body': 'P1,procesando', 'attributes': {'SentTimestamp': '1'},
+              'eventSourceARN': 'arn:aws:sqs:us-east-1:123456789012:Cola_Despacho'}
+    assert consumir.handler({'Records': [record]}, None) == {'batchItemFailures': []}
+    # Reentrega de SQS tras un timeout del consumidor
+    assert consumir.handler({'Records': [record]}, None) == {'batchItemFailures': []}
+    assert len(_ejecuciones()) == 1
+
+
+def test_consumir_colas_no_borra_mensajes_del_workflow(importar):
+    consumir = importar('consumir_colas')
+    _maquina()
+    cocina = {'messageId': 'm1', 'body': json.dumps({'order_id': 'P1', 'action': 'COCINAR', 'details': {}}),
+              'attributes': {'SentTimestamp': '1'},
+              'eventSourceARN': 'arn:aws:sqs:us-east-1:123456789012:Cola_Cocina'}
+    despacho = {'messageId': 'm2', 'body': 'P1,procesando', 'attributes': {'SentTimestamp': '2'},
+                'eventSourceARN': 'arn:aws:sqs:us-east-1:123456789012:Cola_Cocina'}
+
+    # Aunque compartan pedido no se deduplican entre sí; el del workflow vuelve a la cola
+    assert consumir.handler({'Records': [cocina, despacho]}, None) == {'batchItemFailures': [{'itemIdentifier': 'm1'}]}
+    assert len(_ejecuciones()) == 1
@@ -0,0 +1,55 @@
+import json
+import pytest
+
+
+def _express(sim):
+    with open(sim.DEFINICION_TRANSICION, encoding='utf-8') as f:
+        return json.load(f)['States']
+
+
+def test_origenes_de_la_express_son_los_de_transiciones(importar):
+    t = importar('handlers.transiciones')
+    sim = importar('simular_flujo')
+    estados = _express(sim)
+
+    origenes = {}
+    for regla in estados['OrigenesPorEstado']['Choices']:
+        origenes[regla['StringEquals']] = set(estados[regla['Next']]['Result'])
+    assert origenes == t.TRANSICIONES
+
+
+def test_terminales_de_la_express_son_los_de_pedido_estado(importar):
+    pe = importar('handlers.pedido_estado')
+    sim = importar('simular_flujo')
+    regla, = _express(sim)['ElegirActualizacion']['Choices']
+    assert {r['StringEquals'] for r in regla['Or']} == pe.ESTADOS_TERMINALES
+
+
+@pytest.mark.parametrize('escenario', ['feliz', 'rechazo_cocina', 'rechazo_delivery', 'rechazos_cocina',
+                                       'timeout_empaque', 'pedido_ya_fallido'])
+def test_historial_v3_sigue_la_tabla_de_transiciones(importar, escenario):
+    t = importar('handlers.transiciones')
+    sim = importar('simular_flujo')
+    mundo = sim.simular(escenario)
+
+    assert mundo.pedidos[('LOCAL-1', 'pedido-1')]['estado'] == sim.ESPERADO[escenario]
+    historial = ['procesando'] + [it['estado'] for it in mundo.historial]
+    for anterior, nuevo in zip(historial, historial[1:]):
+        assert anterior in t.TRANSICIONES[nuevo], (anterior, nuevo)
+
+
+def test_rechazo_de_delivery_vuelve_a_empaquetando_como_v2(importar):
+    sim = importar('simular_flujo')
+    mundo = sim.simular('rechazo_delivery')
+    assert [it['estado'] for it in mundo.historial] == [
+        'procesando', 'en_preparacion', 'cocina_completa', 'empaquetando',
+        'pedido_en_camino', 'empaquetando', 'pedido_en_camino', 'entrega_delivery'
+    ]
+
+
+def test_pedido_en_otro_estado_no_escribe_historial(importar):
+    sim = importar('simular_flujo')
+    mundo = sim.simular('pedido_ya_fallido')
+    assert mundo.historial == []
+    assert mundo.colas == {}
+    assert mundo.traza[-1] == 'PedidoFallido'
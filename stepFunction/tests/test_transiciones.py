@@ -0,0 +1,161 @@
+import pytest
+
+
+def _pedido(pedidos, estado, local_id='L1', pedido_id='P1'):
+    pedidos.put_item(Item={'local_id': local_id, 'pedido_id': pedido_id, 'estado': estado})
+
+
+def _historial(historial, pedido_id='P1'):
+    return historial.query(
+        KeyConditionExpression='pedido_id = :p',
+        ExpressionAttributeValues={':p': pedido_id}
+    )['Items']
+
+
+def test_tabla_declara_origenes_conocidos(importar):
+    t = importar('handlers.transiciones')
+    estados = set(t.TRANSICIONES)
+    for destino, origenes in t.TRANSICIONES.items():
+        assert origenes <= estados, destino
+    # Los estados terminales no son origen de nada
+    for destino, origenes in t.TRANSICIONES.items():
+        assert 'recibido' not in origenes and 'fallido' not in origenes
+    assert set(t.EVENTO_ESTADO.values()) <= estados
+
+
+def test_transicion_valida_actualiza_pedido_e_historial(importar, tablas):
+    pedidos, historial = tablas
+    t = importar('handlers.transiciones')
+    _pedido(pedidos, 'procesando')
+
+    primero = t.aplicar_transicion('P1', 'L1', 'en_preparacion', {'empleado': 'E1'})
+    segundo = t.aplicar_transicion('P1', 'L1', 'cocina_completa', {'empleado': 'E1'})
+
+    pedido = pedidos.get_item(Key={'local_id': 'L1', 'pedido_id': 'P1'})['Item']
+    assert pedido['estado'] == 'cocina_completa'
+    assert pedido['local_estado'] == 'L1#cocina_completa'
+    assert pedido['estado_version'] == 2
+
+    registros = {r['estado_id']: r for r in _historial(historial)}
+    assert registros[primero]['estado'] == 'en_preparacion'
+    assert registros[primero]['hora_fin'] == segundo
+    assert 'hora_fin' not in registros[segundo]
+
+
+def test_estado_final_saca_el_pedido_del_indice(importar, tablas):
+    pedidos, historial = tablas
+    t = importar('handlers.transiciones')
+    _pedido(pedidos, 'entrega_delivery')
+
+    ts = t.aplicar_transicion('P1', 'L1', 'recibido', {}, final=True)
+
+    pedido = pedidos.get_item(Key={'local_id': 'L1', 'pedido_id': 'P1'})['Item']
+    assert pedido['estado'] == 'recibido'
+    assert 'local_estado' not in pedido
+    assert _historial(historial)[0]['hora_fin'] == ts
+
+
+def test_transicion_fuera_de_orden_no_escribe(importar, tablas):
+    pedidos, historial = tablas
+    t = importar('handlers.transiciones')
+    _pedido(pedidos, 'procesando')
+
+    with pytest.raises(t.TransicionInvalida) as e:
+        t.aplicar_transicion('P1', 'L1', 'empaquetando', {})
+
+    assert e.value.estado_actual == 'procesando'
+    assert pedidos.get_item(Key={'local_id': 'L1', 'pedido_id': 'P1'})['Item']['estado'] == 'procesando'
+    assert _historial(historial) == []
+
+
+def test_pedido_inexistente(importar, tablas):
+    t = importar('handlers.transiciones')
+    with pytest.raises(t.TransicionInvalida) as e:
+        t.aplicar_transicion('P1', 'L1', 'procesando', {})
+    assert e.value.estado_actual is None
+
+
+def test_pedido_terminado_no_falla_de_nuevo(importar, tablas):
+    pedidos, _ = tablas
+    t = importar('handlers.transiciones')
+    _pedido(pedidos, 'recibido')
+    with pytest.raises(t.TransicionInvalida):
+        t.aplicar_transicion('P1', 'L1', 'fallido', {}, final=True)
+
+
+def test_estado_desconocido(importar, tablas):
+    t = importar('handlers.transiciones')
+    with pytest.raises(t.TransicionInvalida):
+        t.aplicar_transicion('P1', 'L1', 'enviando', {})
+
+
+def test_reintentos_vuelven_al_estado_anterior(importar, tablas):
+    pedidos, _ = tablas
+    t = importar('handlers.transiciones')
+    _pedido(pedidos, 'en_preparacion')
+    t.aplicar_transicion('P1', 'L1', 'procesando', {})
+    t.aplicar_transicion('P1', 'L1', 'en_preparacion', {})
+    t.aplicar_transicion('P1', 'L1', 'cocina_completa', {})
+    t.aplicar_transicion('P1', 'L1', 'empaquetando', {})
+    t.aplicar_transicion('P1', 'L1', 'pedido_en_camino', {})
+    t.aplicar_transicion('P1', 'L1', 'empaquetando', {})
+    assert pedidos.get_item(Key={'local_id': 'L1', 'pedido_id': 'P1'})['Item']['estado'] == 'empaquetando'
+
+
+def test_token_se_reclama_una_sola_vez(importar, tablas):
+    pedidos, historial = tablas
+    t = importar('handlers.transiciones')
+    _pedido(pedidos, 'procesando')
+    t.aplicar_transicion('P1', 'L1', 'en_preparacion', {'taskToken': 'tok-1'})
+
+    registro = t.reclamar_token('P1', 'CocinaCompleta')
+    assert registro['taskToken'] == 'tok-1'
+    assert registro['token_evento'] == 'CocinaCompleta'
+
+    # Doble clic / reentrega de EventBridge
+    with pytest.raises(t.TransicionInvalida):
+        t.reclamar_token('P1', 'CocinaCompleta')
+
+    # Liberado tras un error transitorio se puede volver a reclamar
+    t.liberar_token('P1', registro['estado_id'], 'CocinaCompleta')
+    assert t.reclamar_token('P1', 'CocinaCompleta')['taskToken'] == 'tok-1'
+
+
+def test_evento_que_no_corresponde_al_estado(importar, tablas):
+    pedidos, _ = tablas
+    t = importar('handlers.transiciones')
+    _pedido(pedidos, 'procesando')
+    t.aplicar_transicion('P1', 'L1', 'en_preparacion', {'taskToken': 'tok-1'})
+
+    # Evento viejo (el pedido ya pasó de procesando) y evento adelantado
+    for evento in ('EnPreparacion', 'Empaquetado', 'Desconocido'):
+        with pytest.raises(t.TransicionInvalida):
+            t.reclamar_token('P1', evento)
+
+
+def test_registro_sin_token(importar, tablas):
+    pedidos, _ = tablas
+    t = importar('handlers.transiciones')
+    _pedido(pedidos, 'en_preparacion')
+    # ReintentarCocina deja un registro 'procesando' sin taskToken
+    t.aplicar_transicion('P1', 'L1', 'procesando', {'empleado': 'SYSTEM_RETRY'})
+    with pytest.raises(t.TransicionInvalida):
+        t.reclamar_token('P1', 'EnPreparacion')
+
+
+def test_cambiar_estado_ignora_evento_duplicado(importar, tablas, monkeypatch):
+    pedidos, _ = tablas
+    t = importar('handlers.transiciones')
+    cambiar_estado = importar('handlers.cambiar_estado')
+    _pedido(pedidos, 'procesando')
+    t.aplicar_transicion('P1', 'L1', 'procesando', {'taskToken': 'tok-1', 'details': {'local_id': 'L1'}})
+
+    enviados = []
+    monkeypatch.setattr(cambiar_estado.stepfunctions, 'send_task_success',
+                        lambda **kw: enviados.append(kw))
+    evento = {'detail-type': 'EnPreparacion', 'source': '200millas.cocina',
+              'detail': {'order_id': 'P1', 'empleado_id': 'E1'}}
+
+    assert cambiar_estado.handler(evento, None)['statusCode'] == 200
+    assert cambiar_estado.handler(evento, None)['statusCode'] == 409
+    assert [e['taskToken'] for e in enviados] == ['tok-1']
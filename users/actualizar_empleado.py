@@ -2,12 +2,12 @@ import json
 import os
 import boto3
 from botocore.exceptions import ClientError
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from auth_helper import get_bearer_token, resolve_principal
+from contadores import marcar_cambio_empleados
 
 # === ENV ===
 TABLE_EMPLEADOS      = os.getenv("TABLE_EMPLEADOS", "TABLE_EMPLEADOS")
 TABLE_USUARIOS_NAME       = os.getenv("USERS_TABLE", "USERS_TABLE")
-TOKENS_TABLE_USERS        = os.getenv("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
 
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 
@@ -16,7 +16,6 @@ dynamodb   = boto3.resource("dynamodb")
 
 empleados_table = dynamodb.Table(TABLE_EMPLEADOS)
 usuarios_table  = dynamodb.Table(TABLE_USUARIOS_NAME)
-tokens_table    = dynamodb.Table(TOKENS_TABLE_USERS)
 
 # Reglas de negocio
 ROLES_PUEDEN_EDITAR = {"Admin", "Gerente"}  # <-- solo estos pueden modificar empleados
@@ -33,29 +32,14 @@ def _parse_body(event):
         body = {}
     return body
 
-def _get_correo_from_token(token: str):
-    """Obtiene el correo del usuario desde el token en la tabla"""
-    try:
-        r = tokens_table.get_item(Key={"token": token})
-        item = r.get("Item")
-        if not item:
-            return None
-        return item.get("user_id")
-    except Exception:
-        return None
-
 # ---------- Handler ----------
 def lambda_handler(event, context):
-    # 1. Validar token mediante Lambda
+    # 1. Resolver usuario y rol del token (una sola lectura)
     token = get_bearer_token(event)
-    valido, err, rol_aut = validate_token_via_lambda(token)
-    if not valido:
+    principal, err = resolve_principal(token)
+    if not principal:
         return _resp(401, {"message": err or "Token inválido"})
-    
-    # 2. Obtener correo del usuario autenticado
-    correo_aut = _get_correo_from_token(token)
-    if not correo_aut:
-        return _resp(401, {"message": "No se pudo obtener el usuario del token"})
+    correo_aut, rol_aut = principal.correo, principal.rol
 
     # 3) Autorización: solo Admin o Gerente pueden modificar empleados
     if rol_aut not in ROLES_PUEDEN_EDITAR:
@@ -110,6 +94,9 @@ def lambda_handler(event, context):
     except ClientError as e:
         return _resp(500, {"message": f"Error al actualizar empleado: {str(e)}"})
 
+    # Invalida el empleado en las cachés de validar_empleado
+    marcar_cambio_empleados(local_id)
+
     return _resp(200, {
         "message": "Empleado actualizado correctamente",
         "empleado": empleado,
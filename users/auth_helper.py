@@ -1,10 +1,33 @@
 import os
-import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
 import boto3
+from signed_token import is_signed_token, verify_token
 
-VALIDAR_TOKEN_LAMBDA_NAME = os.environ.get("VALIDAR_TOKEN_LAMBDA_NAME", "ValidarTokenAcceso")
+TOKENS_TABLE_USERS = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
 
-lambda_client = boto3.client('lambda')
+# Caché de tokens en el contenedor caliente (LRU con tamaño máximo y TTL).
+# invalidate_token solo limpia este contenedor: un token opaco borrado en
+# logout sigue aceptándose en otros contenedores hasta TOKEN_CACHE_TTL_SECONDS,
+# la misma ventana que REVOCATION_CACHE_TTL_SECONDS para los tokens firmados.
+TOKEN_CACHE_MAX_SIZE = int(os.environ.get("TOKEN_CACHE_MAX_SIZE", "1024"))
+TOKEN_CACHE_TTL_SECONDS = int(os.environ.get("TOKEN_CACHE_TTL_SECONDS", "30"))
+
+dynamodb = boto3.resource('dynamodb')
+tokens_table = dynamodb.Table(TOKENS_TABLE_USERS)
+
+# token -> (principal, cache_hasta_ts)
+_token_cache = OrderedDict()
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Usuario autenticado resuelto a partir de un token."""
+    correo: str
+    rol: str
+    expires: str
 
 
 def get_bearer_token(event):
@@ -12,62 +35,127 @@ def get_bearer_token(event):
     Extrae el token del header Authorization (con o sin 'Bearer ')
     """
     headers = event.get("headers") or {}
-    
+
     # Buscar el header Authorization (case-insensitive)
     auth_header = None
     for key, value in headers.items():
         if key.lower() == "authorization":
             auth_header = value
             break
-    
+
     if not auth_header:
         return None
-    
+
     # Si es string, procesar
     if isinstance(auth_header, str):
         auth_header = auth_header.strip()
-        
+
         # Si tiene "Bearer ", extraer el token
         if auth_header.lower().startswith("bearer "):
             return auth_header.split(" ", 1)[1].strip()
-        
+
         # Si no tiene "Bearer ", devolver el token directamente
         return auth_header
-    
+
     return None
 
 
-def validate_token_via_lambda(token: str):
+def _parse_expires(expires_str):
+    """Convierte 'YYYY-mm-dd HH:MM:SS' (UTC) a epoch; None si no se puede."""
+    if not expires_str:
+        return None
+    try:
+        dt = datetime.strptime(expires_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+    return dt.timestamp()
+
+
+def _cache_get(token):
+    entry = _token_cache.get(token)
+    if entry is None:
+        return None
+    principal, cache_hasta = entry
+    if time.time() >= cache_hasta:
+        # Venció el TTL del caché o la expiración del propio token
+        _token_cache.pop(token, None)
+        return None
+    _token_cache.move_to_end(token)
+    return principal
+
+
+def _cache_put(token, principal):
+    now = time.time()
+    expires_ts = _parse_expires(principal.expires)
+    if expires_ts is None or expires_ts <= now:
+        return
+    # Nunca cachear más allá de la expiración del token
+    cache_hasta = min(now + TOKEN_CACHE_TTL_SECONDS, expires_ts)
+    _token_cache[token] = (principal, cache_hasta)
+    _token_cache.move_to_end(token)
+    while len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+        _token_cache.popitem(last=False)
+
+
+def invalidate_token(token):
+    """Elimina un token del caché local (p. ej. tras logout o cambio de contraseña)."""
+    _token_cache.pop(token, None)
+
+
+def _principal_from_signed(token):
+    valido, error, claims = verify_token(token)
+    if not valido:
+        return None, error
+    return Principal(correo=claims["sub"], rol=claims.get("rol") or "Cliente", expires=claims["exp"]), None
+
+
+def resolve_principal(token: str):
     """
-    Invoca el Lambda validador de token (ValidarTokenAcceso).
-    
+    Resuelve el token a un Principal (correo, rol, expires) con una sola
+    lectura fuertemente consistente de la tabla de tokens, o sin ninguna
+    lectura si el token está en el caché del contenedor.
+
     Retorna:
-        (valido: bool, error: str, rol: str)
+        (principal: Principal, error: str)
     """
     if not token:
-        return False, "Token requerido", None
-    
+        return None, "Token requerido"
+
+    # Token firmado: se verifica en CPU, sin leer la tabla de tokens
+    if is_signed_token(token):
+        return _principal_from_signed(token)
+
+    cached = _cache_get(token)
+    if cached:
+        return cached, None
+
     try:
-        payload_string = json.dumps({"token": token})
-        
-        invoke_response = lambda_client.invoke(
-            FunctionName=VALIDAR_TOKEN_LAMBDA_NAME,
-            InvocationType='RequestResponse',
-            Payload=payload_string.encode('utf-8')
-        )
-        
-        response = json.loads(invoke_response['Payload'].read())
-        
-        # Verificar statusCode
-        if response.get('statusCode') != 200:
-            body = response.get('body', 'Token inválido')
-            error_msg = body if isinstance(body, str) else json.dumps(body)
-            return False, error_msg, None
-        
-        # Extraer rol de la respuesta
-        rol = response.get('rol', 'Cliente')
-        
-        return True, None, rol
-        
+        response = tokens_table.get_item(Key={'token': token}, ConsistentRead=True)
     except Exception as e:
-        return False, f"Error al validar token: {str(e)}", None
+        return None, f"Error al validar token: {str(e)}"
+
+    item = response.get('Item')
+    if not item:
+        return None, "Token no existe"
+
+    expires_str = item.get('expires')
+    if not expires_str:
+        return None, "Token sin fecha de expiración"
+
+    expires_ts = _parse_expires(expires_str)
+    if expires_ts is None:
+        return None, "Formato de expiración inválido"
+
+    if time.time() > expires_ts:
+        return None, "Token expirado"
+
+    correo = item.get('user_id') or item.get('correo') or item.get('email') or item.get('usuario_correo')
+    if not correo:
+        return None, "Token sin usuario asociado"
+
+    rol = item.get('rol') or item.get('role') or "Cliente"
+
+    principal = Principal(correo=correo, rol=rol, expires=expires_str)
+    _cache_put(token, principal)
+    return principal, None
+
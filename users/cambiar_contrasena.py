@@ -3,12 +3,12 @@ import json
 import boto3
 from botocore.exceptions import ClientError
 from datetime import datetime
-from common import hash_password
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from password_hasher import hash_password, verify_password
+from auth_helper import get_bearer_token, resolve_principal, invalidate_token
+from signed_token import signing_enabled, revoke_user_tokens
 
 # ===== ENV =====
 TABLE_USUARIOS = os.getenv("USERS_TABLE", "USERS_TABLE")
-TOKENS_TABLE = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
 
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 
@@ -16,7 +16,6 @@ CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 dynamodb = boto3.resource("dynamodb")
 
 t_usuarios = dynamodb.Table(TABLE_USUARIOS)
-tokens_table = dynamodb.Table(TOKENS_TABLE)
 
 # --------- helpers ----------
 def _resp(code, payload):
@@ -30,29 +29,14 @@ def _parse_body(event):
         body = {}
     return body
 
-def _get_correo_from_token(token: str):
-    """Obtiene el correo del usuario desde el token en la tabla"""
-    try:
-        response = tokens_table.get_item(Key={'token': token})
-        if 'Item' not in response:
-            return None
-        item = response['Item']
-        return item.get('user_id') or item.get('correo')
-    except Exception:
-        return None
-
 # --------- handler ----------
 def lambda_handler(event, context):
-    # 1. Validar token mediante Lambda
+    # 1. Resolver usuario y rol del token (una sola lectura)
     token = get_bearer_token(event)
-    valido, err, rol_aut = validate_token_via_lambda(token)
-    if not valido:
+    principal, err = resolve_principal(token)
+    if not principal:
         return _resp(401, {"message": err or "Token inválido"})
-    
-    # 2. Obtener correo del usuario autenticado
-    correo_aut = _get_correo_from_token(token)
-    if not correo_aut:
-        return _resp(401, {"message": "No se pudo obtener el usuario del token"})
+    correo_aut, rol_aut = principal.correo, principal.rol
 
     # 2) Body y validaciones básicas
     body = _parse_body(event)
@@ -93,9 +77,8 @@ def lambda_handler(event, context):
 
     # 4) Verificación de contraseña actual (solo para self)
     if requiere_actual:
-        hash_actual = hash_password(contrasena_actual)
-        # Soporta transición: si en DB está en claro (legacy) o ya hasheada.
-        ok_actual = (almacenada == hash_actual) or (almacenada == contrasena_actual)
+        # Tiempo constante; soporta transición desde sha256 o texto plano (legacy)
+        ok_actual, _ = verify_password(contrasena_actual, almacenada)
         if not ok_actual:
             return _resp(400, {"message": "La contraseña actual no coincide"})
 
@@ -115,4 +98,13 @@ def lambda_handler(event, context):
     except Exception as e:
         return _resp(500, {"message": f"Error al actualizar contraseña: {str(e)}"})
 
+    # 6) Revocar los tokens firmados emitidos antes del cambio
+    if signing_enabled():
+        try:
+            revoke_user_tokens(correo_objetivo)
+        except Exception as e:
+            print(f"Error revocando tokens de {correo_objetivo}: {e}")
+    if correo_objetivo == correo_aut:
+        invalidate_token(token)
+
     return _resp(200, {"message": "Contraseña actualizada correctamente"})
@@ -2,11 +2,10 @@ import json
 import os
 import boto3
 from botocore.exceptions import ClientError
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from auth_helper import get_bearer_token, resolve_principal
 
 # === ENV ===
 TABLE_USUARIOS_NAME      = os.getenv("USERS_TABLE", "USERS_TABLE")
-TOKENS_TABLE_USERS       = os.getenv("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
 
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 
@@ -14,7 +13,6 @@ CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 dynamodb   = boto3.resource("dynamodb")
 
 usuarios_table = dynamodb.Table(TABLE_USUARIOS_NAME)
-tokens_table   = dynamodb.Table(TOKENS_TABLE_USERS)
 
 # ---------------------- helpers ----------------------
 def _resp(code, payload):
@@ -34,29 +32,14 @@ def _parse_body(event):
         body = json.loads(event)
     return body if isinstance(body, dict) else {}
 
-def _get_correo_from_token(token: str):
-    """Obtiene el correo del usuario desde el token en la tabla"""
-    try:
-        r = tokens_table.get_item(Key={"token": token})
-        item = r.get("Item")
-        if not item:
-            return None
-        return item.get("user_id")
-    except Exception:
-        return None
-
 # ---------------------- handler ----------------------
 def lambda_handler(event, context):
-    # 1. Validar token mediante Lambda
+    # 1. Resolver usuario y rol del token (una sola lectura)
     token = get_bearer_token(event)
-    valido, err, rol_solicitante = validate_token_via_lambda(token)
-    if not valido:
+    principal, err = resolve_principal(token)
+    if not principal:
         return _resp(401, {"message": err or "Token inválido"})
-    
-    # 2. Obtener correo del usuario autenticado
-    correo_solicitante = _get_correo_from_token(token)
-    if not correo_solicitante:
-        return _resp(401, {"message": "No se pudo obtener el usuario del token"})
+    correo_solicitante, rol_solicitante = principal.correo, principal.rol
 
     # 3) Body y correo a eliminar (requerido)
     body = _parse_body(event)
@@ -4,7 +4,8 @@ import uuid
 import re
 import boto3
 from datetime import datetime, timedelta
-from common import hash_password
+from password_hasher import verify_password, hash_password
+from signed_token import signing_enabled, mint_token
 
 USERS_TABLE = os.environ.get("USERS_TABLE", "USERS_TABLE")
 TOKENS_TABLE_USERS = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
@@ -52,28 +53,41 @@ def lambda_handler(event, context):
         user = response['Item']
         hashed_password_bd = user.get("contrasena")
         
-        # Verificar contraseña (soporta tanto hasheada como texto plano)
-        hashed_password = hash_password(password_in)
-        # Comparar: hasheada o texto plano (para compatibilidad con datos generados)
-        if hashed_password != hashed_password_bd and password_in != hashed_password_bd:
+        # Verificar contraseña en tiempo constante (acepta formatos legados)
+        ok, requiere_rehash = verify_password(password_in, hashed_password_bd)
+        if not ok:
             return _resp(403, {"error": "Password incorrecto"})
         
-        # Generar token
-        token = str(uuid.uuid4())
+        # Actualizar transparentemente el hash al algoritmo/costo vigente
+        if requiere_rehash:
+            try:
+                t_users.update_item(
+                    Key={"correo": correo},
+                    UpdateExpression="SET contrasena = :nuevo",
+                    ConditionExpression="contrasena = :actual",
+                    ExpressionAttributeValues={":nuevo": hash_password(password_in), ":actual": hashed_password_bd}
+                )
+            except Exception as e:
+                print(f"No se pudo actualizar el hash de {correo}: {e}")
+        
         fecha_hora_exp = datetime.now() + timedelta(minutes=60)
         
         # Obtener rol del usuario
         rol = user.get("rol") or user.get("role") or "Cliente"
         
-        # Guardar token en la tabla
-        registro = {
-            'token': token,
-            'user_id': correo,
-            'rol': rol,
-            'expires': fecha_hora_exp.strftime('%Y-%m-%d %H:%M:%S')
-        }
-        
-        t_tokens.put_item(Item=registro)
+        if signing_enabled():
+            # Token firmado: no se persiste, se valida solo con la firma
+            token = mint_token(correo, rol, fecha_hora_exp.strftime('%Y-%m-%d %H:%M:%S'))
+        else:
+            # Generar token opaco y guardarlo en la tabla
+            token = str(uuid.uuid4())
+            registro = {
+                'token': token,
+                'user_id': correo,
+                'rol': rol,
+                'expires': fecha_hora_exp.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            t_tokens.put_item(Item=registro)
         
         # Retornar token
         return _resp(200, {
@@ -0,0 +1,41 @@
+import os
+import json
+import boto3
+from auth_helper import get_bearer_token, resolve_principal, invalidate_token
+from signed_token import is_signed_token, revoke_token
+
+# === ENV ===
+TOKENS_TABLE_USERS = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
+
+CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
+
+# === AWS ===
+dynamodb = boto3.resource("dynamodb")
+
+tokens_table = dynamodb.Table(TOKENS_TABLE_USERS)
+
+# ---------- helpers ----------
+def _resp(code, payload):
+    return {"statusCode": code, "headers": CORS_HEADERS, "body": json.dumps(payload)}
+
+# ---------- handler ----------
+def lambda_handler(event, context):
+    # 1. Validar el token a cerrar
+    token = get_bearer_token(event)
+    principal, err = resolve_principal(token)
+    if not principal:
+        return _resp(401, {"message": err or "Token inválido"})
+
+    # 2. Revocar: los firmados van a la lista de revocación, los opacos se borran
+    try:
+        if is_signed_token(token):
+            if not revoke_token(token):
+                return _resp(500, {"message": "No se pudo revocar el token"})
+        else:
+            tokens_table.delete_item(Key={"token": token})
+    except Exception as e:
+        return _resp(500, {"message": f"Error al cerrar sesión: {str(e)}"})
+
+    invalidate_token(token)
+
+    return _resp(200, {"message": "Sesión cerrada", "correo": principal.correo})
@@ -3,11 +3,10 @@ import json
 import boto3
 from datetime import datetime
 from botocore.exceptions import ClientError
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from auth_helper import get_bearer_token, resolve_principal
 
 # === ENV ===
 TABLE_USUARIOS_NAME = os.getenv("USERS_TABLE", "USERS_TABLE")
-TOKENS_TABLE = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
 
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 
@@ -15,35 +14,19 @@ CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 dynamodb = boto3.resource("dynamodb")
 
 usuarios_table = dynamodb.Table(TABLE_USUARIOS_NAME)
-tokens_table = dynamodb.Table(TOKENS_TABLE)
 
 # ---------- helpers ----------
 def _resp(code, payload):
     return {"statusCode": code, "headers": CORS_HEADERS, "body": json.dumps(payload)}
 
-def _get_correo_from_token(token: str):
-    """Obtiene el correo del usuario desde el token en la tabla"""
-    try:
-        response = tokens_table.get_item(Key={'token': token})
-        if 'Item' not in response:
-            return None
-        item = response['Item']
-        return item.get('user_id') or item.get('correo')
-    except Exception:
-        return None
-
 # ---------- handler ----------
 def lambda_handler(event, context):
-    # 1. Validar token mediante Lambda
+    # 1. Resolver usuario y rol del token (una sola lectura)
     token = get_bearer_token(event)
-    valido, err, rol_aut = validate_token_via_lambda(token)
-    if not valido:
+    principal, err = resolve_principal(token)
+    if not principal:
         return _resp(401, {"message": err or "Token inválido"})
-    
-    # 2. Obtener correo del usuario autenticado
-    correo_aut = _get_correo_from_token(token)
-    if not correo_aut:
-        return _resp(401, {"message": "No se pudo obtener el usuario del token"})
+    correo_aut, rol_aut = principal.correo, principal.rol
 
     # 3) Target (query param ?correo=...), por defecto yo mismo
     qp = event.get("queryStringParameters") or {}
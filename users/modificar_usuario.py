@@ -2,13 +2,13 @@ import os
 import json
 import boto3
 from botocore.exceptions import ClientError
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from password_hasher import hash_password, verify_password
+from auth_helper import get_bearer_token, resolve_principal
 
 ALLOWED_ROLES = {"Admin", "Gerente", "Cliente"}
 
 # === ENV ===
 TABLE_USUARIOS_NAME       = os.getenv("USERS_TABLE", "USERS_TABLE")
-TOKENS_TABLE_USERS        = os.getenv("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
 
 CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 
@@ -16,7 +16,6 @@ CORS_HEADERS = {"Access-Control-Allow-Origin": "*"}
 dynamodb   = boto3.resource("dynamodb")
 
 usuarios_table = dynamodb.Table(TABLE_USUARIOS_NAME)
-tokens_table   = dynamodb.Table(TOKENS_TABLE_USERS)
 
 # ---------- Helpers ----------
 def _resp(code, payload):
@@ -30,17 +29,6 @@ def _parse_body(event):
         body = {}
     return body
 
-def _get_correo_from_token(token: str):
-    """Obtiene el correo del usuario desde el token en la tabla"""
-    try:
-        r = tokens_table.get_item(Key={"token": token})
-        item = r.get("Item")
-        if not item:
-            return None
-        return item.get("user_id")
-    except Exception:
-        return None
-
 def _solo_campos_schema(usuario_dict: dict) -> dict:
     """
     Enforce schema Usuarios (additionalProperties: false).
@@ -51,16 +39,12 @@ def _solo_campos_schema(usuario_dict: dict) -> dict:
 
 # ---------- Handler ----------
 def lambda_handler(event, context):
-    # 1. Validar token mediante Lambda
+    # 1. Resolver usuario y rol del token (una sola lectura)
     token = get_bearer_token(event)
-    valido, err, rol_solicitante = validate_token_via_lambda(token)
-    if not valido:
+    principal, err = resolve_principal(token)
+    if not principal:
         return _resp(401, {"message": err or "Token inválido"})
-    
-    # 2. Obtener correo del usuario autenticado
-    correo_aut = _get_correo_from_token(token)
-    if not correo_aut:
-        return _resp(401, {"message": "No se pudo obtener el usuario del token"})
+    correo_aut, rol_solicitante = principal.correo, principal.rol
 
     body = _parse_body(event)
 
@@ -116,8 +100,8 @@ def lambda_handler(event, context):
         nueva = body["contrasena"]
         if not isinstance(nueva, str) or len(nueva) < 6:
             return _resp(400, {"message": "La contraseña debe tener al menos 6 caracteres"})
-        if nueva != usuario_mod.get("contrasena"):
-            usuario_mod["contrasena"] = nueva
+        if not verify_password(nueva, usuario_mod.get("contrasena"))[0]:
+            usuario_mod["contrasena"] = hash_password(nueva)
             hubo_cambios = True
             campos_cambiados.append("contrasena")
 
@@ -0,0 +1,135 @@
+import os
+import hmac
+import base64
+import hashlib
+import secrets
+
+# Formatos almacenados en Usuarios.contrasena:
+#   pbkdf2_sha256$<iteraciones>$<salt_b64>$<hash_b64>
+#   scrypt$<n>$<r>$<p>$<salt_b64>$<hash_b64>
+# Legado (se aceptan y se re-hashean en el siguiente login exitoso):
+#   sha256 hex sin salt (64 caracteres) y texto plano de los datos generados.
+PASSWORD_HASH_ALGORITHM = os.environ.get("PASSWORD_HASH_ALGORITHM", "pbkdf2_sha256")
+
+# La CPU de Lambda escala con la memoria (1 vCPU completa a 1769 MB). Cada
+# fila apunta a ~100 ms de CPU por hash con esa memoria.
+PBKDF2_ITERATIONS_BY_MEMORY = [
+    (128, 20000),
+    (256, 40000),
+    (512, 80000),
+    (1024, 160000),
+    (1769, 310000),
+]
+# scrypt además reserva 128 * n * r bytes de RAM por hash
+SCRYPT_N_BY_MEMORY = [
+    (128, 2 ** 12),
+    (256, 2 ** 13),
+    (512, 2 ** 14),
+    (1024, 2 ** 15),
+]
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+SALT_BYTES = 16
+DKLEN = 32
+
+
+def _lambda_memory_mb():
+    try:
+        return int(os.environ.get("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "256"))
+    except ValueError:
+        return 256
+
+
+def _by_memory(table, memory_mb):
+    valor = table[0][1]
+    for limite, v in table:
+        if memory_mb >= limite:
+            valor = v
+    return valor
+
+
+def current_params(algorithm=None, memory_mb=None):
+    """Parámetros de costo vigentes para el algoritmo y la memoria del Lambda."""
+    algorithm = algorithm or PASSWORD_HASH_ALGORITHM
+    memory_mb = memory_mb or _lambda_memory_mb()
+    if algorithm == "scrypt":
+        n = int(os.environ.get("PASSWORD_HASH_SCRYPT_N") or _by_memory(SCRYPT_N_BY_MEMORY, memory_mb))
+        return {"n": n, "r": SCRYPT_R, "p": SCRYPT_P}
+    if algorithm == "pbkdf2_sha256":
+        iteraciones = int(os.environ.get("PASSWORD_HASH_ITERATIONS") or _by_memory(PBKDF2_ITERATIONS_BY_MEMORY, memory_mb))
+        return {"iterations": iteraciones}
+    raise ValueError(f"Algoritmo de hash no soportado: {algorithm}")
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+
+def _unb64(data: str) -> bytes:
+    return base64.b64decode(data.encode("ascii"))
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations, dklen=DKLEN)
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r, dklen=DKLEN)
+
+
+def hash_password(password: str, algorithm=None, params=None) -> str:
+    algorithm = algorithm or PASSWORD_HASH_ALGORITHM
+    params = params or current_params(algorithm)
+    salt = secrets.token_bytes(SALT_BYTES)
+    if algorithm == "scrypt":
+        dk = _scrypt(password, salt, params["n"], params["r"], params["p"])
+        return f"scrypt${params['n']}${params['r']}${params['p']}${_b64(salt)}${_b64(dk)}"
+    dk = _pbkdf2(password, salt, params["iterations"])
+    return f"pbkdf2_sha256${params['iterations']}${_b64(salt)}${_b64(dk)}"
+
+
+def _is_legacy_sha256(stored: str) -> bool:
+    return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored)
+
+
+def verify_password(password: str, stored: str):
+    """
+    Verifica en tiempo constante la contraseña contra el valor almacenado.
+
+    Retorna:
+        (valido: bool, requiere_rehash: bool)
+    """
+    if not isinstance(password, str) or not isinstance(stored, str) or not stored:
+        return False, False
+
+    partes = stored.split("$")
+    try:
+        if partes[0] == "pbkdf2_sha256" and len(partes) == 4:
+            iteraciones = int(partes[1])
+            dk = _pbkdf2(password, _unb64(partes[2]), iteraciones)
+            ok = hmac.compare_digest(dk, _unb64(partes[3]))
+            vigente = PASSWORD_HASH_ALGORITHM == "pbkdf2_sha256" and iteraciones >= current_params()["iterations"]
+            return ok, ok and not vigente
+
+        if partes[0] == "scrypt" and len(partes) == 6:
+            n, r, p = int(partes[1]), int(partes[2]), int(partes[3])
+            dk = _scrypt(password, _unb64(partes[4]), n, r, p)
+            ok = hmac.compare_digest(dk, _unb64(partes[5]))
+            vigente = PASSWORD_HASH_ALGORITHM == "scrypt" and n >= current_params()["n"]
+            return ok, ok and not vigente
+    except (ValueError, TypeError):
+        return False, False
+
+    # Prefijo de algoritmo con otra cantidad de campos: mal formado, nunca texto plano
+    if len(partes) > 1 and partes[0] in ("pbkdf2_sha256", "scrypt"):
+        return False, False
+
+    # Legado: sha256 sin salt o texto plano
+    if _is_legacy_sha256(stored):
+        legacy = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        ok = hmac.compare_digest(legacy.encode("ascii"), stored.encode("ascii"))
+        return ok, ok
+    ok = hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    return ok, ok
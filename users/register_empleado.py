@@ -4,19 +4,18 @@ import boto3
 from datetime import datetime, timezone
 from botocore.exceptions import ClientError
 from common import response
-from auth_helper import get_bearer_token, validate_token_via_lambda
+from auth_helper import get_bearer_token, resolve_principal
+from contadores import marcar_cambio_empleados
 
 # === Entorno ===
 TABLE_EMPLEADOS             = os.environ.get("TABLE_EMPLEADOS", "TABLE_EMPLEADOS")
 USERS_TABLE                = os.environ.get("USERS_TABLE", "USERS_TABLE")
-TOKENS_TABLE_USERS         = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
 
 # === AWS ===
 dynamodb     = boto3.resource("dynamodb")
 
 t_employee = dynamodb.Table(TABLE_EMPLEADOS)
 t_users    = dynamodb.Table(USERS_TABLE)
-t_tokens   = dynamodb.Table(TOKENS_TABLE_USERS)
 
 # === Reglas ===
 ROLES_VALIDOS = {"Repartidor", "Cocinero", "Despachador"}
@@ -33,29 +32,14 @@ def _as_bool(val):
         if v in ("false", "0", "no"):       return False
     return None
 
-def _get_correo_from_token(token: str):
-    """Obtiene el correo del usuario desde el token en la tabla"""
-    try:
-        tok = t_tokens.get_item(Key={"token": token})
-        item = tok.get("Item")
-        if not item:
-            return None
-        return item.get("user_id")
-    except Exception:
-        return None
-
 def lambda_handler(event, context):
     try:
-        # 1. Validar token mediante Lambda
+        # 1. Resolver usuario y rol del token (una sola lectura)
         token = get_bearer_token(event)
-        valido, err, rol = validate_token_via_lambda(token)
-        if not valido:
+        principal, err = resolve_principal(token)
+        if not principal:
             return response(401, {"message": err or "Token inválido"})
-        
-        # 2. Obtener correo del usuario autenticado
-        correo = _get_correo_from_token(token)
-        if not correo:
-            return response(401, {"message": "No se pudo obtener el usuario del token"})
+        correo, rol = principal.correo, principal.rol
 
         if rol not in ROLES_PUEDEN_CREAR:
             return response(403, {"message": "No tienes permisos para crear empleados"})
@@ -90,6 +74,8 @@ def lambda_handler(event, context):
             Item=item,
             ConditionExpression="attribute_not_exists(local_id) AND attribute_not_exists(dni)"
         )
+        # Un DNI recién registrado puede estar en caché como inexistente
+        marcar_cambio_empleados(local_id)
 
         return response(200, {
             "message": "Empleado registrado",
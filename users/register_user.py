@@ -1,6 +1,8 @@
 import os, json, re, uuid, boto3
 from datetime import datetime, timedelta
-from common import hash_password, response
+from common import response
+from password_hasher import hash_password
+from signed_token import signing_enabled, mint_token
 
 USERS_TABLE = os.environ["USERS_TABLE"]
 TOKENS_TABLE = os.environ.get("TOKENS_TABLE_USERS", "TOKENS_TABLE_USERS")
@@ -49,16 +51,20 @@ def lambda_handler(event, context):
         )
 
         # Generar token automáticamente
-        token = str(uuid.uuid4())
         fecha_hora_exp = datetime.now() + timedelta(minutes=60)
         
-        # Guardar token
-        t_tokens.put_item(Item={
-            'token': token,
-            'user_id': correo,
-            'rol': role,
-            'expires': fecha_hora_exp.strftime('%Y-%m-%d %H:%M:%S')
-        })
+        if signing_enabled():
+            token = mint_token(correo, role, fecha_hora_exp.strftime('%Y-%m-%d %H:%M:%S'))
+        else:
+            token = str(uuid.uuid4())
+            
+            # Guardar token
+            t_tokens.put_item(Item={
+                'token': token,
+                'user_id': correo,
+                'rol': role,
+                'expires': fecha_hora_exp.strftime('%Y-%m-%d %H:%M:%S')
+            })
 
         return response(201, {
             "message": "Usuario registrado",
@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.fixture
+def entorno():
+    return {
+        'TOKENS_TABLE_USERS': 'Tokens',
+        'USERS_TABLE': 'Usuarios',
+        'TOKEN_SIGNING_KEY': 'clave-de-pruebas',
+    }
+
+
+@pytest.fixture
+def tokens(crear_tabla):
+    return crear_tabla('Tokens', 'token')
@@ -0,0 +1,62 @@
+import json
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import pytest
+
+pytestmark = pytest.mark.medicion
+
+HANDLERS = ['mi_usuario', 'eliminar_usuario']
+
+
+def _expira(minutos=60):
+    return (datetime.now(timezone.utc) + timedelta(minutes=minutos)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+@pytest.fixture
+def usuarios(crear_tabla, tokens):
+    tabla = crear_tabla('Usuarios', 'correo')
+    tabla.put_item(Item={'correo': 'admin@x.com', 'nombre': 'Admin', 'role': 'Admin'})
+    tabla.put_item(Item={'correo': 'otro@x.com', 'nombre': 'Otro', 'role': 'Cliente'})
+    tokens.put_item(Item={'token': 'opaco-1', 'user_id': 'admin@x.com', 'rol': 'Admin', 'expires': _expira()})
+    return tabla
+
+
+def _evento(token, handler):
+    evento = {'headers': {'Authorization': f'Bearer {token}'}, 'queryStringParameters': {'correo': 'otro@x.com'}}
+    if handler == 'eliminar_usuario':
+        evento['body'] = json.dumps({'correo': 'otro@x.com'})
+    return evento
+
+
+def _lecturas(llamadas, desde):
+    return Counter(f"{op}:{tabla}" for _, op, tabla in llamadas[desde:])
+
+
+def test_llamadas_dynamodb_por_handler(importar, usuarios, llamadas_aws):
+    """Auth = 1 GetItem fuertemente consistente a Tokens por request (0 con el caché caliente)."""
+    st = importar('signed_token')
+    firmado = st.mint_token('admin@x.com', 'Admin', _expira())
+    print()
+    print(f"{'handler':<18} {'token':<8} {'frío':<62} {'caliente (caché del contenedor)'}")
+    for nombre in HANDLERS:
+        for etiqueta, token in (('opaco', 'opaco-1'), ('firmado', firmado)):
+            handler = importar(nombre)
+            importar('auth_helper')._token_cache.clear()
+            st._revocados.clear()
+            if nombre == 'eliminar_usuario':
+                usuarios.put_item(Item={'correo': 'otro@x.com', 'nombre': 'Otro', 'role': 'Cliente'})
+
+            inicio = len(llamadas_aws)
+            assert handler.lambda_handler(_evento(token, nombre), None)['statusCode'] < 300
+            frio = _lecturas(llamadas_aws, inicio)
+            inicio = len(llamadas_aws)
+            handler.lambda_handler(_evento(token, nombre), None)
+            caliente = _lecturas(llamadas_aws, inicio)
+            print(f"{nombre:<18} {etiqueta:<8} {dict(frio)!s:<62} {dict(caliente)}")
+
+            if etiqueta == 'opaco':
+                # Una sola lectura del token (antes: validador + _get_correo_from_token)
+                assert frio['GetItem:Tokens'] == 1
+                assert caliente['GetItem:Tokens'] == 0
+            else:
+                assert frio['GetItem:Tokens'] == 0 and frio['BatchGetItem:None'] == 1
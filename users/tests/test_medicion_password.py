@@ -0,0 +1,55 @@
+import os
+import json
+import time
+import statistics
+import pytest
+
+pytestmark = pytest.mark.medicion
+
+MUESTRAS = int(os.environ.get('MEDICION_MUESTRAS', '20'))
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(p / 100 * (len(ordenados) - 1)))]
+
+
+def _filas(ph):
+    for memoria, _ in ph.PBKDF2_ITERATIONS_BY_MEMORY:
+        yield 'pbkdf2_sha256', memoria
+    for memoria, _ in ph.SCRYPT_N_BY_MEMORY:
+        yield 'scrypt', memoria
+
+
+def test_latencia_de_login_por_costo(importar, crear_tabla, tokens, monkeypatch):
+    """
+    p50/p99 de login_user completo (GetItem + verify_password + token) con
+    cada fila de costo de password_hasher. En Lambda la CPU escala con la
+    memoria: esta máquina equivale a la fila de 1769 MB (1 vCPU), así que
+    las filas más chicas tardan aquí menos que en su Lambda real.
+    """
+    usuarios = crear_tabla('Usuarios', 'correo')
+    ph = importar('password_hasher')
+    login = importar('login_user')
+    evento = {'body': json.dumps({'correo': 'a@x.com', 'contrasena': 'secreta'})}
+
+    print()
+    print(f"{'algoritmo':<14} {'memoria MB':>10} {'costo':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for algoritmo, memoria in _filas(ph):
+        monkeypatch.setenv('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', str(memoria))
+        monkeypatch.setattr(ph, 'PASSWORD_HASH_ALGORITHM', algoritmo)
+        params = ph.current_params()
+        usuarios.put_item(Item={'correo': 'a@x.com', 'rol': 'Cliente',
+                                'contrasena': ph.hash_password('secreta')})
+
+        tiempos = []
+        for _ in range(MUESTRAS):
+            inicio = time.perf_counter()
+            assert login.lambda_handler(evento, None)['statusCode'] == 200
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        costo = params.get('iterations') or params['n']
+        print(f"{algoritmo:<14} {memoria:>10} {costo:>8} "
+              f"{statistics.median(tiempos):>8.1f} {_percentil(tiempos, 99):>8.1f}")
+        # Con el costo vigente no hay re-hash: el hash guardado no cambia
+        assert usuarios.get_item(Key={'correo': 'a@x.com'})['Item']['contrasena'].startswith(algoritmo)
@@ -0,0 +1,54 @@
+import hashlib
+import pytest
+
+
+@pytest.fixture
+def ph(importar, monkeypatch):
+    monkeypatch.setenv('PASSWORD_HASH_ITERATIONS', '1000')
+    monkeypatch.setenv('PASSWORD_HASH_SCRYPT_N', '1024')
+    return importar('password_hasher')
+
+
+def test_pbkdf2_ida_y_vuelta(ph):
+    guardado = ph.hash_password('secreta')
+    assert guardado.startswith('pbkdf2_sha256$1000$')
+    assert ph.verify_password('secreta', guardado) == (True, False)
+    assert ph.verify_password('otra', guardado) == (False, False)
+
+
+def test_scrypt_ida_y_vuelta(ph):
+    guardado = ph.hash_password('secreta', 'scrypt')
+    assert guardado.startswith('scrypt$1024$8$1$')
+    # Válido, pero el algoritmo vigente es pbkdf2: pide re-hash
+    assert ph.verify_password('secreta', guardado) == (True, True)
+    assert ph.verify_password('otra', guardado) == (False, False)
+
+
+def test_iteraciones_viejas_piden_rehash(ph):
+    guardado = ph.hash_password('secreta', params={'iterations': 500})
+    assert ph.verify_password('secreta', guardado) == (True, True)
+
+
+def test_legado_sha256_y_texto_plano(ph):
+    sha = hashlib.sha256(b'secreta').hexdigest()
+    assert ph.verify_password('secreta', sha) == (True, True)
+    assert ph.verify_password('otra', sha) == (False, False)
+    assert ph.verify_password('secreta', 'secreta') == (True, True)
+
+
+@pytest.mark.parametrize('guardado', [
+    'pbkdf2_sha256$', 'scrypt$', 'pbkdf2_sha256$1000$c2FsdA==',
+    'scrypt$1024$8$1$c2FsdA==', 'pbkdf2_sha256$mil$c2FsdA==$aGFzaA==',
+    'pbkdf2_sha256$1000$no-base64$aGFzaA==',
+])
+def test_formato_mal_formado_nunca_compara_en_plano(ph, guardado):
+    # Aunque la contraseña enviada sea idéntica al valor almacenado
+    assert ph.verify_password(guardado, guardado) == (False, False)
+
+
+def test_parametros_por_memoria(ph, monkeypatch):
+    monkeypatch.delenv('PASSWORD_HASH_ITERATIONS')
+    assert ph.current_params('pbkdf2_sha256', 128) == {'iterations': 20000}
+    assert ph.current_params('pbkdf2_sha256', 3008) == {'iterations': 310000}
+    with pytest.raises(ValueError):
+        ph.current_params('md5')
@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def _expira(minutos=60):
+    return (datetime.now(timezone.utc) + timedelta(minutes=minutos)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def test_token_valido_y_claims(importar, tokens):
+    st = importar('signed_token')
+    token = st.mint_token('a@x.com', 'Admin', _expira())
+
+    valido, error, claims = st.verify_token(token)
+
+    assert st.is_signed_token(token)
+    assert (valido, error) == (True, None)
+    assert claims['sub'] == 'a@x.com' and claims['rol'] == 'Admin'
+
+
+def test_firma_alterada_y_expirado(importar, tokens):
+    st = importar('signed_token')
+    token = st.mint_token('a@x.com', 'Cliente', _expira())
+    cabecera, payload, firma = token.split('.')
+    otro = st.mint_token('b@x.com', 'Admin', _expira()).split('.')[1]
+
+    assert st.verify_token(f'{cabecera}.{otro}.{firma}')[:2] == (False, 'Firma de token inválida')
+    assert st.verify_token(token[:-2])[0] is False
+    assert st.verify_token(st.mint_token('a@x.com', 'Cliente', _expira(-1)))[:2] == (False, 'Token expirado')
+
+
+def test_caracteres_no_ascii_se_rechazan(importar, tokens):
+    st = importar('signed_token')
+    signing_input, firma = st.mint_token('a@x.com', 'Cliente', _expira()).rsplit('.', 1)
+
+    assert st.verify_token(f'{signing_input}.{firma[:-1]}ñ')[:2] == (False, 'Firma de token inválida')
+    assert st.verify_token(f'{signing_input}ñ.{firma}')[:2] == (False, 'Firma de token inválida')
+
+
+def test_revocar_un_token(importar, tokens):
+    st = importar('signed_token')
+    token = st.mint_token('a@x.com', 'Cliente', _expira())
+    otro = st.mint_token('a@x.com', 'Cliente', _expira())
+    assert st.verify_token(token)[0] is True
+
+    assert st.revoke_token(token) is True
+
+    assert st.verify_token(token)[:2] == (False, 'Token revocado')
+    assert st.verify_token(otro)[0] is True
+    # Un item propio con TTL hasta la expiración del token
+    jti = st._decode(token)[0]['jti']
+    item = tokens.get_item(Key={'token': st._clave_token(jti)})['Item']
+    assert int(item['expira']) > time.time()
+
+
+def test_revocar_usuario_solo_afecta_tokens_anteriores(importar, tokens):
+    st = importar('signed_token')
+    viejo = st.mint_token('a@x.com', 'Cliente', _expira())
+    de_otro = st.mint_token('b@x.com', 'Cliente', _expira())
+    time.sleep(0.01)
+
+    assert st.revoke_user_tokens('a@x.com') is True
+    time.sleep(0.01)
+    nuevo = st.mint_token('a@x.com', 'Cliente', _expira())
+
+    assert st.verify_token(viejo)[:2] == (False, 'Token revocado')
+    assert st.verify_token(de_otro)[0] is True
+    assert st.verify_token(nuevo)[0] is True
+
+
+def test_revocacion_de_usuario_no_retrocede(importar, tokens):
+    st = importar('signed_token')
+    st.revoke_user_tokens('a@x.com')
+    clave = st._clave_usuario('a@x.com')
+    tokens.update_item(Key={'token': clave}, UpdateExpression='SET revocado_antes = :t',
+                       ExpressionAttributeValues={':t': int(time.time()) + 3600})
+
+    # Un cambio de contraseña que llega tarde no baja la marca
+    assert st.revoke_user_tokens('a@x.com') is True
+    assert int(tokens.get_item(Key={'token': clave})['Item']['revocado_antes']) > time.time() + 3000
+
+
+def test_varias_revocaciones_son_independientes(importar, tokens):
+    st = importar('signed_token')
+    emitidos = [st.mint_token(f'u{i}@x.com', 'Cliente', _expira()) for i in range(5)]
+    for token in emitidos:
+        assert st.revoke_token(token) is True
+    assert all(st.verify_token(t)[0] is False for t in emitidos)
+
+
+def test_cache_de_revocacion_por_contenedor(importar, tokens):
+    st = importar('signed_token')
+    token = st.mint_token('a@x.com', 'Cliente', _expira())
+    assert st.verify_token(token)[0] is True
+
+    # Revocado desde otro contenedor: este lo ve al vencer su caché
+    jti = st._decode(token)[0]['jti']
+    tokens.put_item(Item={'token': st._clave_token(jti), 'expira': int(time.time()) + 60})
+    assert st.verify_token(token)[0] is True
+    st._revocados.clear()
+    assert st.verify_token(token)[0] is False
@@ -1,6 +1,7 @@
 import os
 import boto3
 from datetime import datetime, timezone
+from signed_token import is_signed_token, verify_token
 
 TOKENS_TABLE_USERS = os.environ["TOKENS_TABLE_USERS"]
 
@@ -10,6 +11,19 @@ def lambda_handler(event, context):
     if not token:
         return {"statusCode": 403, "body": "Token faltante"}
 
+    # Token firmado: se verifica en CPU, sin leer la tabla de tokens
+    if is_signed_token(token):
+        valido, error, claims = verify_token(token)
+        if not valido:
+            return {"statusCode": 403, "body": error}
+        return {
+            "statusCode": 200,
+            "body": "Token válido",
+            "rol": claims.get("rol") or "Cliente",
+            "correo": claims["sub"],
+            "expires": claims["exp"]
+        }
+
     dynamodb = boto3.resource('dynamodb')
     table = dynamodb.Table(TOKENS_TABLE_USERS)
     try:
@@ -35,7 +49,14 @@ def lambda_handler(event, context):
     if now_utc > expires_dt:
         return {"statusCode": 403, "body": "Token expirado"}
 
-    # Obtener rol del token
+    # Obtener rol y usuario del token (los consumidores los cachean hasta 'expires')
     rol = item.get('rol') or item.get('role') or "Cliente"
-    
-    return {"statusCode": 200, "body": "Token válido", "rol": rol}
+    correo = item.get('user_id') or item.get('correo')
+
+    return {
+        "statusCode": 200,
+        "body": "Token válido",
+        "rol": rol,
+        "correo": correo,
+        "expires": expires_str
+    }